@@ -2,40 +2,76 @@
 
 from __future__ import annotations
 
-import time
-
 from flask import Flask
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
 
+from .cli import db_cli, messages_cli, shards_cli, stats_cli
 from .config import Config
+from .db.cache import create_cache
 from .db.database import Database
+from .instrumentation import init_instrumentation
+from .presence import init_presence
+from .ratelimit import init_rate_limiting
 from .routes.api import api_bp
 from .routes.web import web_bp
+from .serialization import init_json_provider
+from .services.event_bus import create_event_bus
+from .services.write_behind import MessageWriter
 
 
 def create_app(config_class: type[Config] | None = None) -> Flask:
-    """Application factory."""
+    """Application factory.
+
+    Runs no DDL and opens no connections: the schema is migrated once per deploy
+    by ``flask db upgrade`` and engines connect on the first request.
+    """
 
     app = Flask(__name__)
     app_config = config_class() if config_class else Config()
     app.config.from_mapping(app_config.to_mapping())
+    init_json_provider(app, app_config.json_backend)
 
     database = Database()
     database.init_app(app)
     app.extensions["database"] = database
+    app.extensions["cache"] = create_cache(
+        app_config.cache_backend,
+        url=app_config.cache_url,
+        max_entries=app_config.cache_max_entries,
+        ttl_seconds=app_config.cache_ttl_seconds,
+    )
+    app.extensions["event_bus"] = create_event_bus(
+        app_config.event_bus_backend, app_config.database_url
+    )
+
+    init_presence(app)
+
+    if app_config.write_behind_enabled:
+        with app.app_context():
+            engines = database.shard_engines()
+        app.extensions["message_writer"] = MessageWriter(
+            sessionmaker(engines[0]),
+            shard_session_factories=[sessionmaker(engine) for engine in engines[1:]],
+            events=app.extensions["event_bus"],
+            cache=app.extensions["cache"],
+            max_batch=app_config.write_behind_max_batch,
+            max_delay=app_config.write_behind_max_delay_ms / 1000,
+            max_queue=app_config.write_behind_queue_size,
+            ack_timeout=app_config.write_behind_ack_timeout,
+        )
+
+    if app_config.rate_limit_enabled:
+        init_rate_limiting(app)
 
-    with app.app_context():
-        for attempt in range(5):
-            try:
-                database.create_all()
-                break
-            except OperationalError as exc:
-                if attempt == 4:
-                    raise exc
-                time.sleep(2)
+    if app_config.instrumentation_enabled:
+        init_instrumentation(app)
 
     app.register_blueprint(web_bp)
     app.register_blueprint(api_bp, url_prefix="/api")
+    app.cli.add_command(db_cli)
+    app.cli.add_command(messages_cli)
+    app.cli.add_command(shards_cli)
+    app.cli.add_command(stats_cli)
 
     @app.shell_context_processor
     def _shell_context() -> dict[str, object]:
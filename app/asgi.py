@@ -0,0 +1,283 @@
+"""ASGI application serving the JSON API on SQLAlchemy asyncio sessions.
+
+Mirrors the REST endpoints of the Flask ``api`` blueprint for deployments
+that want an event loop per worker instead of a thread or greenlet per
+request::
+
+    uvicorn asgi:app --workers 4
+"""
+
+from __future__ import annotations
+
+import contextlib
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from .config import Config
+from .db.async_database import AsyncDatabase
+from .db.cache import create_cache
+from .serialization import dumps_bytes, inbox_row
+from .services.async_messenger_service import AsyncMessengerService
+from .services.event_bus import create_event_bus
+
+Handler = Callable[[Request, AsyncMessengerService], Awaitable[Response]]
+
+
+def _json(request: Request, body: Any, status: HTTPStatus = HTTPStatus.OK) -> Response:
+    config: Config = request.app.state.config
+    return Response(
+        dumps_bytes(body, config.json_backend),
+        status_code=int(status),
+        media_type="application/json",
+    )
+
+
+def _json_error(request: Request, message: str, status: HTTPStatus) -> Response:
+    return _json(request, {"error": message}, status)
+
+
+async def _payload(request: Request) -> dict[str, Any]:
+    try:
+        payload = await request.json()
+    except ValueError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def _page_limit(request: Request) -> int:
+    config: Config = request.app.state.config
+    raw = request.query_params.get("limit")
+    if not raw:
+        return config.message_page_size
+    try:
+        limit = int(raw)
+    except ValueError:
+        return config.message_page_size
+    return max(1, min(limit, config.message_page_size_max))
+
+
+def _with_service(handler: Handler) -> Callable[[Request], Awaitable[Response]]:
+    """Run ``handler`` with a service bound to a fresh ``AsyncSession``."""
+
+    async def endpoint(request: Request) -> Response:
+        state = request.app.state
+        async with state.database.session() as session:
+            service = AsyncMessengerService(session, events=state.event_bus, cache=state.cache)
+            return await handler(request, service)
+
+    return endpoint
+
+
+# Users ----------------------------------------------------------------------
+async def list_users(request: Request, service: AsyncMessengerService) -> Response:
+    config: Config = request.app.state.config
+    params = request.query_params
+    if "ids" in params:
+        try:
+            user_ids = [int(value) for value in params["ids"].split(",") if value.strip()]
+        except ValueError:
+            return _json_error(request, "ids must be comma-separated integers", HTTPStatus.BAD_REQUEST)
+        if len(user_ids) > config.user_lookup_max:
+            return _json_error(request, "too many ids", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        users = await service.get_user_rows(user_ids)
+        found = {user["id"] for user in users}
+        missing = sorted({user_id for user_id in user_ids if user_id not in found})
+        return _json(request, {"users": users, "missing": missing})
+
+    try:
+        page = await service.search_users(
+            prefix=params.get("prefix", "").strip() or None,
+            after=params.get("after") or None,
+            limit=_page_limit(request),
+        )
+    except ValueError as exc:
+        return _json_error(request, str(exc), HTTPStatus.BAD_REQUEST)
+    return _json(request, page)
+
+
+async def create_user(request: Request, service: AsyncMessengerService) -> Response:
+    payload = await _payload(request)
+    username = str(payload.get("username", "")).strip()
+    display_name = str(payload.get("display_name", "")).strip()
+    email = payload.get("email")
+
+    if not username or not display_name:
+        return _json_error(
+            request, "username and display_name are required", HTTPStatus.BAD_REQUEST
+        )
+
+    try:
+        user = await service.create_user(username, display_name, email)
+    except ValueError as exc:
+        return _json_error(request, str(exc), HTTPStatus.BAD_REQUEST)
+
+    return _json(request, user, HTTPStatus.CREATED)
+
+
+async def user_inbox(request: Request, service: AsyncMessengerService) -> Response:
+    user_id = request.path_params["user_id"]
+    if await service.get_user_profile(user_id) is None:
+        return _json_error(request, "user not found", HTTPStatus.NOT_FOUND)
+
+    try:
+        page = await service.list_inbox(
+            user_id,
+            before=request.query_params.get("before") or None,
+            limit=_page_limit(request),
+        )
+    except ValueError as exc:
+        return _json_error(request, str(exc), HTTPStatus.BAD_REQUEST)
+
+    chats = [inbox_row(row) for row in page.items]
+    return _json(request, {"chats": chats, "next_before": page.next_cursor})
+
+
+# Chats ----------------------------------------------------------------------
+async def list_chats(request: Request, service: AsyncMessengerService) -> Response:
+    return _json(request, await service.list_chat_rows())
+
+
+async def create_chat(request: Request, service: AsyncMessengerService) -> Response:
+    payload = await _payload(request)
+    title = str(payload.get("title", "")).strip()
+    description = payload.get("description")
+    participant_ids = payload.get("participant_ids", [])
+
+    if not title:
+        return _json_error(request, "title is required", HTTPStatus.BAD_REQUEST)
+
+    if not isinstance(participant_ids, list) or not participant_ids:
+        return _json_error(
+            request, "participant_ids must be a non-empty list", HTTPStatus.BAD_REQUEST
+        )
+
+    try:
+        chat = await service.create_chat(
+            title, [int(value) for value in participant_ids], description
+        )
+    except ValueError as exc:
+        return _json_error(request, str(exc), HTTPStatus.BAD_REQUEST)
+
+    return _json(request, chat, HTTPStatus.CREATED)
+
+
+async def get_chat(request: Request, service: AsyncMessengerService) -> Response:
+    chat_id = request.path_params["chat_id"]
+    chat = await service.get_chat_summary(chat_id)
+    if chat is None:
+        return _json_error(request, "chat not found", HTTPStatus.NOT_FOUND)
+
+    page = await service.list_message_rows(chat_id, limit=_page_limit(request))
+    return _json(request, {**chat, "messages": page.items, "next_before": page.next_cursor})
+
+
+# Messages -------------------------------------------------------------------
+async def list_messages(request: Request, service: AsyncMessengerService) -> Response:
+    chat_id = request.path_params["chat_id"]
+    if await service.get_chat_summary(chat_id) is None:
+        return _json_error(request, "chat not found", HTTPStatus.NOT_FOUND)
+
+    try:
+        page = await service.list_message_rows(
+            chat_id,
+            before=request.query_params.get("before") or None,
+            limit=_page_limit(request),
+        )
+    except ValueError as exc:
+        return _json_error(request, str(exc), HTTPStatus.BAD_REQUEST)
+
+    return _json(request, {"messages": page.items, "next_before": page.next_cursor})
+
+
+async def send_message(request: Request, service: AsyncMessengerService) -> Response:
+    payload = await _payload(request)
+    author_id = payload.get("author_id")
+    content = str(payload.get("content", "")).strip()
+
+    if author_id is None or not content:
+        return _json_error(request, "author_id and content are required", HTTPStatus.BAD_REQUEST)
+
+    try:
+        message = await service.send_message(
+            request.path_params["chat_id"], int(author_id), content
+        )
+    except ValueError as exc:
+        return _json_error(request, str(exc), HTTPStatus.BAD_REQUEST)
+
+    return _json(request, message, HTTPStatus.CREATED)
+
+
+async def send_messages_batch(request: Request, service: AsyncMessengerService) -> Response:
+    payload = await _payload(request)
+    batch = payload.get("messages")
+
+    if not isinstance(batch, list) or not batch:
+        return _json_error(request, "messages must be a non-empty list", HTTPStatus.BAD_REQUEST)
+    if len(batch) > request.app.state.config.message_batch_max:
+        return _json_error(
+            request, "too many messages in batch", HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        )
+
+    try:
+        results = await service.send_messages(request.path_params["chat_id"], batch)
+    except ValueError as exc:
+        return _json_error(request, str(exc), HTTPStatus.NOT_FOUND)
+
+    created = sum(1 for result in results if result["status"] == "created")
+    status = HTTPStatus.CREATED if created else HTTPStatus.BAD_REQUEST
+    body = {"created": created, "failed": len(results) - created, "results": results}
+    return _json(request, body, status)
+
+
+def _routes() -> list[Route]:
+    def route(path: str, handler: Handler, method: str) -> Route:
+        return Route(f"/api{path}", _with_service(handler), methods=[method])
+
+    return [
+        route("/users", list_users, "GET"),
+        route("/users", create_user, "POST"),
+        route("/users/{user_id:int}/chats", user_inbox, "GET"),
+        route("/chats", list_chats, "GET"),
+        route("/chats", create_chat, "POST"),
+        route("/chats/{chat_id:int}", get_chat, "GET"),
+        route("/chats/{chat_id:int}/messages", list_messages, "GET"),
+        route("/chats/{chat_id:int}/messages", send_message, "POST"),
+        route("/chats/{chat_id:int}/messages:batch", send_messages_batch, "POST"),
+    ]
+
+
+def create_asgi_app(config_class: type[Config] | None = None) -> Starlette:
+    """ASGI application factory; shares config, cache and event bus settings with ``create_app``."""
+
+    app_config = config_class() if config_class else Config()
+    if app_config.database_shard_urls:
+        raise RuntimeError("The ASGI app does not route chat shards; serve sharded setups via wsgi")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        database = AsyncDatabase(app_config)
+        app.state.config = app_config
+        app.state.database = database
+        app.state.cache = create_cache(
+            app_config.cache_backend,
+            url=app_config.cache_url,
+            max_entries=app_config.cache_max_entries,
+            ttl_seconds=app_config.cache_ttl_seconds,
+        )
+        app.state.event_bus = create_event_bus(
+            app_config.event_bus_backend, app_config.database_url
+        )
+        try:
+            yield
+        finally:
+            await database.dispose()
+
+    return Starlette(routes=_routes(), lifespan=lifespan)
+
+
+__all__ = ["create_asgi_app"]
@@ -0,0 +1,189 @@
+"""Flask CLI commands for database maintenance (``flask --app wsgi ...``)."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from .db import migrations
+from .db.partitions import ARCHIVE_FORMATS, add_months, archive_partitions, ensure_partitions
+from .routes import get_messenger_service
+
+db_cli = AppGroup("db", help="Apply and inspect schema migrations.")
+messages_cli = AppGroup("messages", help="Manage message partitions and archives.")
+shards_cli = AppGroup("shards", help="Inspect and rebalance chat shards.")
+stats_cli = AppGroup("stats", help="Maintain the activity rollups.")
+
+
+def _shard_label(shard: int) -> str:
+    """Output prefix naming the shard, empty when the database is not sharded."""
+
+    return f"shard {shard}: " if current_app.extensions["database"].shard_count > 1 else ""
+
+
+@db_cli.command("upgrade")
+@click.option("--target", default=None, help="stop after this version (e.g. 0001)")
+def upgrade(target: str | None) -> None:
+    """Apply pending migrations on every shard, then create upcoming message partitions."""
+
+    config = current_app.config
+    results = current_app.extensions["database"].upgrade_schema(
+        retries=int(config["DB_CONNECT_RETRIES"]),
+        backoff=float(config["DB_CONNECT_BACKOFF"]),
+        partition_months_ahead=int(config["MESSAGE_PARTITION_MONTHS_AHEAD"]),
+        target=target,
+    )
+    for shard, applied in results.items():
+        for migration in applied:
+            click.echo(f"{_shard_label(shard)}applied {migration.version} {migration.description}")
+        if not applied:
+            click.echo(f"{_shard_label(shard)}schema is up to date")
+
+
+@db_cli.command("current")
+def current() -> None:
+    """Show applied and pending migration versions of every shard."""
+
+    for shard, engine in enumerate(current_app.extensions["database"].shard_engines()):
+        with engine.connect() as connection:
+            applied = migrations.applied_versions(connection)
+        for migration in migrations.discover():
+            state = "applied" if migration.version in applied else "pending"
+            label = _shard_label(shard)
+            click.echo(f"{label}{migration.version} {state:<8} {migration.description}")
+
+
+@messages_cli.command("partitions")
+@click.option("--months-ahead", type=int, default=None, help="future months to pre-create")
+def create_partitions(months_ahead: int | None) -> None:
+    """Create the current and upcoming monthly partitions of ``messages``."""
+
+    database = current_app.extensions["database"]
+    if months_ahead is None:
+        months_ahead = int(current_app.config["MESSAGE_PARTITION_MONTHS_AHEAD"])
+    for shard, engine in enumerate(database.shard_engines()):
+        with engine.begin() as connection:
+            created = ensure_partitions(connection, months_ahead=months_ahead)
+        label = _shard_label(shard)
+        for partition in created:
+            click.echo(f"{label}created {partition.name} [{partition.start}, {partition.end})")
+        if not created:
+            click.echo(f"{label}partitions are up to date")
+
+
+@messages_cli.command("archive")
+@click.option("--older-than-months", type=int, default=None, help="keep this many recent months")
+@click.option("--dir", "directory", type=click.Path(file_okay=False), default=None)
+@click.option("--format", "archive_format", type=click.Choice(ARCHIVE_FORMATS), default=None)
+def archive(
+    older_than_months: int | None, directory: str | None, archive_format: str | None
+) -> None:
+    """Export old message partitions to compressed files, then detach and drop them.
+
+    Shards other than 0 archive into a ``shard_<n>`` subdirectory, since their
+    partitions share names.
+    """
+
+    config = current_app.config
+    if older_than_months is None:
+        older_than_months = int(config["MESSAGE_ARCHIVE_AFTER_MONTHS"])
+    cutoff = add_months(datetime.now(timezone.utc).date(), -older_than_months)
+    database = current_app.extensions["database"]
+    root = Path(directory or config["MESSAGE_ARCHIVE_DIR"])
+    for shard, engine in enumerate(database.shard_engines()):
+        with engine.connect() as connection:
+            archived = archive_partitions(
+                connection,
+                older_than=cutoff,
+                directory=root / f"shard_{shard}" if shard else root,
+                archive_format=archive_format or config["MESSAGE_ARCHIVE_FORMAT"],
+            )
+        label = _shard_label(shard)
+        for partition, path, count in archived:
+            click.echo(f"{label}archived {partition.name}: {count} messages -> {path}")
+        if not archived:
+            click.echo(f"{label}no partitions older than {cutoff}")
+
+
+@shards_cli.command("status")
+def shard_status() -> None:
+    """Chats per shard, and how many sit off their hash ring placement."""
+
+    service = get_messenger_service()
+    for shard, count in service.shard_status().items():
+        click.echo(f"shard {shard}: {count} chats")
+    click.echo(f"{len(service.rebalance_plan())} chats to rebalance")
+
+
+@shards_cli.command("move")
+@click.argument("chat_id", type=int)
+@click.argument("shard", type=int)
+@click.option("--batch-size", type=int, default=1000, help="messages copied per insert")
+def move(chat_id: int, shard: int, batch_size: int) -> None:
+    """Move one chat, its members and its messages to SHARD."""
+
+    try:
+        moved = get_messenger_service().move_chat(chat_id, shard, batch_size=batch_size)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(f"chat {chat_id} -> shard {shard}: {moved} messages")
+
+
+@shards_cli.command("rebalance")
+@click.option("--limit", type=int, default=None, help="move at most this many chats")
+@click.option("--dry-run", is_flag=True, help="only list the moves")
+@click.option("--batch-size", type=int, default=1000, help="messages copied per insert")
+def rebalance(limit: int | None, dry_run: bool, batch_size: int) -> None:
+    """Move chats to the shard the hash ring assigns them, e.g. after adding a shard."""
+
+    service = get_messenger_service()
+    plan = service.rebalance_plan(limit)
+    for chat_id, source, target in plan:
+        if dry_run:
+            click.echo(f"chat {chat_id}: shard {source} -> {target}")
+            continue
+        try:
+            moved = service.move_chat(chat_id, target, batch_size=batch_size)
+        except ValueError as exc:
+            click.echo(f"chat {chat_id}: skipped ({exc})", err=True)
+            continue
+        click.echo(f"chat {chat_id}: shard {source} -> {target}, {moved} messages")
+    if not plan:
+        click.echo("every chat is on its shard")
+
+
+@shards_cli.command("sync-users")
+@click.option("--batch-size", type=int, default=1000, help="users copied per insert")
+def sync_users(batch_size: int) -> None:
+    """Copy users missing on any shard, e.g. after adding a shard."""
+
+    synced = get_messenger_service().sync_users(batch_size=batch_size)
+    click.echo(f"{synced} users checked on every shard")
+
+
+@stats_cli.command("backfill")
+@click.option("--since", type=click.DateTime(["%Y-%m-%d"]), default=None, help="first day")
+@click.option("--until", type=click.DateTime(["%Y-%m-%d"]), default=None, help="day after the last")
+def backfill(since: datetime | None, until: datetime | None) -> None:
+    """Recount the rollups of whole days from message history, one day at a time.
+
+    Defaults to every day from the oldest message up to, but not including,
+    today. Re-running is safe: each day is rebuilt, not added to.
+    """
+
+    days = get_messenger_service().backfill_rollups(
+        since=since.date() if since else None, until=until.date() if until else None
+    )
+    counted = 0
+    for shard, day, messages in days:
+        click.echo(f"{_shard_label(shard)}{day}: {messages} messages")
+        counted += 1
+    if not counted:
+        click.echo("no days to backfill")
+
+
+__all__ = ["db_cli", "messages_cli", "shards_cli", "stats_cli"]
@@ -6,6 +6,17 @@ import os
 from dataclasses import dataclass, field
 
 
+def _env_list(name: str) -> list[str]:
+    return [value.strip() for value in os.getenv(name, "").split(",") if value.strip()]
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
 @dataclass(slots=True)
 class Config:
     """Base configuration for the Flask application."""
@@ -17,14 +28,217 @@ class Config:
             "DATABASE_URL", "postgresql+psycopg2://messenger:messenger@db:5432/messenger"
         )
     )
+    database_replica_urls: list[str] = field(
+        default_factory=lambda: _env_list("DATABASE_REPLICA_URLS")
+    )
+    # Extra chat shards (1..n); DATABASE_URL is shard 0 and keeps users and the directory.
+    database_shard_urls: list[str] = field(
+        default_factory=lambda: _env_list("DATABASE_SHARD_URLS")
+    )
+    db_pool_size: int = field(default_factory=lambda: int(os.getenv("DB_POOL_SIZE", "5")))
+    db_max_overflow: int = field(default_factory=lambda: int(os.getenv("DB_MAX_OVERFLOW", "10")))
+    db_pool_timeout: float = field(
+        default_factory=lambda: float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    )
+    db_pool_recycle: int = field(default_factory=lambda: int(os.getenv("DB_POOL_RECYCLE", "1800")))
+    db_pool_pre_ping: bool = field(default_factory=lambda: _env_bool("DB_POOL_PRE_PING", True))
+    db_statement_timeout_ms: int = field(
+        default_factory=lambda: int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    )
+    db_connect_retries: int = field(
+        default_factory=lambda: int(os.getenv("DB_CONNECT_RETRIES", "5"))
+    )
+    db_connect_backoff: float = field(
+        default_factory=lambda: float(os.getenv("DB_CONNECT_BACKOFF", "0.5"))
+    )
+    message_page_size: int = field(
+        default_factory=lambda: int(os.getenv("MESSAGE_PAGE_SIZE", "50"))
+    )
+    message_page_size_max: int = field(
+        default_factory=lambda: int(os.getenv("MESSAGE_PAGE_SIZE_MAX", "200"))
+    )
+    message_batch_max: int = field(
+        default_factory=lambda: int(os.getenv("MESSAGE_BATCH_MAX", "1000"))
+    )
+    participant_batch_max: int = field(
+        default_factory=lambda: int(os.getenv("PARTICIPANT_BATCH_MAX", "10000"))
+    )
+    user_lookup_max: int = field(
+        default_factory=lambda: int(os.getenv("USER_LOOKUP_MAX", "500"))
+    )
+    sync_max_chats: int = field(
+        default_factory=lambda: int(os.getenv("SYNC_MAX_CHATS", "500"))
+    )
+    export_batch_size: int = field(
+        default_factory=lambda: int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    )
+    message_partition_months_ahead: int = field(
+        default_factory=lambda: int(os.getenv("MESSAGE_PARTITION_MONTHS_AHEAD", "3"))
+    )
+    message_archive_after_months: int = field(
+        default_factory=lambda: int(os.getenv("MESSAGE_ARCHIVE_AFTER_MONTHS", "12"))
+    )
+    message_archive_dir: str = field(
+        default_factory=lambda: os.getenv("MESSAGE_ARCHIVE_DIR", "archive")
+    )
+    message_archive_format: str = field(
+        default_factory=lambda: os.getenv("MESSAGE_ARCHIVE_FORMAT", "jsonl")
+    )
+    stats_max_buckets: int = field(
+        default_factory=lambda: int(os.getenv("STATS_MAX_BUCKETS", "1000"))
+    )
+    json_backend: str = field(default_factory=lambda: os.getenv("JSON_BACKEND", "auto"))
+    cache_backend: str = field(default_factory=lambda: os.getenv("CACHE_BACKEND", "memory"))
+    cache_url: str | None = field(default_factory=lambda: os.getenv("CACHE_URL"))
+    cache_max_entries: int = field(
+        default_factory=lambda: int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    )
+    cache_ttl_seconds: float = field(
+        default_factory=lambda: float(os.getenv("CACHE_TTL_SECONDS", "30"))
+    )
+    instrumentation_enabled: bool = field(
+        default_factory=lambda: _env_bool("INSTRUMENTATION_ENABLED", False)
+    )
+    slow_query_ms: float = field(default_factory=lambda: float(os.getenv("SLOW_QUERY_MS", "200")))
+    n_plus_one_threshold: int = field(
+        default_factory=lambda: int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+    )
+    write_behind_enabled: bool = field(
+        default_factory=lambda: _env_bool("WRITE_BEHIND_ENABLED", False)
+    )
+    write_behind_max_batch: int = field(
+        default_factory=lambda: int(os.getenv("WRITE_BEHIND_MAX_BATCH", "200"))
+    )
+    write_behind_max_delay_ms: float = field(
+        default_factory=lambda: float(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "5"))
+    )
+    write_behind_queue_size: int = field(
+        default_factory=lambda: int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+    )
+    write_behind_ack_timeout: float = field(
+        default_factory=lambda: float(os.getenv("WRITE_BEHIND_ACK_TIMEOUT", "10"))
+    )
+    rate_limit_enabled: bool = field(
+        default_factory=lambda: _env_bool("RATE_LIMIT_ENABLED", False)
+    )
+    rate_limit_backend: str = field(
+        default_factory=lambda: os.getenv("RATE_LIMIT_BACKEND", "memory")
+    )
+    rate_limit_url: str | None = field(default_factory=lambda: os.getenv("RATE_LIMIT_URL"))
+    # "<count>/<s|m|h>[:<burst>]" per bucket; "off" disables a scope.
+    rate_limit_address: str = field(
+        default_factory=lambda: os.getenv("RATE_LIMIT_ADDRESS", "100/s:200")
+    )
+    rate_limit_signup: str = field(
+        default_factory=lambda: os.getenv("RATE_LIMIT_SIGNUP", "10/m:5")
+    )
+    rate_limit_author: str = field(
+        default_factory=lambda: os.getenv("RATE_LIMIT_AUTHOR", "5/s:20")
+    )
+    rate_limit_chat: str = field(
+        default_factory=lambda: os.getenv("RATE_LIMIT_CHAT", "50/s:200")
+    )
+    presence_backend: str = field(
+        default_factory=lambda: os.getenv("PRESENCE_BACKEND", "memory")
+    )
+    presence_url: str | None = field(default_factory=lambda: os.getenv("PRESENCE_URL"))
+    presence_ttl_seconds: float = field(
+        default_factory=lambda: float(os.getenv("PRESENCE_TTL_SECONDS", "60"))
+    )
+    typing_ttl_seconds: float = field(
+        default_factory=lambda: float(os.getenv("TYPING_TTL_SECONDS", "6"))
+    )
+    presence_batch_size: int = field(
+        default_factory=lambda: int(os.getenv("PRESENCE_BATCH_SIZE", "1000"))
+    )
+    event_bus_backend: str = field(
+        default_factory=lambda: os.getenv("EVENT_BUS_BACKEND", "memory")
+    )
+    sse_keepalive_seconds: float = field(
+        default_factory=lambda: float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+    )
+
+    def engine_options(self, url: str) -> dict[str, object]:
+        """SQLAlchemy engine/pool options for ``url``.
+
+        SQLite keeps Flask-SQLAlchemy's defaults, since its pools do not accept
+        sizing arguments.
+        """
+
+        if url.startswith("sqlite"):
+            return {}
+        options: dict[str, object] = {
+            "pool_size": self.db_pool_size,
+            "max_overflow": self.db_max_overflow,
+            "pool_timeout": self.db_pool_timeout,
+            "pool_recycle": self.db_pool_recycle,
+            "pool_pre_ping": self.db_pool_pre_ping,
+        }
+        if self.db_statement_timeout_ms and url.startswith("postgresql"):
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={self.db_statement_timeout_ms}"
+            }
+        return options
 
-    def to_mapping(self) -> dict[str, str]:
+    def to_mapping(self) -> dict[str, object]:
         """Return config mapping for Flask."""
 
         return {
             "SECRET_KEY": self.secret_key,
             "SQLALCHEMY_DATABASE_URI": self.database_url,
+            "SQLALCHEMY_ENGINE_OPTIONS": self.engine_options(self.database_url),
+            "SQLALCHEMY_BINDS": {
+                **{
+                    f"replica_{index}": {"url": url, **self.engine_options(url)}
+                    for index, url in enumerate(self.database_replica_urls)
+                },
+                **{
+                    f"shard_{index}": {"url": url, **self.engine_options(url)}
+                    for index, url in enumerate(self.database_shard_urls, start=1)
+                },
+            },
             "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            "DB_CONNECT_RETRIES": self.db_connect_retries,
+            "DB_CONNECT_BACKOFF": self.db_connect_backoff,
             "APP_NAME": self.app_name,
+            "MESSAGE_PAGE_SIZE": self.message_page_size,
+            "MESSAGE_PAGE_SIZE_MAX": self.message_page_size_max,
+            "MESSAGE_BATCH_MAX": self.message_batch_max,
+            "PARTICIPANT_BATCH_MAX": self.participant_batch_max,
+            "USER_LOOKUP_MAX": self.user_lookup_max,
+            "SYNC_MAX_CHATS": self.sync_max_chats,
+            "EXPORT_BATCH_SIZE": self.export_batch_size,
+            "MESSAGE_PARTITION_MONTHS_AHEAD": self.message_partition_months_ahead,
+            "MESSAGE_ARCHIVE_AFTER_MONTHS": self.message_archive_after_months,
+            "MESSAGE_ARCHIVE_DIR": self.message_archive_dir,
+            "MESSAGE_ARCHIVE_FORMAT": self.message_archive_format,
+            "STATS_MAX_BUCKETS": self.stats_max_buckets,
+            "JSON_BACKEND": self.json_backend,
+            "CACHE_BACKEND": self.cache_backend,
+            "CACHE_URL": self.cache_url,
+            "CACHE_MAX_ENTRIES": self.cache_max_entries,
+            "CACHE_TTL_SECONDS": self.cache_ttl_seconds,
+            "INSTRUMENTATION_ENABLED": self.instrumentation_enabled,
+            "SLOW_QUERY_MS": self.slow_query_ms,
+            "N_PLUS_ONE_THRESHOLD": self.n_plus_one_threshold,
+            "WRITE_BEHIND_ENABLED": self.write_behind_enabled,
+            "WRITE_BEHIND_MAX_BATCH": self.write_behind_max_batch,
+            "WRITE_BEHIND_MAX_DELAY_MS": self.write_behind_max_delay_ms,
+            "WRITE_BEHIND_QUEUE_SIZE": self.write_behind_queue_size,
+            "WRITE_BEHIND_ACK_TIMEOUT": self.write_behind_ack_timeout,
+            "RATE_LIMIT_ENABLED": self.rate_limit_enabled,
+            "RATE_LIMIT_BACKEND": self.rate_limit_backend,
+            "RATE_LIMIT_URL": self.rate_limit_url,
+            "RATE_LIMIT_ADDRESS": self.rate_limit_address,
+            "RATE_LIMIT_SIGNUP": self.rate_limit_signup,
+            "RATE_LIMIT_AUTHOR": self.rate_limit_author,
+            "RATE_LIMIT_CHAT": self.rate_limit_chat,
+            "PRESENCE_BACKEND": self.presence_backend,
+            "PRESENCE_URL": self.presence_url,
+            "PRESENCE_TTL_SECONDS": self.presence_ttl_seconds,
+            "TYPING_TTL_SECONDS": self.typing_ttl_seconds,
+            "PRESENCE_BATCH_SIZE": self.presence_batch_size,
+            "EVENT_BUS_BACKEND": self.event_bus_backend,
+            "SSE_KEEPALIVE_SECONDS": self.sse_keepalive_seconds,
         }
 
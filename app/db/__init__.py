@@ -1,6 +1,23 @@
 """Database package exports."""
 
+from .cache import CacheBackend, CacheStats, MemoryCache, NullCache, RedisCache, create_cache
 from .database import Database
+from .pagination import Page, decode_cursor, decode_keyset, encode_cursor, encode_keyset
+from .versions import VersionStamp
 
-__all__ = ["Database"]
+__all__ = [
+    "CacheBackend",
+    "CacheStats",
+    "Database",
+    "MemoryCache",
+    "NullCache",
+    "Page",
+    "RedisCache",
+    "VersionStamp",
+    "create_cache",
+    "decode_cursor",
+    "decode_keyset",
+    "encode_cursor",
+    "encode_keyset",
+]
 
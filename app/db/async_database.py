@@ -0,0 +1,50 @@
+"""Asyncio engine and session factory for the ASGI entry point."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import Config
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap a sync driver for its asyncio counterpart (psycopg2 -> asyncpg)."""
+
+    scheme, separator, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+class AsyncDatabase:
+    """Owns the ``AsyncEngine`` and hands out ``AsyncSession`` objects.
+
+    Sessions do not expire on commit so results can be serialized after the
+    transaction without lazy loads outside the event loop's greenlet.
+    """
+
+    def __init__(self, config: Config) -> None:
+        url = to_async_url(config.database_url)
+        options: dict[str, Any] = dict(config.engine_options(config.database_url))
+        options.pop("connect_args", None)
+        if config.db_statement_timeout_ms and url.startswith("postgresql+asyncpg"):
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(config.db_statement_timeout_ms)}
+            }
+        self.engine: AsyncEngine = create_async_engine(url, **options)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def session(self) -> AsyncSession:
+        return self.sessionmaker()
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+
+
+__all__ = ["AsyncDatabase", "to_async_url"]
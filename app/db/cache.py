@@ -0,0 +1,275 @@
+"""Read-through cache backends for repository results."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Mapping, Optional, Protocol, Sequence
+
+try:  # pragma: no cover - optional dependency
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """Counters published by every backend."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class CacheBackend(Protocol):
+    """Minimal key/value interface the service layer caches through.
+
+    Values must be JSON-compatible (dicts, lists, scalars, datetimes) and are
+    treated as read-only by callers.
+    """
+
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def delete(self, *keys: str) -> None: ...
+
+    def get_many(self, keys: Sequence[str]) -> dict[str, Any]: ...
+
+    def set_many(self, values: Mapping[str, Any]) -> None: ...
+
+    def stats(self) -> CacheStats: ...
+
+
+class MemoryCache:
+    """Process-local LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 60.0) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._stats.misses += 1
+                self._stats.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def get_many(self, keys: Sequence[str]) -> dict[str, Any]:
+        """Values of the live ``keys``; missing and expired keys are left out."""
+
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, values: Mapping[str, Any]) -> None:
+        for key, value in values.items():
+            self.set(key, value)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                entries=len(self._entries),
+            )
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class RedisCache:
+    """Shared cache over the Redis protocol (GET/SET EX/DEL only).
+
+    Any server speaking those commands works, including local stand-ins.
+    Bounded eviction is delegated to the server's ``maxmemory-policy``;
+    hit/miss counters are kept per process.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float = 60.0, prefix: str = "messenger:") -> None:
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._ttl = max(1, int(ttl_seconds))
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self._prefix + key)
+        with self._lock:
+            if raw is None:
+                self._stats.misses += 1
+            else:
+                self._stats.hits += 1
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        payload = json.dumps(value, default=_json_default)
+        self._client.set(self._prefix + key, payload, ex=self._ttl)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._client.delete(*(self._prefix + key for key in keys))
+
+    def get_many(self, keys: Sequence[str]) -> dict[str, Any]:
+        """One ``MGET`` round trip for all ``keys``."""
+
+        if not keys:
+            return {}
+        raws = self._client.mget([self._prefix + key for key in keys])
+        found = {key: json.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+        with self._lock:
+            self._stats.hits += len(found)
+            self._stats.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, values: Mapping[str, Any]) -> None:
+        """Pipelined ``SET EX`` for every entry, one round trip."""
+
+        if not values:
+            return
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.set(self._prefix + key, json.dumps(value, default=_json_default), ex=self._ttl)
+        pipeline.execute()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._stats.hits, misses=self._stats.misses)
+
+
+class NullCache:
+    """Backend used when caching is disabled; every lookup misses."""
+
+    def __init__(self) -> None:
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        self._stats.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        return None
+
+    def delete(self, *keys: str) -> None:
+        return None
+
+    def get_many(self, keys: Sequence[str]) -> dict[str, Any]:
+        self._stats.misses += len(keys)
+        return {}
+
+    def set_many(self, values: Mapping[str, Any]) -> None:
+        return None
+
+    def stats(self) -> CacheStats:
+        return CacheStats(misses=self._stats.misses)
+
+
+def read_through(
+    cache: CacheBackend, key: str, loader: Callable[[], Optional[Any]]
+) -> Optional[Any]:
+    """Return the cached value for ``key``, loading and storing it on a miss.
+
+    ``None`` results are not cached so that lookups of missing rows stay fresh.
+    """
+
+    value = cache.get(key)
+    if value is None:
+        value = loader()
+        if value is not None:
+            cache.set(key, value)
+    return value
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def chat_key(chat_id: int) -> str:
+    return f"chat:{chat_id}"
+
+
+def latest_messages_key(chat_id: int) -> str:
+    return f"chat:{chat_id}:latest"
+
+
+def message_fragment_key(chat_id: int, message_id: int) -> str:
+    """Rendered HTML of one message; messages are immutable, so it is never invalidated.
+
+    Scoped by chat because message ids are only unique per shard.
+    """
+
+    return f"fragment:chat:{chat_id}:message:{message_id}"
+
+
+def create_cache(
+    backend: str, url: str | None = None, max_entries: int = 10_000, ttl_seconds: float = 60.0
+) -> CacheBackend:
+    """Build the cache configured by ``CACHE_BACKEND``."""
+
+    if backend == "memory":
+        return MemoryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if backend == "redis":
+        if not url:
+            raise ValueError("CACHE_BACKEND=redis requires CACHE_URL")
+        return RedisCache(url, ttl_seconds=ttl_seconds)
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+__all__ = [
+    "CacheBackend",
+    "CacheStats",
+    "MemoryCache",
+    "NullCache",
+    "RedisCache",
+    "chat_key",
+    "create_cache",
+    "latest_messages_key",
+    "message_fragment_key",
+    "read_through",
+    "user_key",
+]
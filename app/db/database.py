@@ -2,24 +2,177 @@
 
 from __future__ import annotations
 
-from typing import Any
+import itertools
+import sqlite3
+import time
+from typing import Any, Iterator
 
-from flask import Flask
+from flask import Flask, g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.db import migrations
+from app.db.migrations import Migration
+from app.db.partitions import ensure_partitions
+from app.db.pool import PoolStats, TimedQueuePool
+from app.db.sharding import ShardSessions, reserve_message_ids
 from app.models.base import db
 
 
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection: Any, _connection_record: Any) -> None:
+    """SQLite ignores foreign keys unless asked; the send path relies on them."""
+
+    # aiosqlite connections are wrapped in SQLAlchemy's adapter class.
+    if isinstance(dbapi_connection, sqlite3.Connection) or (
+        type(dbapi_connection).__name__ == "AsyncAdapt_aiosqlite_connection"
+    ):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
 class Database:
+    """Primary session plus optional read-replica and chat-shard sessions.
+
+    Replicas are the ``replica_*`` entries of ``SQLALCHEMY_BINDS``; each app
+    context gets at most one replica session, picked round-robin. Chat shards
+    are the ``shard_<n>`` entries; the primary is shard 0.
+    """
 
     def __init__(self) -> None:
         self.db = db
+        self._replica_keys: list[str] = []
+        self._replica_cycle: Iterator[str] | None = None
+        self._shard_keys: list[str] = []
 
     def init_app(self, app: Flask) -> None:
+        binds = app.config["SQLALCHEMY_BINDS"]
+        for options in [app.config["SQLALCHEMY_ENGINE_OPTIONS"], *binds.values()]:
+            if "pool_size" in options:
+                options.setdefault("poolclass", TimedQueuePool)
         self.db.init_app(app)
 
+        self._replica_keys = sorted(key for key in binds if key.startswith("replica_"))
+        self._replica_cycle = itertools.cycle(self._replica_keys) if self._replica_keys else None
+        self._shard_keys = sorted(
+            (key for key in binds if key.startswith("shard_")), key=lambda key: int(key[6:])
+        )
+        app.teardown_appcontext(self._close_read_session)
+        app.teardown_appcontext(self._close_shard_sessions)
+
     @property
     def session(self) -> Any:
         return self.db.session
 
-    def create_all(self) -> None:
-        self.db.create_all()
+    @property
+    def read_session(self) -> Any:
+        """Session for read-only work; the primary session when no replica is set."""
+
+        if self._replica_cycle is None:
+            return self.db.session
+        if "_read_session" not in g:
+            g._read_session = Session(bind=self.db.engines[next(self._replica_cycle)])
+        return g._read_session
+
+    @property
+    def shard_count(self) -> int:
+        return 1 + len(self._shard_keys)
+
+    def shard_engines(self) -> list[Engine]:
+        """Engines of shards ``0..n``; needs an app context."""
+
+        return [self.db.engine, *(self.db.engines[key] for key in self._shard_keys)]
+
+    def shards(self, read_only: bool = False) -> ShardSessions:
+        """Shard sessions for the current app context, closed on teardown.
+
+        Shard 0 is :attr:`session`, or :attr:`read_session` when ``read_only``;
+        the other shards are read from their primaries.
+        """
+
+        name = "_read_shard_sessions" if read_only else "_shard_sessions"
+        if name not in g:
+            home = self.read_session if read_only else self.session
+            factories = [
+                (lambda engine=engine: Session(bind=engine)) for engine in self.shard_engines()[1:]
+            ]
+            setattr(g, name, ShardSessions(home, factories))
+        return getattr(g, name)
+
+    def upgrade_schema(
+        self,
+        retries: int = 5,
+        backoff: float = 0.5,
+        partition_months_ahead: int = 3,
+        target: str | None = None,
+    ) -> dict[int, list[Migration]]:
+        """Apply pending migrations and create upcoming message partitions on every shard.
+
+        Run once per deploy (``flask --app wsgi db upgrade``), never on worker
+        boot. Retries with exponential backoff while the DB starts. Returns the
+        migrations applied per shard index.
+        """
+
+        return {
+            shard: self._upgrade_engine(
+                engine, shard, retries, backoff, partition_months_ahead, target
+            )
+            for shard, engine in enumerate(self.shard_engines())
+        }
+
+    @staticmethod
+    def _upgrade_engine(
+        engine: Engine,
+        shard: int,
+        retries: int,
+        backoff: float,
+        partition_months_ahead: int,
+        target: str | None,
+    ) -> list[Migration]:
+        for attempt in range(retries):
+            try:
+                applied = migrations.upgrade(engine, target=target)
+                with engine.begin() as connection:
+                    ensure_partitions(connection, months_ahead=partition_months_ahead)
+                    reserve_message_ids(connection, shard)
+                return applied
+            except OperationalError:
+                if attempt == retries - 1:
+                    raise
+                time.sleep(backoff * 2**attempt)
+        return []
+
+    def dispose_after_fork(self) -> None:
+        """Drop pooled connections inherited from a parent process (``--preload``).
+
+        ``close=False`` leaves the parent's sockets untouched; the child opens
+        its own connections on first use.
+        """
+
+        for engine in self.db.engines.values():
+            engine.dispose(close=False)
+
+    def pool_stats(self) -> dict[str, PoolStats]:
+        """Checkout wait and saturation stats for every instrumented engine."""
+
+        stats = {}
+        for key, engine in self.db.engines.items():
+            if isinstance(engine.pool, TimedQueuePool):
+                stats[key or "primary"] = engine.pool.stats()
+        return stats
+
+    @staticmethod
+    def _close_read_session(_exc: BaseException | None = None) -> None:
+        session = g.pop("_read_session", None)
+        if session is not None:
+            session.close()
 
+    @staticmethod
+    def _close_shard_sessions(_exc: BaseException | None = None) -> None:
+        for name in ("_shard_sessions", "_read_shard_sessions"):
+            shards = g.pop(name, None)
+            if shards is not None:
+                shards.close()
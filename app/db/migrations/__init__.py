@@ -0,0 +1,128 @@
+"""Versioned schema migrations, applied by ``flask --app wsgi db upgrade``.
+
+Every ``mNNNN_<slug>.py`` module in this package is one migration: ``NNNN`` is
+its version, the first docstring line its description and
+``upgrade(connection)`` the change. Applied versions are recorded in
+``schema_migrations``. Each migration runs in its own transaction (DDL is
+transactional on PostgreSQL and SQLite) under an advisory lock, so concurrent
+runners apply every migration exactly once.
+"""
+
+from __future__ import annotations
+
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    MetaData,
+    String,
+    Table,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection, Engine
+
+_MODULE_NAME = re.compile(r"m(?P<version>\d{4})_\w+")
+# Arbitrary application-wide key for pg_advisory_xact_lock.
+_ADVISORY_LOCK_KEY = 0x6D657367
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String(16), primary_key=True),
+    Column("name", String(120), nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    """One schema change, loaded from a ``mNNNN_<slug>`` module."""
+
+    version: str
+    name: str
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def discover() -> list[Migration]:
+    """All migrations in this package, ordered by version."""
+
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = _MODULE_NAME.fullmatch(module_info.name)
+        if match is None:
+            continue
+        module = importlib.import_module(f"{__name__}.{module_info.name}")
+        migrations.append(
+            Migration(
+                version=match["version"],
+                name=module_info.name,
+                description=(module.__doc__ or "").strip().splitlines()[0],
+                upgrade=module.upgrade,
+            )
+        )
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def applied_versions(connection: Connection) -> set[str]:
+    """Versions recorded in ``schema_migrations``; empty before the first upgrade."""
+
+    if not connection.dialect.has_table(connection, schema_migrations.name):
+        return set()
+    return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def column_names(connection: Connection, table: str) -> set[str]:
+    """Columns ``table`` has right now; lets migrations skip work already done."""
+
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def upgrade(engine: Engine, target: str | None = None) -> list[Migration]:
+    """Apply pending migrations up to ``target`` (inclusive); returns those applied."""
+
+    with engine.begin() as connection:
+        _lock(connection)
+        schema_migrations.create(connection, checkfirst=True)
+
+    applied = []
+    for migration in discover():
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as connection:
+            _lock(connection)
+            # Re-read under the lock: a concurrent runner may have applied it.
+            if migration.version in applied_versions(connection):
+                continue
+            migration.upgrade(connection)
+            connection.execute(
+                insert(schema_migrations).values(version=migration.version, name=migration.name)
+            )
+        applied.append(migration)
+    return applied
+
+
+def _lock(connection: Connection) -> None:
+    """Serialize runners; SQLite's database-level write lock already does this."""
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+
+
+__all__ = [
+    "Migration",
+    "applied_versions",
+    "column_names",
+    "discover",
+    "schema_migrations",
+    "upgrade",
+]
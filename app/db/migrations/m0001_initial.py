@@ -0,0 +1,57 @@
+"""Initial schema: users, chats, memberships and messages.
+
+A frozen copy of the original tables, independent of today's models; the
+later migrations evolve them. Tables that already exist are left alone, so
+databases created by the old boot-time ``create_all`` adopt migrations here
+and are brought up to date by the migrations that follow.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, func
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+
+def _base_columns() -> list[Column]:
+    return [
+        Column("id", Integer, primary_key=True),
+        Column("created_at", DateTime, nullable=False, server_default=func.now()),
+        Column("updated_at", DateTime, nullable=False, server_default=func.now()),
+    ]
+
+
+Table(
+    "users",
+    metadata,
+    *_base_columns(),
+    Column("username", String(80), unique=True, nullable=False),
+    Column("display_name", String(120), nullable=False),
+    Column("email", String(120), unique=True, nullable=True),
+)
+Table(
+    "chats",
+    metadata,
+    *_base_columns(),
+    Column("title", String(120), nullable=False),
+    Column("description", String(255), nullable=True),
+)
+Table(
+    "chat_users",
+    metadata,
+    Column("chat_id", Integer, ForeignKey("chats.id"), primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+)
+Table(
+    "messages",
+    metadata,
+    *_base_columns(),
+    Column("content", Text, nullable=False),
+    Column("chat_id", Integer, ForeignKey("chats.id"), nullable=False),
+    Column("author_id", Integer, ForeignKey("users.id"), nullable=False),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection)
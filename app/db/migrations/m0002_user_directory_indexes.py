@@ -0,0 +1,24 @@
+"""Prefix indexes for the user directory typeahead.
+
+``lower(username)`` and ``lower(display_name)`` with ``text_pattern_ops`` let
+PostgreSQL answer ``lower(col) LIKE 'abc%'`` with an index range scan whatever
+the database collation. SQLite cannot use expression indexes for ``LIKE``, so
+it keeps scanning; it only serves development setups.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+_INDEXES = {
+    "ix_users_username_lower_prefix": "lower(username) text_pattern_ops",
+    "ix_users_display_name_lower_prefix": "lower(display_name) text_pattern_ops",
+}
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+    for name, expression in _INDEXES.items():
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON users ({expression})"))
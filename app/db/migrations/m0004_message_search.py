@@ -0,0 +1,46 @@
+"""Full-text search over message content.
+
+PostgreSQL gets a generated ``tsvector`` column with a GIN index, SQLite an
+external-content FTS5 table kept in sync by triggers and rebuilt once from the
+messages already stored.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Frozen here; app.models.message.SEARCH_TEXT_CONFIG must stay equal to it.
+_TEXT_CONFIG = "simple"
+
+_POSTGRES_DDL = (
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{_TEXT_CONFIG}', content)) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_messages_search_vector ON messages USING gin (search_vector)",
+)
+
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE messages_fts USING fts5(content, content='messages', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF content ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        statements = _POSTGRES_DDL
+    elif connection.dialect.name == "sqlite":
+        if connection.dialect.has_table(connection, "messages_fts"):
+            return
+        statements = _SQLITE_DDL
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
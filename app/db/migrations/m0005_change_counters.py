@@ -0,0 +1,18 @@
+"""Collection change counters backing the list validators."""
+
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Column, DateTime, MetaData, String, Table, func
+from sqlalchemy.engine import Connection
+
+change_counters = Table(
+    "change_counters",
+    MetaData(),
+    Column("name", String(32), primary_key=True),
+    Column("version", BigInteger, nullable=False, server_default="0"),
+    Column("changed_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    change_counters.create(connection, checkfirst=True)
@@ -0,0 +1,74 @@
+"""Convert ``messages`` to a table range-partitioned by month (PostgreSQL).
+
+The existing heap is renamed aside, a partitioned ``messages`` takes its
+place with partitions covering every stored month, the rows are copied over
+and the heap is dropped, all in the migration's transaction (which holds an
+``ACCESS EXCLUSIVE`` lock on the table until it commits). The id sequence
+moves to the new table. Skipped when ``messages`` is already partitioned.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.db.partitions import MonthPartition, add_months, ensure_partitions
+
+_COLUMNS = "id, created_at, updated_at, content, chat_id, author_id"
+
+_CREATE_PARTITIONED = (
+    "CREATE TABLE messages ("
+    "id INTEGER NOT NULL DEFAULT nextval('messages_id_seq'), "
+    "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(), "
+    "updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(), "
+    "content TEXT NOT NULL, "
+    "chat_id INTEGER NOT NULL REFERENCES chats (id) ON DELETE CASCADE, "
+    "author_id INTEGER NOT NULL REFERENCES users (id), "
+    # Same text search configuration as migration 0004.
+    "search_vector tsvector GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED, "
+    "CONSTRAINT messages_pkey PRIMARY KEY (id, created_at)"
+    ") PARTITION BY RANGE (created_at)"
+)
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+    kind = connection.scalar(text("SELECT relkind FROM pg_class WHERE oid = 'messages'::regclass"))
+    if kind == "p":
+        return
+
+    for statement in (
+        "LOCK TABLE messages IN ACCESS EXCLUSIVE MODE",
+        "ALTER TABLE messages RENAME TO messages_heap",
+        "ALTER TABLE messages_heap RENAME CONSTRAINT messages_pkey TO messages_heap_pkey",
+        "DROP INDEX IF EXISTS ix_messages_chat_created_id",
+        "DROP INDEX IF EXISTS ix_messages_search_vector",
+        _CREATE_PARTITIONED,
+        "CREATE INDEX ix_messages_chat_created_id ON messages (chat_id, created_at, id)",
+        "CREATE INDEX ix_messages_search_vector ON messages USING gin (search_vector)",
+    ):
+        connection.execute(text(statement))
+
+    oldest = connection.scalar(text("SELECT min(created_at) FROM messages_heap"))
+    ensure_partitions(connection, months_ahead=0)
+    if oldest is not None:
+        month = add_months(oldest.date(), 0)
+        current = add_months(datetime.now(timezone.utc).date(), 0)
+        while month < current:
+            partition = MonthPartition(month)
+            connection.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {partition.name} PARTITION OF messages "
+                    f"FOR VALUES FROM ('{partition.start}') TO ('{partition.end}')"
+                )
+            )
+            month = partition.end
+
+    connection.execute(
+        text(f"INSERT INTO messages ({_COLUMNS}) SELECT {_COLUMNS} FROM messages_heap")
+    )
+    connection.execute(text("ALTER SEQUENCE messages_id_seq OWNED BY messages.id"))
+    connection.execute(text("DROP TABLE messages_heap"))
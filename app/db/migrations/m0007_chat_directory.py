@@ -0,0 +1,33 @@
+"""Chat directory for sharding: the shard of every chat, and chat id allocation.
+
+Existing chats are registered on shard 0, the database they already live on,
+and the id sequence continues after them. Every shard gets the table, but only
+the home database's copy is used.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import Column, Index, Integer, MetaData, Table, text
+from sqlalchemy.engine import Connection
+
+chat_shards = Table(
+    "chat_shards",
+    MetaData(),
+    Column("chat_id", Integer, primary_key=True),
+    Column("shard", Integer, nullable=False, server_default="0"),
+    Index("ix_chat_shards_shard", "shard"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.has_table(connection, chat_shards.name):
+        return
+    chat_shards.create(connection)
+    connection.execute(text("INSERT INTO chat_shards (chat_id, shard) SELECT id, 0 FROM chats"))
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text(
+                "SELECT setval(pg_get_serial_sequence('chat_shards', 'chat_id'), "
+                "coalesce((SELECT max(chat_id) FROM chat_shards), 0) + 1, false)"
+            )
+        )
@@ -0,0 +1,26 @@
+"""Hourly and daily activity rollups per chat, author and total.
+
+Created empty; ``flask --app wsgi stats backfill`` fills them from existing
+history.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+activity_rollups = Table(
+    "activity_rollups",
+    MetaData(),
+    Column("granularity", String(8), primary_key=True),
+    Column("scope", String(8), primary_key=True),
+    Column("bucket_start", DateTime, primary_key=True),
+    Column("subject_id", Integer, primary_key=True),
+    Column("messages", Integer, nullable=False, server_default="0"),
+    Column("authors", Integer, nullable=False, server_default="0"),
+    Index("ix_activity_rollups_subject", "scope", "subject_id", "granularity", "bucket_start"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    activity_rollups.create(connection, checkfirst=True)
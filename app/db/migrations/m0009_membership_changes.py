@@ -0,0 +1,25 @@
+"""Membership change log for delta sync.
+
+Starts empty: clients without a sync token receive full chat state first.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, MetaData, String, Table, func
+from sqlalchemy.engine import Connection
+
+membership_changes = Table(
+    "membership_changes",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("chat_id", Integer, nullable=False),
+    Column("user_id", Integer, nullable=True),
+    Column("kind", String(8), nullable=False),
+    Column("version", BigInteger, nullable=False),
+    Column("changed_at", DateTime, nullable=False, server_default=func.now()),
+    Index("ix_membership_changes_chat_version", "chat_id", "version"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    membership_changes.create(connection, checkfirst=True)
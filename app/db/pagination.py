@@ -0,0 +1,86 @@
+"""Keyset pagination helpers."""
+
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class Page(Generic[T]):
+    """A single page of results plus the cursor for the next one."""
+
+    items: list[T] = field(default_factory=list)
+    next_cursor: str | None = None
+
+
+def encode_cursor(row_id: int) -> str:
+    """Encode the id of the last row on a page as an opaque token."""
+
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> int:
+    """Decode a token produced by :func:`encode_cursor`.
+
+    Raises ``ValueError`` for malformed tokens.
+    """
+
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return int(base64.urlsafe_b64decode(padded).decode())
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def encode_state(state: Any) -> str:
+    """Encode JSON-compatible resume state (e.g. sync cursors) as an opaque token."""
+
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_state(token: str) -> Any:
+    """Decode a token produced by :func:`encode_state`.
+
+    Raises ``ValueError`` for malformed tokens.
+    """
+
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded).decode())
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def encode_keyset(*values: float | int | str) -> str:
+    """Encode a multi-column keyset position (e.g. ``(rank, id)``) as a token."""
+
+    return encode_state(list(values))
+
+
+def decode_keyset(token: str, size: int) -> tuple[float | int | str, ...]:
+    """Decode a token produced by :func:`encode_keyset` with ``size`` values.
+
+    Raises ``ValueError`` for malformed tokens.
+    """
+
+    values = decode_state(token)
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
+
+__all__ = [
+    "Page",
+    "decode_cursor",
+    "decode_keyset",
+    "decode_state",
+    "encode_cursor",
+    "encode_keyset",
+    "encode_state",
+]
@@ -0,0 +1,211 @@
+"""Monthly range partitions of ``messages`` and archival of cold history.
+
+PostgreSQL only: on other dialects ``messages`` is a plain table and every
+function here is a no-op. Partitions are named ``messages_pYYYYMM`` and cover
+``[first day of month, first day of next month)``; a ``messages_default``
+partition catches rows outside the managed range so inserts never fail.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+try:  # pragma: no cover - optional dependency
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+PARTITION_PREFIX = "messages_p"
+DEFAULT_PARTITION = "messages_default"
+ARCHIVE_FORMATS = ("jsonl", "parquet")
+
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$")
+_ARCHIVE_COLUMNS = ("id", "chat_id", "author_id", "content", "created_at", "updated_at")
+
+
+@dataclass(frozen=True, slots=True)
+class MonthPartition:
+    """One monthly partition of ``messages``."""
+
+    start: date
+
+    @property
+    def end(self) -> date:
+        return add_months(self.start, 1)
+
+    @property
+    def name(self) -> str:
+        return f"{PARTITION_PREFIX}{self.start:%Y%m}"
+
+    @classmethod
+    def from_name(cls, name: str) -> MonthPartition | None:
+        match = _PARTITION_NAME.match(name)
+        if match is None:
+            return None
+        return cls(date(int(match.group(1)), int(match.group(2)), 1))
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month ``months`` after the month of ``day``."""
+
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(connection: Connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+
+def list_partitions(connection: Connection) -> list[MonthPartition]:
+    """Managed monthly partitions currently attached to ``messages``, oldest first."""
+
+    if not _is_partitioned(connection):
+        return []
+    names = connection.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = 'messages'"
+        )
+    )
+    partitions = (MonthPartition.from_name(name) for name in names)
+    return sorted((p for p in partitions if p is not None), key=lambda p: p.start)
+
+
+def ensure_partitions(
+    connection: Connection, months_ahead: int = 3, today: date | None = None
+) -> list[MonthPartition]:
+    """Create the current month's partition and ``months_ahead`` future ones.
+
+    Idempotent; returns the partitions that were created. Run it at startup
+    and from a periodic job (``flask messages partitions``) so the default
+    partition stays empty.
+    """
+
+    if not _is_partitioned(connection):
+        return []
+    current = add_months(today or datetime.now(timezone.utc).date(), 0)
+    existing = {partition.start for partition in list_partitions(connection)}
+    created = []
+    for offset in range(months_ahead + 1):
+        partition = MonthPartition(add_months(current, offset))
+        if partition.start in existing:
+            continue
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {partition.name} PARTITION OF messages "
+                f"FOR VALUES FROM ('{partition.start}') TO ('{partition.end}')"
+            )
+        )
+        created.append(partition)
+    connection.execute(
+        text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF messages DEFAULT")
+    )
+    return created
+
+
+def _rows(
+    connection: Connection, partition: MonthPartition, batch_size: int
+) -> Iterator[dict[str, Any]]:
+    result = connection.execution_options(yield_per=batch_size).execute(
+        text(f"SELECT {', '.join(_ARCHIVE_COLUMNS)} FROM {partition.name} ORDER BY id")
+    )
+    for row in result.mappings():
+        yield dict(row)
+
+
+def _write_jsonl(rows: Iterator[dict[str, Any]], path: Path) -> int:
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row, default=lambda value: value.isoformat()) + "\n")
+            count += 1
+    return count
+
+
+def _write_parquet(rows: Iterator[dict[str, Any]], path: Path, batch_size: int) -> int:
+    if pyarrow is None:
+        raise RuntimeError("Parquet archives require the 'pyarrow' package")
+    schema = pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("chat_id", pyarrow.int64()),
+            ("author_id", pyarrow.int64()),
+            ("content", pyarrow.string()),
+            ("created_at", pyarrow.timestamp("us")),
+            ("updated_at", pyarrow.timestamp("us")),
+        ]
+    )
+    count = 0
+    with pyarrow.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+        batch: list[dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                writer.write_batch(pyarrow.RecordBatch.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pyarrow.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def archive_partitions(
+    connection: Connection,
+    older_than: date,
+    directory: Path,
+    archive_format: str = "jsonl",
+    batch_size: int = 10_000,
+) -> list[tuple[MonthPartition, Path, int]]:
+    """Export partitions ending on or before ``older_than`` and drop them.
+
+    Each partition is streamed to ``directory`` (gzip JSONL or zstd Parquet)
+    before it is detached and dropped, committing after each partition, so an
+    interrupted run only has to be repeated. Returns ``(partition, file,
+    row_count)`` per archived partition.
+    """
+
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format: {archive_format}")
+    if not _is_partitioned(connection):
+        return []
+
+    directory.mkdir(parents=True, exist_ok=True)
+    archived = []
+    for partition in list_partitions(connection):
+        if partition.end > older_than:
+            break
+        rows = _rows(connection, partition, batch_size)
+        if archive_format == "parquet":
+            path = directory / f"{partition.name}.parquet"
+            count = _write_parquet(rows, path, batch_size)
+        else:
+            path = directory / f"{partition.name}.jsonl.gz"
+            count = _write_jsonl(rows, path)
+        connection.execute(text(f"ALTER TABLE messages DETACH PARTITION {partition.name}"))
+        connection.execute(text(f"DROP TABLE {partition.name}"))
+        connection.commit()
+        archived.append((partition, path, count))
+    return archived
+
+
+__all__ = [
+    "ARCHIVE_FORMATS",
+    "MonthPartition",
+    "add_months",
+    "archive_partitions",
+    "ensure_partitions",
+    "list_partitions",
+]
@@ -0,0 +1,84 @@
+"""Connection pool instrumentation."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy.pool import QueuePool
+
+
+@dataclass(slots=True)
+class PoolStats:
+    """Snapshot of a pool's checkout wait times and saturation."""
+
+    size: int
+    max_overflow: int
+    checked_out: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+    @property
+    def saturation(self) -> float:
+        """Fraction of the pool's total capacity currently checked out."""
+
+        capacity = self.size + max(self.max_overflow, 0)
+        return self.checked_out / capacity if capacity else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "size": self.size,
+            "max_overflow": self.max_overflow,
+            "checked_out": self.checked_out,
+            "saturation": round(self.saturation, 4),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+class TimedQueuePool(QueuePool):
+    """``QueuePool`` that records how long callers wait for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return connection
+
+    def stats(self) -> PoolStats:
+        with self._stats_lock:
+            return PoolStats(
+                size=self.size(),
+                max_overflow=self._max_overflow,
+                checked_out=self.checkedout(),
+                checkouts=self._checkouts,
+                timeouts=self._timeouts,
+                wait_seconds_total=self._wait_total,
+                wait_seconds_max=self._wait_max,
+            )
+
+
+__all__ = ["PoolStats", "TimedQueuePool"]
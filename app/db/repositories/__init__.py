@@ -1,8 +1,22 @@
 """Repository exports."""
 
 from .chat_repository import ChatRepository
+from .membership_repository import MembershipRepository
 from .message_repository import MessageRepository
+from .rollup_repository import RollupRepository
+from .search_repository import SearchRepository
+from .shard_repository import ShardRepository
 from .user_repository import UserRepository
+from .version_repository import VersionRepository
 
-__all__ = ["ChatRepository", "MessageRepository", "UserRepository"]
+__all__ = [
+    "ChatRepository",
+    "MembershipRepository",
+    "MessageRepository",
+    "RollupRepository",
+    "SearchRepository",
+    "ShardRepository",
+    "UserRepository",
+    "VersionRepository",
+]
 
@@ -2,12 +2,18 @@
 
 from __future__ import annotations
 
-from typing import Iterable, Optional, Sequence
+from datetime import datetime
+from typing import Any, Collection, Iterable, Mapping, Optional, Sequence
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, case, delete, func, or_, select, tuple_, update
+from sqlalchemy.orm import Session
 
+from app.db.pagination import Page, decode_cursor, decode_keyset, encode_cursor, encode_keyset
+from app.db.sql import insert_ignore, stored_timestamp
 from app.models import Chat, Message, User
+from app.models.chat import chat_users
+
+from .message_repository import MessageRepository
 
 
 class ChatRepository:
@@ -16,32 +22,314 @@ class ChatRepository:
     def __init__(self, session: Session) -> None:
         self._session = session
 
-    def create(self, title: str, description: str | None, participants: Sequence[User]) -> Chat:
-        chat = Chat(title=title, description=description)
-        chat.participants.extend(participants)
+    def create(
+        self,
+        title: str,
+        description: str | None,
+        participant_ids: Collection[int],
+        chat_id: int | None = None,
+    ) -> Chat:
+        """Insert a chat with its members; ``chat_id`` comes from the shard directory."""
+
+        chat = Chat(id=chat_id, title=title, description=description, last_activity_at=func.now())
         self._session.add(chat)
         self._session.flush()
+        self.ensure_participants(chat.id, participant_ids)
         return chat
 
     def get_by_id(self, chat_id: int) -> Optional[Chat]:
         return self._session.get(Chat, chat_id)
 
-    def get_with_messages(self, chat_id: int) -> Optional[Chat]:
+    def existing_ids(self, chat_ids: Collection[int]) -> set[int]:
+        """Return which of ``chat_ids`` exist, with a single ``IN`` query."""
+
+        if not chat_ids:
+            return set()
+        return set(self._session.scalars(select(Chat.id).where(Chat.id.in_(chat_ids))))
+
+    def titles(self, chat_ids: Collection[int]) -> dict[int, str]:
+        """Titles of the existing ``chat_ids``, with a single ``IN`` query."""
+
+        if not chat_ids:
+            return {}
+        rows = self._session.execute(select(Chat.id, Chat.title).where(Chat.id.in_(chat_ids)))
+        return {row.id: row.title for row in rows}
+
+    def sync_rows(self, chat_ids: Collection[int]) -> dict[int, Mapping[str, Any]]:
+        """Metadata and member counts of the existing ``chat_ids``, with a single ``IN`` query."""
+
+        if not chat_ids:
+            return {}
+        statement = select(
+            Chat.id,
+            Chat.title,
+            Chat.description,
+            Chat.last_message_id,
+            Chat.last_activity_at,
+            self._participant_count().label("participant_count"),
+        ).where(Chat.id.in_(chat_ids))
+        return {row["id"]: row for row in self._session.execute(statement).mappings()}
+
+    def list_chats(self) -> Iterable[Chat]:
+        return self._session.scalars(select(Chat).order_by(Chat.title.asc(), Chat.id.asc()))
+
+    def list_chat_rows(self) -> Sequence[Mapping[str, Any]]:
+        """Project chat columns and member counts as plain mappings."""
+
+        statement = select(
+            Chat.id,
+            Chat.title,
+            Chat.description,
+            self._participant_count().label("participant_count"),
+        ).order_by(Chat.title.asc(), Chat.id.asc())
+        return self._session.execute(statement).mappings().all()
+
+    def count_participants(self, chat_id: int) -> int:
+        return self._session.scalar(
+            select(func.count()).select_from(chat_users).where(chat_users.c.chat_id == chat_id)
+        )
+
+    def is_participant(self, chat_id: int, user_id: int) -> bool:
+        """Membership check as an ``EXISTS`` probe of the ``chat_users`` primary key."""
+
+        membership = (
+            select(chat_users.c.user_id)
+            .where(chat_users.c.chat_id == chat_id, chat_users.c.user_id == user_id)
+            .exists()
+        )
+        return bool(self._session.scalar(select(membership)))
+
+    def list_participant_page(
+        self, chat_id: int, after: str | None = None, limit: int = 50
+    ) -> Page[Mapping[str, Any]]:
+        """Members of a chat ordered by user id, keyset-paginated over ``chat_users``."""
+
+        statement = (
+            select(User.id, User.username, User.display_name, User.email)
+            .join(chat_users, chat_users.c.user_id == User.id)
+            .where(chat_users.c.chat_id == chat_id)
+            .order_by(chat_users.c.user_id)
+            .limit(limit + 1)
+        )
+        if after:
+            statement = statement.where(chat_users.c.user_id > decode_cursor(after))
+        rows = list(self._session.execute(statement).mappings())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["id"]) if has_more else None
+        return Page(items=rows, next_cursor=next_cursor)
+
+    def participant_ids(self, chat_id: int, after: int = 0, limit: int = 1000) -> list[int]:
+        """Up to ``limit`` member ids above ``after``, read from the ``chat_users`` key alone."""
+
+        statement = (
+            select(chat_users.c.user_id)
+            .where(chat_users.c.chat_id == chat_id, chat_users.c.user_id > after)
+            .order_by(chat_users.c.user_id)
+            .limit(limit)
+        )
+        return list(self._session.scalars(statement))
+
+    def member_ids(self, chat_ids: Collection[int]) -> dict[int, list[int]]:
+        """Member ids of every chat in ``chat_ids``, with a single ``IN`` query."""
+
+        if not chat_ids:
+            return {}
+        statement = (
+            select(chat_users.c.chat_id, chat_users.c.user_id)
+            .where(chat_users.c.chat_id.in_(chat_ids))
+            .order_by(chat_users.c.chat_id, chat_users.c.user_id)
+        )
+        members: dict[int, list[int]] = {chat_id: [] for chat_id in chat_ids}
+        for chat_id, user_id in self._session.execute(statement):
+            members[chat_id].append(user_id)
+        return members
+
+    def add_participants(self, chat_id: int, user_ids: Collection[int]) -> list[int]:
+        """Add users in one ``INSERT ... ON CONFLICT DO NOTHING``; returns the newly added ids."""
+
+        if not user_ids:
+            return []
+        statement = insert_ignore(self._session, chat_users).returning(chat_users.c.user_id)
+        result = self._session.execute(
+            statement, [{"chat_id": chat_id, "user_id": user_id} for user_id in user_ids]
+        )
+        return sorted(result.scalars())
+
+    def remove_participants(self, chat_id: int, user_ids: Collection[int]) -> list[int]:
+        """Remove users with one set-based ``DELETE``; returns the ids actually removed."""
+
+        if not user_ids:
+            return []
+        statement = (
+            delete(chat_users)
+            .where(chat_users.c.chat_id == chat_id, chat_users.c.user_id.in_(user_ids))
+            .returning(chat_users.c.user_id)
+        )
+        return sorted(self._session.execute(statement).scalars())
+
+    @staticmethod
+    def _participant_count() -> Any:
+        return (
+            select(func.count())
+            .select_from(chat_users)
+            .where(chat_users.c.chat_id == Chat.id)
+            .scalar_subquery()
+        )
+
+    def ensure_participants(self, chat_id: int, user_ids: Collection[int]) -> list[int]:
+        """Add users to a chat with one idempotent multi-row upsert; returns who joined."""
+
+        return self.add_participants(chat_id, user_ids)
+
+    def touch(self, chat_id: int) -> None:
+        """Advance ``updated_at`` after a change that does not write the ``chats`` row."""
+
+        self._session.execute(update(Chat).where(Chat.id == chat_id).values(updated_at=func.now()))
+
+    def last_message_id(self, chat_id: int) -> Optional[int]:
+        """``chats.last_message_id`` by primary key; ``None`` for an empty or unknown chat."""
+
+        return self._session.scalar(select(Chat.last_message_id).where(Chat.id == chat_id))
+
+    def version_row(self, chat_id: int, collection_version: Any) -> Optional[Any]:
+        """``(updated_at, last_message_id, collection_version)`` of one chat, column-only."""
+
+        statement = select(
+            Chat.updated_at, Chat.last_message_id, collection_version.label("collection_version")
+        ).where(Chat.id == chat_id)
+        return self._session.execute(statement).first()
+
+    def record_activity(
+        self,
+        chat_id: int,
+        last_message_id: int,
+        last_activity_at: datetime,
+        authored: Mapping[int, int],
+    ) -> None:
+        """Advance the chat summary and members' unread counters after a send.
+
+        ``authored`` maps author id to the number of new messages they wrote;
+        every member's counter grows by the messages written by someone else.
+        The summary only moves forward in ``(created_at, id)`` order: a send
+        whose update lands after a newer one's leaves it untouched.
+        """
+
+        activity = stored_timestamp(self._session, last_activity_at)
+        self._session.execute(
+            update(Chat)
+            .where(
+                Chat.id == chat_id,
+                or_(
+                    Chat.last_message_id.is_(None),
+                    tuple_(Chat.last_activity_at, Chat.last_message_id)
+                    < tuple_(activity, last_message_id),
+                ),
+            )
+            .values(last_message_id=last_message_id, last_activity_at=activity)
+        )
+        total = sum(authored.values())
+        own = case(
+            {author_id: count for author_id, count in authored.items()},
+            value=chat_users.c.user_id,
+            else_=0,
+        )
+        self._session.execute(
+            update(chat_users)
+            .where(chat_users.c.chat_id == chat_id)
+            .values(unread_count=chat_users.c.unread_count + total - own)
+        )
+
+    def mark_read(self, chat_id: int, user_id: int, message_id: int | None) -> Optional[dict[str, Any]]:
+        """Move a member's read cursor; ``None`` means up to the latest message.
+
+        Messages are ordered by ``(created_at, id)``, not by id alone: a chat
+        moved between shards keeps its ids while new ones come from the target
+        shard's sequence. Returns the new cursor state, or ``None`` if the user
+        is not a member.
+        """
+
+        chat = self.get_by_id(chat_id)
+        if chat is None:
+            return None
+        last_read, unread = chat.last_message_id, 0
+        if message_id is not None and message_id != chat.last_message_id:
+            unread = self._session.scalar(
+                select(func.count())
+                .select_from(Message)
+                .where(Message.chat_id == chat_id, *MessageRepository.newer_than(message_id))
+            )
+            if unread:
+                last_read = message_id
+
+        result = self._session.execute(
+            update(chat_users)
+            .where(chat_users.c.chat_id == chat_id, chat_users.c.user_id == user_id)
+            .values(last_read_message_id=last_read, unread_count=unread)
+        )
+        if result.rowcount == 0:
+            return None
+        return {
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "last_read_message_id": last_read,
+            "unread_count": unread,
+        }
+
+    def list_inbox(self, user_id: int, before: str | None = None, limit: int = 50) -> Page[Any]:
+        """Return a user's chats by last activity with preview and unread count.
+
+        Reads only the denormalized summary columns: one join of the user's
+        ``chat_users`` rows with ``chats`` and the single last message of each.
+        The cursor carries the last row's ``(last_activity_at, id)`` rather than
+        re-reading that chat, whose activity moves with every send.
+        """
+
         statement = (
-            select(Chat)
-            .options(
-                selectinload(Chat.messages).selectinload(Message.author),
-                selectinload(Chat.participants),
+            select(
+                Chat.id,
+                Chat.title,
+                Chat.description,
+                Chat.last_activity_at,
+                chat_users.c.unread_count,
+                chat_users.c.last_read_message_id,
+                Message.id.label("last_message_id"),
+                Message.content.label("last_message_content"),
+                Message.author_id.label("last_message_author_id"),
+                Message.created_at.label("last_message_created_at"),
             )
-            .where(Chat.id == chat_id)
+            .join(chat_users, chat_users.c.chat_id == Chat.id)
+            .outerjoin(Message, Message.id == Chat.last_message_id)
+            .where(chat_users.c.user_id == user_id)
+            .order_by(Chat.last_activity_at.desc(), Chat.id.desc())
+            .limit(limit + 1)
         )
-        return self._session.scalar(statement)
+        if before:
+            activity, chat_id = self.decode_inbox_cursor(before)
+            anchor = stored_timestamp(self._session, activity)
+            statement = statement.where(
+                or_(
+                    Chat.last_activity_at < anchor,
+                    and_(Chat.last_activity_at == anchor, Chat.id < chat_id),
+                )
+            )
 
-    def list_chats(self) -> Iterable[Chat]:
-        statement = select(Chat).options(selectinload(Chat.participants)).order_by(Chat.title.asc())
-        return self._session.scalars(statement)
+        rows = list(self._session.execute(statement))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = self.encode_inbox_cursor(rows[-1]) if has_more else None
+        return Page(items=rows, next_cursor=next_cursor)
+
+    @staticmethod
+    def encode_inbox_cursor(row: Any) -> str:
+        return encode_keyset(row.last_activity_at.isoformat(), row.id)
 
-    def add_participant(self, chat: Chat, user: User) -> None:
-        if user not in chat.participants:
-            chat.participants.append(user)
+    @staticmethod
+    def decode_inbox_cursor(token: str) -> tuple[datetime, int]:
+        """Raises ``ValueError`` for malformed tokens."""
 
+        activity, chat_id = decode_keyset(token, 2)
+        try:
+            return datetime.fromisoformat(str(activity)), int(chat_id)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
@@ -0,0 +1,57 @@
+"""Repository for the membership change log (``membership_changes``)."""
+
+from __future__ import annotations
+
+from typing import Any, Collection, Iterable, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models import MembershipChange
+
+JOINED = "joined"
+LEFT = "left"
+RESET = "reset"
+
+
+class MembershipRepository:
+    """Appends and reads one shard's membership changes, numbered by its chats counter."""
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def record(self, chat_id: int, kind: str, user_ids: Iterable[int], version: int) -> None:
+        """Log ``user_ids`` joining or leaving ``chat_id`` inside the caller's transaction."""
+
+        rows = [
+            {"chat_id": chat_id, "user_id": user_id, "kind": kind, "version": version}
+            for user_id in user_ids
+        ]
+        if rows:
+            self._session.execute(insert(MembershipChange), rows)
+
+    def reset(self, chat_id: int, version: int) -> None:
+        """Mark ``chat_id``'s earlier changes as unreadable here, e.g. after a move."""
+
+        self._session.execute(
+            insert(MembershipChange).values(chat_id=chat_id, kind=RESET, version=version)
+        )
+
+    def changes(self, chat_ids: Collection[int], after: int, upto: int) -> Sequence[Any]:
+        """``(chat_id, user_id, kind)`` rows with ``after < version <= upto``, oldest first."""
+
+        if not chat_ids:
+            return []
+        statement = (
+            select(MembershipChange.chat_id, MembershipChange.user_id, MembershipChange.kind)
+            .where(
+                MembershipChange.chat_id.in_(chat_ids),
+                MembershipChange.version > after,
+                MembershipChange.version <= upto,
+            )
+            .order_by(MembershipChange.version, MembershipChange.id)
+        )
+        return self._session.execute(statement).all()
+
+
+__all__ = ["JOINED", "LEFT", "MembershipRepository", "RESET"]
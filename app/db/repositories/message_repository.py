@@ -2,19 +2,40 @@
 
 from __future__ import annotations
 
-from typing import Iterable
+from datetime import datetime
+from typing import Any, Callable, Iterator, Mapping, Sequence
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import (
+    Integer,
+    and_,
+    cast,
+    column,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    true,
+    tuple_,
+    values,
+)
+from sqlalchemy.orm import Session, aliased, selectinload
 
-from app.models import Chat, Message, User
+from app.db.pagination import Page, decode_cursor, encode_cursor
+from app.db.sql import insert_ignore, upsert
+from app.models import ChangeCounter, Chat, Message, User
+from app.models.chat import chat_users
+
+from .version_repository import MESSAGE_IDS
 
 
 class MessageRepository:
     """Encapsulates message-related queries."""
 
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: Session, id_range: tuple[int, int] | None = None) -> None:
         self._session = session
+        self._id_range = id_range
 
     def create(self, chat: Chat, author: User, content: str) -> Message:
         message = Message(chat=chat, author=author, content=content)
@@ -22,12 +43,361 @@ class MessageRepository:
         self._session.flush()
         return message
 
-    def list_for_chat(self, chat_id: int) -> Iterable[Message]:
+    def create_as_participant(
+        self, chat_id: int, author_id: int, content: str
+    ) -> tuple[Message, bool]:
+        """Insert a message and make sure its author is a chat participant.
+
+        On PostgreSQL the membership upsert rides along as a data-modifying CTE,
+        so the whole write is one statement; other dialects issue the upsert
+        separately. ``id``/``created_at`` come back via ``RETURNING`` and the
+        returned ``Message`` is transient, so serializing it never reloads the
+        row. The flag tells whether the author joined the chat with this send.
+        Missing chats or users surface as ``IntegrityError`` from the foreign
+        keys.
+        """
+
+        membership = (
+            insert_ignore(self._session, chat_users)
+            .values(chat_id=chat_id, user_id=author_id)
+            .returning(chat_users.c.user_id)
+        )
+        statement = insert(Message).values(chat_id=chat_id, author_id=author_id, content=content)
+        if self._session.get_bind().dialect.name == "postgresql":
+            joined = select(func.count()).select_from(membership.cte("membership"))
+            statement = statement.returning(
+                Message.id, Message.created_at, joined.scalar_subquery().label("joined")
+            )
+            row = self._session.execute(statement).one()
+            joined_chat = bool(row.joined)
+        else:
+            joined_chat = self._session.execute(membership).first() is not None
+            ids = self._allocate_ids(1)
+            if ids is not None:
+                statement = statement.values(id=ids[0])
+            row = self._session.execute(statement.returning(Message.id, Message.created_at)).one()
+
+        message = Message(
+            id=row.id,
+            chat_id=chat_id,
+            author_id=author_id,
+            content=content,
+            created_at=row.created_at,
+        )
+        return message, joined_chat
+
+    def create_many(
+        self, chat_id: int, rows: Sequence[tuple[int, str]]
+    ) -> list[tuple[int, datetime]]:
+        """Insert ``(author_id, content)`` rows in bulk.
+
+        Runs as multi-row ``INSERT ... RETURNING`` batches and returns
+        ``(id, created_at)`` pairs in input order without loading ORM objects.
+        """
+
+        if not rows:
+            return []
+        statement = insert(Message).returning(
+            Message.id, Message.created_at, sort_by_parameter_order=True
+        )
+        params = [
+            {"chat_id": chat_id, "author_id": author_id, "content": content}
+            for author_id, content in rows
+        ]
+        ids = self._allocate_ids(len(rows))
+        if ids is not None:
+            for param, message_id in zip(params, ids):
+                param["id"] = message_id
+        result = self._session.execute(statement, params)
+        return [(row.id, row.created_at) for row in result]
+
+    def list_for_chat(self, chat_id: int, before: str | None = None, limit: int = 50) -> Page[Message]:
+        """Return up to ``limit`` messages older than the ``before`` cursor.
+
+        Pages are walked newest-first over ``(created_at, id)`` so every page is
+        a range scan on ``ix_messages_chat_created_id``; items inside a page are
+        returned in chronological order. The cursor carries the id of the last
+        row seen and its ``created_at`` is compared as stored, not re-bound.
+        See :meth:`_fetch_history` for partition pruning.
+        """
+
         statement = (
             select(Message)
             .options(selectinload(Message.author))
             .where(Message.chat_id == chat_id)
-            .order_by(Message.created_at.asc())
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit + 1)
+        )
+        rows, more = self._fetch_history(
+            statement, before, limit, lambda query: list(self._session.scalars(query))
+        )
+        return self._page(rows, limit, lambda row: row.id, more)
+
+    def list_rows_for_chat(
+        self, chat_id: int, before: str | None = None, limit: int = 50
+    ) -> Page[Mapping[str, Any]]:
+        """Same page as :meth:`list_for_chat`, projected as plain mappings.
+
+        Message and author columns come from one join, so no ORM objects or
+        identity-map entries are created. Author columns are ``author_``-prefixed.
+        """
+
+        statement = (
+            self._select_rows()
+            .where(Message.chat_id == chat_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit + 1)
+        )
+        rows, more = self._fetch_history(
+            statement, before, limit, lambda query: list(self._session.execute(query).mappings())
+        )
+        return self._page(rows, limit, lambda row: row["id"], more)
+
+    def stream_rows_for_chat(
+        self, chat_id: int, after_id: int | None = None, batch_size: int = 1000
+    ) -> Iterator[Mapping[str, Any]]:
+        """Yield every message of a chat oldest-first, optionally after ``after_id``.
+
+        Rows come from a server-side cursor in ``batch_size`` chunks
+        (``yield_per``), so memory stays flat however long the chat is. The
+        result must be consumed while the session is still open.
+        """
+
+        statement = (
+            self._select_rows()
+            .where(Message.chat_id == chat_id)
+            .order_by(Message.created_at.asc(), Message.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        if after_id is not None:
+            statement = statement.where(*self.newer_than(after_id))
+        yield from self._session.execute(statement).mappings()
+
+    def list_rows_after(
+        self, chat_id: int, after_id: int, limit: int = 50
+    ) -> Page[Mapping[str, Any]]:
+        """Up to ``limit`` messages newer than ``after_id``, oldest-first (delta sync).
+
+        ``next_cursor`` is set when more rows follow the returned ones.
+        """
+
+        statement = (
+            self._select_rows()
+            .where(Message.chat_id == chat_id, *self.newer_than(after_id))
+            .order_by(Message.created_at.asc(), Message.id.asc())
+            .limit(limit + 1)
+        )
+        rows = list(self._session.execute(statement).mappings())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["id"]) if has_more else None
+        return Page(items=rows, next_cursor=next_cursor)
+
+    def list_rows_after_many(
+        self, cursors: Mapping[int, int], limit: int
+    ) -> dict[int, list[Mapping[str, Any]]]:
+        """Up to ``limit + 1`` messages after each chat's cursor, oldest-first, in one query.
+
+        ``cursors`` maps chat id to the last message id seen, ``0`` for none.
+        Each chat is compared in ``(created_at, id)`` order from its cursor
+        message, as in :meth:`newer_than`; a cursor that no longer exists
+        (archived) counts as none. Every chat is capped separately, and a
+        ``limit + 1``-th row tells the caller it has more.
+
+        On PostgreSQL each chat is a ``LATERAL ... LIMIT`` range scan of
+        ``ix_messages_chat_created_id``, so a chat's cost is bounded by
+        ``limit`` rather than its backlog; other dialects number the rows
+        after every cursor with ``ROW_NUMBER()`` and keep the first ones.
+        """
+
+        if not cursors:
+            return {}
+        if self._session.get_bind().dialect.name == "postgresql":
+            statement = self._rows_after_lateral(cursors, limit)
+        else:
+            statement = self._rows_after_window(cursors, limit)
+        rows: dict[int, list[Mapping[str, Any]]] = {}
+        for row in self._session.execute(statement).mappings():
+            rows.setdefault(row["chat_id"], []).append(row)
+        return rows
+
+    def _rows_after_lateral(self, cursors: Mapping[int, int], limit: int) -> Any:
+        positions = values(
+            column("chat_id", Integer), column("after_id", Integer), name="cursors"
+        ).data(list(cursors.items()))
+        anchor = aliased(Message, name="anchor")
+        start = tuple_(
+            func.coalesce(anchor.created_at, cast(literal("-infinity"), Message.created_at.type)),
+            func.coalesce(anchor.id, 0),
+        )
+        page = (
+            self._select_rows()
+            .where(
+                Message.chat_id == positions.c.chat_id,
+                tuple_(Message.created_at, Message.id) > start,
+            )
+            .order_by(Message.created_at, Message.id)
+            .limit(limit + 1)
+            .lateral("page")
         )
-        return self._session.scalars(statement)
+        return (
+            select(page)
+            .select_from(positions)
+            .outerjoin(
+                anchor,
+                and_(anchor.chat_id == positions.c.chat_id, anchor.id == positions.c.after_id),
+            )
+            .join(page, true())
+            .order_by(page.c.chat_id, page.c.created_at, page.c.id)
+        )
+
+    def _rows_after_window(self, cursors: Mapping[int, int], limit: int) -> Any:
+        seen = [(chat_id, message_id) for chat_id, message_id in cursors.items() if message_id]
+        anchors = (
+            select(Message.chat_id, Message.created_at, Message.id)
+            .where(tuple_(Message.chat_id, Message.id).in_(seen) if seen else False)
+            .subquery("anchors")
+        )
+        position = (
+            func.row_number()
+            .over(partition_by=Message.chat_id, order_by=(Message.created_at, Message.id))
+            .label("position")
+        )
+        ranked = (
+            self._select_rows()
+            .add_columns(position)
+            .outerjoin(anchors, anchors.c.chat_id == Message.chat_id)
+            .where(
+                Message.chat_id.in_(list(cursors)),
+                or_(
+                    anchors.c.id.is_(None),
+                    Message.created_at > anchors.c.created_at,
+                    and_(Message.created_at == anchors.c.created_at, Message.id > anchors.c.id),
+                ),
+            )
+            .subquery("ranked")
+        )
+        return (
+            select(ranked)
+            .where(ranked.c.position <= limit + 1)
+            .order_by(ranked.c.chat_id, ranked.c.position)
+        )
+
+    def first_created_at(self) -> datetime | None:
+        """``created_at`` of the oldest message, ``None`` when there is none."""
+
+        return self._session.scalar(select(func.min(Message.created_at)))
+
+    @staticmethod
+    def newer_than(after_id: int) -> tuple[Any, ...]:
+        """Predicates for rows after message ``after_id`` in ``(created_at, id)`` order."""
+
+        anchor = select(Message.created_at).where(Message.id == after_id).scalar_subquery()
+        return (
+            Message.created_at >= anchor,
+            or_(
+                Message.created_at > anchor,
+                and_(Message.created_at == anchor, Message.id > after_id),
+            ),
+        )
+
+    @staticmethod
+    def _select_rows() -> Any:
+        """Message columns plus ``author_``-prefixed author columns, joined once."""
+
+        return select(
+            Message.id,
+            Message.content,
+            Message.chat_id,
+            Message.author_id,
+            Message.created_at,
+            User.username.label("author_username"),
+            User.display_name.label("author_display_name"),
+            User.email.label("author_email"),
+        ).join(User, User.id == Message.author_id)
+
+    def _allocate_ids(self, count: int) -> list[int] | None:
+        """Ids for ``count`` new messages on SQLite; ``None`` where a sequence assigns them.
+
+        SQLite would continue after the largest id in the table, which after
+        a move can be in another shard's range or reuse a moved chat's ids.
+        Like a PostgreSQL sequence, the ``message_ids`` counter is a
+        high-water mark inside this shard's ``id_range``; it is seeded from
+        the largest id in the range on first use, and its row lock keeps
+        concurrent sends from taking the same ids.
+        """
+
+        if self._id_range is None or self._session.get_bind().dialect.name != "sqlite":
+            return None
+        low, high = self._id_range
+        table = ChangeCounter.__table__
+        seed = (
+            select(func.coalesce(func.max(Message.id), low - 1))
+            .where(Message.id >= low, Message.id < high)
+            .scalar_subquery()
+        )
+        statement = upsert(
+            self._session,
+            table,
+            ["name"],
+            {"version": table.c.version + count, "changed_at": func.now()},
+        ).values(name=MESSAGE_IDS, version=seed + count, changed_at=func.now())
+        last = self._session.execute(statement.returning(table.c.version)).scalar_one()
+        if last >= high:
+            raise RuntimeError(f"Message ids in [{low}, {high}) are exhausted on this shard")
+        return list(range(last - count + 1, last + 1))
+
+    def _fetch_history(
+        self,
+        statement: Any,
+        before: str | None,
+        limit: int,
+        fetch: Callable[[Any], list[Any]],
+    ) -> tuple[list[Any], bool]:
+        """Run a newest-first history query, scanning recent partitions first.
+
+        Returns the rows and whether older rows may follow even if no more
+        than ``limit`` came back. On PostgreSQL ``messages`` is partitioned by
+        month, so the query is bounded to the anchor's month and the one
+        before it. A window holding some but at most ``limit`` rows is returned
+        as a short page whose cursor continues from its oldest row, i.e. in
+        older months; only an empty window is followed by one query over the
+        partitions below it. Every bound is a stable expression, so the
+        planner prunes partitions at executor start.
+        """
+
+        anchor = None
+        if before:
+            message_id = decode_cursor(before)
+            anchor = select(Message.created_at).where(Message.id == message_id).scalar_subquery()
+            statement = statement.where(
+                Message.created_at <= anchor,
+                or_(
+                    Message.created_at < anchor,
+                    and_(Message.created_at == anchor, Message.id < message_id),
+                ),
+            )
+        if self._session.get_bind().dialect.name != "postgresql":
+            return fetch(statement), False
+
+        reference = anchor if anchor is not None else func.localtimestamp()
+        window_start = func.date_trunc("month", reference) - text("interval '1 month'")
+        rows = fetch(statement.where(Message.created_at >= window_start))
+        if rows:
+            return rows, True
+        return fetch(statement.where(Message.created_at < window_start)), False
+
+    @staticmethod
+    def _page(
+        rows: list[Any], limit: int, row_id: Callable[[Any], int], more: bool = False
+    ) -> Page[Any]:
+        """Trim the ``limit + 1`` probe row and flip to chronological order.
+
+        ``more`` keeps a cursor on a short page when older rows may still exist.
+        """
 
+        has_more = len(rows) > limit or (more and bool(rows))
+        rows = rows[:limit]
+        next_cursor = encode_cursor(row_id(rows[-1])) if has_more else None
+        rows.reverse()
+        return Page(items=rows, next_cursor=next_cursor)
@@ -0,0 +1,264 @@
+"""Repository for hourly and daily activity rollups (``activity_rollups``)."""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, Sequence
+
+from sqlalchemy import delete, desc, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.db.sql import excluded, stored_timestamp, upsert
+from app.models import ActivityRollup, Message
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = (HOUR, DAY)
+CHAT = "chat"
+AUTHOR = "author"
+TOTAL = "total"
+# Rows per bucket that ``total`` counters are spread over.
+ROLLUP_STRIPES = 16
+
+_KEY = ["granularity", "scope", "bucket_start", "subject_id"]
+_SQLITE_FORMATS = {HOUR: "%Y-%m-%d %H:00:00", DAY: "%Y-%m-%d 00:00:00"}
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    """Start of the ``granularity`` bucket containing ``value``."""
+
+    start = value.replace(minute=0, second=0, microsecond=0)
+    return start.replace(hour=0) if granularity == DAY else start
+
+
+def bucket_starts(since: datetime, until: datetime, granularity: str) -> Iterator[datetime]:
+    """Every bucket start from the one containing ``since`` up to ``until`` (exclusive)."""
+
+    step = timedelta(days=1) if granularity == DAY else timedelta(hours=1)
+    start = bucket_start(since, granularity)
+    while start < until:
+        yield start
+        start += step
+
+
+class RollupRepository:
+    """Maintains and reads the activity counters of one shard.
+
+    Sends are counted in the transaction that stores them, so the counters
+    are exact and move with the commit; reads touch one row per bucket and
+    stripe instead of scanning ``messages``.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def record(self, sends: Iterable[tuple[int, int, datetime]]) -> None:
+        """Count ``(chat_id, author_id, created_at)`` sends inside the caller's transaction.
+
+        Three multi-row upserts whatever the number of sends. An author row
+        the upsert creates marks the author's first message in that bucket,
+        which is what the ``total`` rows' ``authors`` count.
+        """
+
+        chats: Counter[tuple[str, datetime, int]] = Counter()
+        authors: Counter[tuple[str, datetime, int]] = Counter()
+        for chat_id, author_id, created_at in sends:
+            for granularity in GRANULARITIES:
+                start = bucket_start(created_at, granularity)
+                chats[granularity, start, chat_id] += 1
+                authors[granularity, start, author_id] += 1
+        if not chats:
+            return
+
+        self._add(CHAT, chats)
+        counts = self._add(AUTHOR, authors, returning=True)
+        new_authors = Counter(
+            (granularity, start, author_id % ROLLUP_STRIPES)
+            for (granularity, start, author_id), count in authors.items()
+            if counts.get((granularity, start, author_id)) == count
+        )
+        chat_stripes: Counter[tuple[str, datetime, int]] = Counter()
+        for (granularity, start, chat_id), count in chats.items():
+            chat_stripes[granularity, start, chat_id % ROLLUP_STRIPES] += count
+        self._add(TOTAL, chat_stripes, new_authors)
+
+    def series(
+        self,
+        granularity: str,
+        since: datetime,
+        until: datetime,
+        scope: str = TOTAL,
+        subject_id: int | None = None,
+    ) -> Sequence[Any]:
+        """``(bucket_start, messages, authors)`` per non-empty bucket in ``[since, until)``.
+
+        ``total`` rows sum their stripes; ``chat`` and ``author`` rows need a
+        ``subject_id``.
+        """
+
+        statement = (
+            select(
+                ActivityRollup.bucket_start,
+                func.sum(ActivityRollup.messages).label("messages"),
+                func.sum(ActivityRollup.authors).label("authors"),
+            )
+            .where(*self._range(granularity, scope, since, until))
+            .group_by(ActivityRollup.bucket_start)
+            .order_by(ActivityRollup.bucket_start)
+        )
+        if subject_id is not None:
+            statement = statement.where(ActivityRollup.subject_id == subject_id)
+        return self._session.execute(statement).all()
+
+    def top(
+        self, granularity: str, since: datetime, until: datetime, scope: str, limit: int
+    ) -> Sequence[Any]:
+        """``(subject_id, messages)`` of the ``limit`` busiest subjects in ``[since, until)``."""
+
+        messages = func.sum(ActivityRollup.messages).label("messages")
+        statement = (
+            select(ActivityRollup.subject_id, messages)
+            .where(*self._range(granularity, scope, since, until))
+            .group_by(ActivityRollup.subject_id)
+            .order_by(desc(messages), ActivityRollup.subject_id)
+            .limit(limit)
+        )
+        return self._session.execute(statement).all()
+
+    def rebuild(self, start: datetime, end: datetime) -> int:
+        """Recount every bucket in ``[start, end)`` from ``messages``; returns the message count.
+
+        Meant for closed days: a send committed into a bucket while it is
+        being rebuilt could be counted twice or not at all.
+        """
+
+        session = self._session
+        table = ActivityRollup.__table__
+        lower, upper = stored_timestamp(session, start), stored_timestamp(session, end)
+        session.execute(
+            delete(ActivityRollup).where(
+                ActivityRollup.bucket_start >= lower, ActivityRollup.bucket_start < upper
+            )
+        )
+        in_range = (Message.created_at >= lower, Message.created_at < upper)
+        columns = [*_KEY, "messages", "authors"]
+        for granularity in GRANULARITIES:
+            bucket = self._truncate(granularity)
+            groupings = (
+                (CHAT, Message.chat_id, func.count(), literal(0)),
+                (AUTHOR, Message.author_id, func.count(), literal(0)),
+                (TOTAL, Message.chat_id % ROLLUP_STRIPES, func.count(), literal(0)),
+            )
+            for scope, subject, messages, authors in groupings:
+                counts = (
+                    select(literal(granularity), literal(scope), bucket, subject, messages, authors)
+                    .where(*in_range)
+                    .group_by(bucket, subject)
+                )
+                session.execute(insert(table).from_select(columns, counts))
+            stripe = Message.author_id % ROLLUP_STRIPES
+            active = (
+                select(
+                    literal(granularity),
+                    literal(TOTAL),
+                    bucket,
+                    stripe,
+                    literal(0),
+                    func.count(Message.author_id.distinct()),
+                )
+                .where(*in_range)
+                .group_by(bucket, stripe)
+            )
+            session.execute(
+                upsert(session, table, _KEY, {"authors": excluded("authors")}).from_select(
+                    columns, active
+                )
+            )
+        counted = session.scalar(
+            select(func.sum(ActivityRollup.messages)).where(
+                *self._range(DAY, TOTAL, start, end)
+            )
+        )
+        return int(counted or 0)
+
+    def _add(
+        self,
+        scope: str,
+        messages: Counter[tuple[str, datetime, int]],
+        authors: Counter[tuple[str, datetime, int]] | None = None,
+        returning: bool = False,
+    ) -> dict[tuple[str, datetime, int], int]:
+        """Add counts to ``scope`` rows; with ``returning``, the new ``messages`` per key.
+
+        Keys go in sorted so concurrent transactions lock shared rows in the
+        same order.
+        """
+
+        authors = authors or Counter()
+        table = ActivityRollup.__table__
+        rows = [
+            {
+                "granularity": granularity,
+                "scope": scope,
+                "bucket_start": stored_timestamp(self._session, start),
+                "subject_id": subject_id,
+                "messages": messages[granularity, start, subject_id],
+                "authors": authors[granularity, start, subject_id],
+            }
+            for granularity, start, subject_id in sorted(set(messages) | set(authors))
+        ]
+        statement = upsert(
+            self._session,
+            table,
+            _KEY,
+            {
+                "messages": table.c.messages + excluded("messages"),
+                "authors": table.c.authors + excluded("authors"),
+            },
+        ).values(rows)
+        if not returning:
+            self._session.execute(statement)
+            return {}
+        statement = statement.returning(
+            table.c.granularity, table.c.bucket_start, table.c.subject_id, table.c.messages
+        )
+        return {
+            (row.granularity, row.bucket_start, row.subject_id): row.messages
+            for row in self._session.execute(statement)
+        }
+
+    def _range(
+        self, granularity: str, scope: str, since: datetime, until: datetime
+    ) -> tuple[Any, ...]:
+        return (
+            ActivityRollup.granularity == granularity,
+            ActivityRollup.scope == scope,
+            ActivityRollup.bucket_start >= stored_timestamp(self._session, since),
+            ActivityRollup.bucket_start < stored_timestamp(self._session, until),
+        )
+
+    def _truncate(self, granularity: str) -> Any:
+        """``messages.created_at`` truncated to its bucket, stored like bound bucket starts.
+
+        Callers reuse the returned expression in ``GROUP BY``, so both render
+        the same bind parameter and PostgreSQL sees one expression.
+        """
+
+        if self._session.get_bind().dialect.name == "sqlite":
+            return func.strftime(_SQLITE_FORMATS[granularity], Message.created_at)
+        return func.date_trunc(granularity, Message.created_at)
+
+
+__all__ = [
+    "AUTHOR",
+    "CHAT",
+    "DAY",
+    "GRANULARITIES",
+    "HOUR",
+    "ROLLUP_STRIPES",
+    "RollupRepository",
+    "TOTAL",
+    "bucket_start",
+    "bucket_starts",
+]
@@ -0,0 +1,139 @@
+"""Repository for full-text message search."""
+
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+from markupsafe import escape
+from sqlalchemy import and_, cast, column, func, literal_column, or_, select, table
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.orm import Session
+
+from app.db.pagination import Page, decode_keyset, encode_keyset
+from app.models import Message
+from app.models.chat import chat_users
+from app.models.message import SEARCH_TEXT_CONFIG
+
+# The database brackets matches with private-use characters; the snippet is
+# HTML-escaped first and only then are they turned into <mark> tags.
+_HIGHLIGHT_START = "\ue000"
+_HIGHLIGHT_STOP = "\ue001"
+
+_messages_fts = table("messages_fts", column("rowid"), column("content"))
+
+
+def _highlight(snippet: str | None) -> str | None:
+    """Escape a raw snippet, then mark its matches; message text is never trusted."""
+
+    if snippet is None:
+        return None
+    marked = str(escape(snippet))
+    return marked.replace(_HIGHLIGHT_START, "<mark>").replace(_HIGHLIGHT_STOP, "</mark>")
+
+
+def _fts5_query(text: str) -> str:
+    """Quote every term so user input is never parsed as FTS5 syntax."""
+
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+class SearchRepository:
+    """Ranked, keyset-paginated message search scoped to the caller's chats.
+
+    PostgreSQL matches against the GIN-indexed ``messages.search_vector``;
+    SQLite falls back to the ``messages_fts`` FTS5 table. In both cases the
+    participation check is a join on ``chat_users`` inside the same query.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def search(
+        self,
+        user_id: int,
+        query: str,
+        chat_id: int | None = None,
+        author_id: int | None = None,
+        after: str | None = None,
+        limit: int = 20,
+    ) -> Page[Mapping[str, Any]]:
+        dialect = self._session.get_bind().dialect.name
+        if dialect == "postgresql":
+            rank, snippet, statement = self._postgres(query)
+        elif dialect == "sqlite":
+            rank, snippet, statement = self._sqlite(query)
+        else:
+            raise NotImplementedError(f"Full-text search is not supported for {dialect!r}")
+
+        statement = (
+            statement.add_columns(rank.label("rank"), snippet.label("snippet"))
+            .join(
+                chat_users,
+                and_(chat_users.c.chat_id == Message.chat_id, chat_users.c.user_id == user_id),
+            )
+            # chat_id breaks ties between shards, whose message ids may repeat.
+            .order_by(rank.desc(), Message.id.desc(), Message.chat_id.desc())
+            .limit(limit + 1)
+        )
+        if chat_id is not None:
+            statement = statement.where(Message.chat_id == chat_id)
+        if author_id is not None:
+            statement = statement.where(Message.author_id == author_id)
+        if after:
+            after_rank, after_id, after_chat = decode_keyset(after, 3)
+            statement = statement.where(
+                or_(
+                    rank < after_rank,
+                    and_(rank == after_rank, Message.id < after_id),
+                    and_(rank == after_rank, Message.id == after_id, Message.chat_id < after_chat),
+                )
+            )
+
+        rows = [
+            {**row, "snippet": _highlight(row["snippet"])}
+            for row in self._session.execute(statement).mappings()
+        ]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = self.encode_cursor(rows[-1]) if has_more else None
+        return Page(items=rows, next_cursor=next_cursor)
+
+    @staticmethod
+    def encode_cursor(row: Mapping[str, Any]) -> str:
+        return encode_keyset(row["rank"], row["id"], row["chat_id"])
+
+    @staticmethod
+    def _base() -> Any:
+        return select(
+            Message.id,
+            Message.chat_id,
+            Message.author_id,
+            Message.content,
+            Message.created_at,
+        )
+
+    def _postgres(self, query: str) -> tuple[Any, Any, Any]:
+        config = literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig")
+        tsquery = func.websearch_to_tsquery(config, query)
+        vector = literal_column("messages.search_vector")
+        # ts_rank is ``real``; as float8 it survives the JSON cursor exactly, so
+        # ``rank == after_rank`` still matches ties on the next page.
+        rank = cast(func.ts_rank(vector, tsquery), DOUBLE_PRECISION)
+        snippet = func.ts_headline(
+            config,
+            Message.content,
+            tsquery,
+            f"StartSel={_HIGHLIGHT_START}, StopSel={_HIGHLIGHT_STOP}, MaxFragments=2",
+        )
+        return rank, snippet, self._base().where(vector.op("@@")(tsquery))
+
+    def _sqlite(self, query: str) -> tuple[Any, Any, Any]:
+        fts = literal_column("messages_fts")
+        rank = -func.bm25(fts)
+        snippet = func.snippet(fts, 0, _HIGHLIGHT_START, _HIGHLIGHT_STOP, "…", 12)
+        statement = (
+            self._base()
+            .join(_messages_fts, _messages_fts.c.rowid == Message.id)
+            .where(fts.op("MATCH")(_fts5_query(query)))
+        )
+        return rank, snippet, statement
@@ -0,0 +1,69 @@
+"""Repository for the chat directory (``chat_shards``)."""
+
+from __future__ import annotations
+
+from typing import Callable, Collection, Iterator, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import ChatShard
+
+
+class ShardRepository:
+    """Maps chat ids to shards; always bound to the home database's session."""
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def allocate(self, place: Callable[[int], int]) -> tuple[int, int]:
+        """Reserve a new chat id and record the shard ``place(chat_id)`` picks for it."""
+
+        chat_id = self._session.execute(
+            insert(ChatShard).values(shard=0).returning(ChatShard.chat_id)
+        ).scalar_one()
+        shard = place(chat_id)
+        if shard:
+            self.relocate(chat_id, shard)
+        return chat_id, shard
+
+    def shard_of(self, chat_id: int) -> Optional[int]:
+        return self._session.scalar(select(ChatShard.shard).where(ChatShard.chat_id == chat_id))
+
+    def shards_of(self, chat_ids: Collection[int]) -> dict[int, int]:
+        """Shards of several chats with one ``IN`` query; unknown ids are left out."""
+
+        if not chat_ids:
+            return {}
+        statement = select(ChatShard.chat_id, ChatShard.shard).where(
+            ChatShard.chat_id.in_(chat_ids)
+        )
+        return {row.chat_id: row.shard for row in self._session.execute(statement)}
+
+    def relocate(self, chat_id: int, shard: int) -> None:
+        self._session.execute(
+            update(ChatShard).where(ChatShard.chat_id == chat_id).values(shard=shard)
+        )
+
+    def counts(self) -> dict[int, int]:
+        """Number of chats per shard."""
+
+        statement = select(ChatShard.shard, func.count()).group_by(ChatShard.shard)
+        return {shard: count for shard, count in self._session.execute(statement)}
+
+    def iter_placements(self, batch_size: int = 1000) -> Iterator[tuple[int, int]]:
+        """Every ``(chat_id, shard)`` in id order, read in keyset batches."""
+
+        after = 0
+        while True:
+            statement = (
+                select(ChatShard.chat_id, ChatShard.shard)
+                .where(ChatShard.chat_id > after)
+                .order_by(ChatShard.chat_id)
+                .limit(batch_size)
+            )
+            rows = self._session.execute(statement).all()
+            yield from ((row.chat_id, row.shard) for row in rows)
+            if len(rows) < batch_size:
+                return
+            after = rows[-1].chat_id
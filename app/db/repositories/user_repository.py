@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-from typing import Iterable, Optional
+from typing import Any, Collection, Iterator, Mapping, Optional
 
-from sqlalchemy import select
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
 
+from app.db.pagination import Page, decode_keyset, encode_keyset
 from app.models import User
 
 
@@ -19,13 +20,74 @@ class UserRepository:
     def get_by_id(self, user_id: int) -> Optional[User]:
         return self._session.get(User, user_id)
 
+    def get_many(self, user_ids: Collection[int]) -> dict[int, User]:
+        """Load several users with a single ``IN`` query, keyed by id."""
+
+        if not user_ids:
+            return {}
+        statement = select(User).where(User.id.in_(user_ids))
+        return {user.id: user for user in self._session.scalars(statement)}
+
     def get_by_username(self, username: str) -> Optional[User]:
         statement = select(User).where(User.username == username)
         return self._session.scalar(statement)
 
-    def list_users(self) -> Iterable[User]:
-        statement = select(User).order_by(User.username.asc())
-        return self._session.scalars(statement)
+    def search_directory(
+        self, prefix: str | None = None, after: str | None = None, limit: int = 50
+    ) -> Page[Mapping[str, Any]]:
+        """Users ordered by username, keyset-paginated, optionally filtered by prefix.
+
+        ``prefix`` matches the start of ``username`` or ``display_name``
+        case-insensitively. On PostgreSQL both sides are served by the
+        ``text_pattern_ops`` expression indexes on ``lower(...)``; without a
+        prefix the page is a range scan of the unique ``username`` index.
+        """
+
+        statement = (
+            select(User.id, User.username, User.display_name, User.email)
+            .order_by(User.username.asc())
+            .limit(limit + 1)
+        )
+        if prefix:
+            pattern = prefix.lower()
+            statement = statement.where(
+                or_(
+                    func.lower(User.username).startswith(pattern, autoescape=True),
+                    func.lower(User.display_name).startswith(pattern, autoescape=True),
+                )
+            )
+        if after:
+            (username,) = decode_keyset(after, 1)
+            statement = statement.where(User.username > str(username))
+
+        rows = list(self._session.execute(statement).mappings())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_keyset(rows[-1]["username"]) if has_more else None
+        return Page(items=rows, next_cursor=next_cursor)
+
+    def get_rows(self, user_ids: Collection[int]) -> dict[int, Mapping[str, Any]]:
+        """Projected rows for several users with one ``IN`` query, keyed by id."""
+
+        if not user_ids:
+            return {}
+        statement = select(User.id, User.username, User.display_name, User.email).where(
+            User.id.in_(user_ids)
+        )
+        return {row["id"]: row for row in self._session.execute(statement).mappings()}
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[list[User]]:
+        """All users in id order, loaded in keyset batches of ``batch_size``."""
+
+        after = 0
+        while True:
+            statement = select(User).where(User.id > after).order_by(User.id).limit(batch_size)
+            users = list(self._session.scalars(statement))
+            if users:
+                yield users
+            if len(users) < batch_size:
+                return
+            after = users[-1].id
 
     def create(self, username: str, display_name: str, email: str | None = None) -> User:
         user = User(username=username, display_name=display_name, email=email)
@@ -0,0 +1,58 @@
+"""Repository for collection change counters."""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.sql import upsert
+from app.models import ChangeCounter
+
+USERS = "users"
+CHATS = "chats"
+# High-water mark of message ids on SQLite shards, which have no sequences.
+MESSAGE_IDS = "message_ids"
+
+
+class VersionRepository:
+    """Bumps and reads the per-collection counters in ``change_counters``."""
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    def bump(self, name: str) -> int:
+        """Increment ``name`` inside the caller's transaction, creating it on first use.
+
+        Returns the new version. The counter row stays locked until commit, so
+        versions are handed out in commit order.
+        """
+
+        table = ChangeCounter.__table__
+        statement = upsert(
+            self._session,
+            table,
+            ["name"],
+            {"version": table.c.version + 1, "changed_at": func.now()},
+        ).values(name=name, version=1, changed_at=func.now())
+        return self._session.execute(statement.returning(table.c.version)).scalar_one()
+
+    def get(self, name: str) -> Optional[Any]:
+        """``(version, changed_at)`` row of ``name``, or ``None`` before its first bump."""
+
+        statement = select(ChangeCounter.version, ChangeCounter.changed_at).where(
+            ChangeCounter.name == name
+        )
+        return self._session.execute(statement).first()
+
+    @staticmethod
+    def version_of(name: str) -> Any:
+        """Scalar subquery of ``name``'s version, for embedding in other stamps."""
+
+        return (
+            select(ChangeCounter.version).where(ChangeCounter.name == name).scalar_subquery()
+        )
+
+
+__all__ = ["CHATS", "MESSAGE_IDS", "USERS", "VersionRepository"]
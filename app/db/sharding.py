@@ -0,0 +1,278 @@
+"""Chat-level sharding: placement, per-shard sessions and moving chats.
+
+Shard 0 is the primary database (``DATABASE_URL``); shards ``1..n`` are the
+``shard_*`` binds. A chat, its memberships and its messages live on one shard,
+recorded in the ``chat_shards`` directory on shard 0. Users and the directory
+stay on shard 0 and users are replicated to every other shard, where message
+and membership foreign keys point at them.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+from functools import lru_cache
+from typing import Callable, Collection, Iterable, Sequence
+
+from sqlalchemy import Table, column, delete, insert, select, table, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import TableClause
+
+from app.db.repositories import MembershipRepository, ShardRepository, VersionRepository
+from app.db.repositories.rollup_repository import CHAT
+from app.db.repositories.version_repository import CHATS
+from app.db.sql import insert_ignore
+from app.models import ActivityRollup, Chat, MembershipChange, Message, User
+from app.models.chat import chat_users
+
+# Points per shard on the hash ring; more points spread chats more evenly.
+VIRTUAL_NODES = 64
+# Message ids: shard ``k`` draws from ``[k * range, (k + 1) * range)``, so a
+# moved chat keeps its ids without colliding with the target's own.
+MESSAGE_ID_RANGE = 2**31 // 16
+MAX_SHARDS = 16
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash placement of chat ids on shards ``0..shard_count - 1``.
+
+    Adding a shard takes over about ``1 / shard_count`` of the chats and moves
+    none between the existing shards, so a rebalance touches only those.
+    """
+
+    def __init__(self, shard_count: int, virtual_nodes: int = VIRTUAL_NODES) -> None:
+        points = sorted(
+            (_hash(f"shard-{shard}-{node}"), shard)
+            for shard in range(shard_count)
+            for node in range(virtual_nodes)
+        )
+        self._keys = [key for key, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, chat_id: int) -> int:
+        index = bisect.bisect(self._keys, _hash(f"chat-{chat_id}")) % len(self._keys)
+        return self._shards[index]
+
+
+@lru_cache(maxsize=None)
+def hash_ring(shard_count: int) -> HashRing:
+    return HashRing(shard_count)
+
+
+class ShardSessions:
+    """Sessions of every shard for one unit of work, opened on first use.
+
+    ``home`` is the caller's shard-0 session and is not closed here.
+    """
+
+    def __init__(self, home: Session, factories: Sequence[Callable[[], Session]] = ()) -> None:
+        if len(factories) + 1 > MAX_SHARDS:
+            raise ValueError(f"At most {MAX_SHARDS} shards are supported")
+        self.home = home
+        self._factories = list(factories)
+        self._opened: dict[int, Session] = {}
+
+    @property
+    def count(self) -> int:
+        return 1 + len(self._factories)
+
+    def get(self, index: int) -> Session:
+        if index == 0:
+            return self.home
+        session = self._opened.get(index)
+        if session is None:
+            session = self._opened[index] = self._factories[index - 1]()
+        return session
+
+    def rollback(self) -> None:
+        """Roll back the home session and every opened shard session."""
+
+        for session in (self.home, *self._opened.values()):
+            session.rollback()
+
+    def close(self) -> None:
+        for session in self._opened.values():
+            session.close()
+        self._opened.clear()
+
+
+def message_id_range(shard: int) -> tuple[int, int]:
+    """``[low, high)`` range shard ``shard`` draws new message ids from."""
+
+    return max(1, shard * MESSAGE_ID_RANGE), (shard + 1) * MESSAGE_ID_RANGE
+
+
+def reserve_message_ids(connection: Connection, shard: int) -> None:
+    """Bound shard ``shard``'s message id sequence to its range; idempotent.
+
+    The sequence starts at the bottom of the range and its ``MAXVALUE`` is
+    the top, so a full range fails the insert instead of handing out the next
+    shard's ids. PostgreSQL only: on SQLite, ``MessageRepository`` picks ids
+    inside the range itself.
+    """
+
+    if connection.dialect.name != "postgresql":
+        return
+    low, high = message_id_range(shard)
+    connection.execute(
+        text(
+            "SELECT setval('messages_id_seq', :start, false) "
+            "WHERE (SELECT last_value FROM messages_id_seq) < :start"
+        ),
+        {"start": low},
+    )
+    # DDL takes no bind parameters; the bound is a computed integer.
+    connection.execute(text(f"ALTER SEQUENCE messages_id_seq MAXVALUE {high - 1}"))
+
+
+def replicate_users(target: Session, users: Iterable[User]) -> None:
+    """Insert copies of ``users`` into a shard; rows already there are kept."""
+
+    columns = User.__table__.columns
+    rows = [{column.key: getattr(user, column.key) for column in columns} for user in users]
+    if rows:
+        target.execute(insert_ignore(target, User.__table__), rows)
+
+
+def copy_users(
+    source: Session, target: Session, user_ids: Collection[int], batch_size: int = 1000
+) -> None:
+    """Replicate users by id from the home database to a shard, in ``IN`` batches."""
+
+    ids = sorted(user_ids)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start : start + batch_size]
+        replicate_users(target, source.scalars(select(User).where(User.id.in_(batch))))
+
+
+def move_chat(
+    shards: ShardSessions, chat_id: int, source: int, target: int, batch_size: int = 1000
+) -> int:
+    """Copy a chat with its members, messages and rollups to ``target``, then drop the original.
+
+    The source chat row stays locked until the original is deleted, so
+    concurrent sends wait and then fail their foreign key check, which makes
+    them re-resolve the chat's shard. Commits go target, directory, source
+    (the directory flips with whichever of them is the home database): if
+    anything fails before the flip, the chat is still served from ``source``
+    and the next attempt purges the partial copy; after it, a failure only
+    leaves an unused copy on ``source`` that moving the chat back replaces.
+    Returns the number of messages moved.
+    """
+
+    home, origin, destination = shards.home, shards.get(source), shards.get(target)
+    chats, members, messages = _raw(Chat.__table__), _raw(chat_users), _raw(Message.__table__)
+    rollups = _raw(ActivityRollup.__table__)
+    try:
+        _lock_chat(origin, chat_id)
+        chat = origin.execute(select(chats).where(chats.c.id == chat_id)).mappings().first()
+        if chat is None:
+            raise ValueError("Chat not found")
+        _delete_chat(destination, chat_id)
+
+        memberships = [
+            dict(row)
+            for row in origin.execute(
+                select(members).where(members.c.chat_id == chat_id)
+            ).mappings()
+        ]
+        authors = origin.scalars(
+            select(Message.author_id).where(Message.chat_id == chat_id).distinct()
+        )
+        copy_users(home, destination, {row["user_id"] for row in memberships} | set(authors))
+
+        destination.execute(insert(chats), [{**chat, "last_message_id": None}])
+        if memberships:
+            destination.execute(insert(members), memberships)
+        moved = 0
+        history = origin.execute(
+            select(messages)
+            .where(messages.c.chat_id == chat_id)
+            .order_by(messages.c.id)
+            .execution_options(yield_per=batch_size)
+        ).mappings()
+        for batch in history.partitions():
+            ids = [row["id"] for row in batch]
+            taken = destination.scalar(select(Message.id).where(Message.id.in_(ids)).limit(1))
+            if taken is not None:
+                raise ValueError(f"Message id {taken} already exists on shard {target}")
+            destination.execute(insert(messages), [dict(row) for row in batch])
+            moved += len(batch)
+        destination.execute(
+            update(chats)
+            .where(chats.c.id == chat_id)
+            .values(last_message_id=chat["last_message_id"])
+        )
+        # Author and total rollups stay: they sum across shards either way.
+        counters = origin.execute(
+            select(rollups).where(rollups.c.scope == CHAT, rollups.c.subject_id == chat_id)
+        ).mappings()
+        counter_rows = [dict(row) for row in counters]
+        if counter_rows:
+            destination.execute(insert(rollups), counter_rows)
+        # The membership log is numbered by each shard's own counter, so the
+        # copy starts over: syncing clients get the full member list once.
+        MembershipRepository(destination).reset(chat_id, VersionRepository(destination).bump(CHATS))
+
+        ShardRepository(home).relocate(chat_id, target)
+        destination.commit()
+        if origin is not home:
+            home.commit()
+        _delete_chat(origin, chat_id)
+        VersionRepository(origin).bump(CHATS)
+        origin.commit()
+    except Exception:
+        for session in (destination, origin, home):
+            session.rollback()
+        raise
+    return moved
+
+
+def _raw(source: Table) -> TableClause:
+    """Untyped view of ``source``: values are copied between shards exactly as stored.
+
+    Typed columns would re-serialize them, e.g. SQLite timestamps would gain
+    microseconds and stop comparing equal to ``CURRENT_TIMESTAMP`` values.
+    """
+
+    return table(source.name, *(column(name) for name in source.columns.keys()))
+
+
+def _lock_chat(session: Session, chat_id: int) -> None:
+    """Block writers to the chat until the transaction ends."""
+
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(select(Chat.id).where(Chat.id == chat_id).with_for_update())
+    else:
+        # SQLite has no row locks; any write takes the database write lock.
+        session.execute(update(Chat).where(Chat.id == chat_id).values(id=Chat.id))
+
+
+def _delete_chat(session: Session, chat_id: int) -> None:
+    session.execute(
+        delete(ActivityRollup).where(
+            ActivityRollup.scope == CHAT, ActivityRollup.subject_id == chat_id
+        )
+    )
+    session.execute(delete(MembershipChange).where(MembershipChange.chat_id == chat_id))
+    session.execute(delete(Message).where(Message.chat_id == chat_id))
+    session.execute(delete(chat_users).where(chat_users.c.chat_id == chat_id))
+    session.execute(delete(Chat).where(Chat.id == chat_id))
+
+
+__all__ = [
+    "HashRing",
+    "MESSAGE_ID_RANGE",
+    "ShardSessions",
+    "copy_users",
+    "hash_ring",
+    "message_id_range",
+    "move_chat",
+    "replicate_users",
+    "reserve_message_ids",
+]
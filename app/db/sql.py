@@ -0,0 +1,57 @@
+"""Dialect-aware SQL construction helpers."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Mapping, Sequence
+
+from sqlalchemy import Table, func, literal, literal_column
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def _dialect_insert(session: Session, table: Table) -> Any:
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"ON CONFLICT is not supported for dialect {dialect!r}")
+
+
+def insert_ignore(session: Session, table: Table) -> Any:
+    """Return an ``INSERT ... ON CONFLICT DO NOTHING`` for the session's dialect."""
+
+    return _dialect_insert(session, table).on_conflict_do_nothing()
+
+
+def upsert(
+    session: Session, table: Table, index_elements: Sequence[str], set_: Mapping[str, Any]
+) -> Any:
+    """Return an ``INSERT ... ON CONFLICT (...) DO UPDATE`` for the session's dialect."""
+
+    return _dialect_insert(session, table).on_conflict_do_update(
+        index_elements=list(index_elements), set_=dict(set_)
+    )
+
+
+def excluded(name: str) -> Any:
+    """Column ``name`` of the row proposed for insertion, for an :func:`upsert`'s ``set_``."""
+
+    return literal_column(f"excluded.{name}")
+
+
+def stored_timestamp(session: Session, value: datetime) -> Any:
+    """Bind ``value`` in the same form as ``server_default=func.now()`` columns.
+
+    SQLite keeps timestamps as text: ``CURRENT_TIMESTAMP`` writes
+    ``YYYY-MM-DD HH:MM:SS`` while bound datetimes carry microseconds, so equal
+    instants would neither compare nor sort as equal. Other dialects bind as is.
+    """
+
+    if session.get_bind().dialect.name == "sqlite":
+        return func.datetime(literal(value))
+    return value
+
+
+__all__ = ["excluded", "insert_ignore", "stored_timestamp", "upsert"]
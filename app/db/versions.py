@@ -0,0 +1,25 @@
+"""Version stamps behind HTTP ``ETag``/``Last-Modified`` validators."""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+
+@dataclass(frozen=True, slots=True)
+class VersionStamp:
+    """Cheap summary of a resource's state: opaque parts plus its modification time."""
+
+    parts: tuple[Any, ...]
+    last_modified: datetime | None = None
+
+    def etag(self, variant: str = "") -> str:
+        """Opaque entity tag; ``variant`` distinguishes representations (query strings)."""
+
+        raw = repr((self.parts, variant)).encode()
+        return hashlib.blake2s(raw, digest_size=12).hexdigest()
+
+
+__all__ = ["VersionStamp"]
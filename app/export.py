@@ -0,0 +1,82 @@
+"""Chunked encoders for streaming chat exports."""
+
+from __future__ import annotations
+
+import csv
+import io
+import zlib
+from typing import Any, Callable, Iterable, Iterator, Mapping
+
+from .serialization import message_row
+
+EXPORT_FORMATS = {
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "csv": ("text/csv", "csv"),
+}
+
+CSV_COLUMNS = ("id", "chat_id", "author_id", "author_username", "created_at", "content")
+
+# Encoded output is flushed to the client in chunks of roughly this size.
+CHUNK_BYTES = 64 * 1024
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    buffer: list[str] = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buffer).encode()
+            buffer.clear()
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def encode_jsonl(
+    rows: Iterable[Mapping[str, Any]], dumps: Callable[[Any], str]
+) -> Iterator[bytes]:
+    """One JSON object per line, shaped like the message list API."""
+
+    return _chunked(dumps(message_row(row, include_author=True)) + "\n" for row in rows)
+
+
+def encode_csv(rows: Iterable[Mapping[str, Any]]) -> Iterator[bytes]:
+    """RFC 4180 CSV with a header row and ISO 8601 timestamps."""
+
+    def lines() -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for row in rows:
+            writer.writerow(
+                (
+                    row["id"],
+                    row["chat_id"],
+                    row["author_id"],
+                    row["author_username"],
+                    row["created_at"].isoformat(),
+                    row["content"],
+                )
+            )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return _chunked(lines())
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into a single gzip member on the fly."""
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+__all__ = ["CSV_COLUMNS", "EXPORT_FORMATS", "encode_csv", "encode_jsonl", "gzip_chunks"]
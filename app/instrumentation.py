@@ -0,0 +1,297 @@
+"""Opt-in request instrumentation exported in Prometheus text format.
+
+Records per-endpoint latency histograms, SQL statement counts and DB time per
+request (via SQLAlchemy engine events), flags N+1 query patterns, logs slow
+queries with their bound-parameter shapes and serves everything at
+``/metrics``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = tuple[str, ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: dict[LabelValues, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            # Per series: one slot per bucket, then +Inf, count and sum.
+            series = self._series.setdefault(label_values, [0.0] * (len(self.buckets) + 3))
+            series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = {key: list(values) for key, values in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            base = _labels(self.labels, label_values)
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels_with(base, "le", str(bound))} {cumulative:g}'
+            yield f"{self.name}_count{_braces(base)} {series[-2]:g}"
+            yield f"{self.name}_sum{_braces(base)} {series[-1]:.6f}"
+
+
+class CounterMetric:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Counter[LabelValues] = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            yield f"{self.name}{_braces(_labels(self.labels, label_values))} {value:g}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _braces(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+def _labels_with(labels: str, name: str, value: str) -> str:
+    extra = f'{name}="{value}"'
+    return f"{{{labels},{extra}}}" if labels else f"{{{extra}}}"
+
+
+def _gauge(name: str, help_text: str, samples: Mapping[str, float], label: str) -> Iterable[str]:
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} gauge"
+    for key, value in sorted(samples.items()):
+        yield f'{name}{{{label}="{_escape(key)}"}} {value:g}'
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Describe bound parameters by type only, so values never reach the log."""
+
+    if isinstance(parameters, Mapping):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (Mapping, list, tuple)):
+            return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class Instrumentation:
+    """Collects request and SQL metrics for one Flask app."""
+
+    def __init__(self, slow_query_ms: float = 200.0, n_plus_one_threshold: int = 10) -> None:
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.request_latency = Histogram(
+            "http_request_duration_seconds",
+            "Request latency by endpoint.",
+            ("endpoint", "method", "status"),
+            LATENCY_BUCKETS,
+        )
+        self.request_statements = Histogram(
+            "db_statements_per_request",
+            "SQL statements executed per request.",
+            ("endpoint",),
+            STATEMENT_BUCKETS,
+        )
+        self.db_time = CounterMetric(
+            "db_time_seconds_total", "Time spent in SQL statements.", ("endpoint",)
+        )
+        self.n_plus_one = CounterMetric(
+            "db_n_plus_one_total",
+            "Requests that repeated one statement shape above the threshold.",
+            ("endpoint",),
+        )
+        self.slow_queries = CounterMetric(
+            "db_slow_queries_total",
+            "Statements slower than the slow-query threshold.",
+            ("endpoint",),
+        )
+        self._gauge_sources: list[Callable[[], Iterable[str]]] = []
+
+    def init_app(self, app: Flask, engines: Iterable[Engine]) -> None:
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule("/metrics", "metrics", self.metrics_view)
+        app.extensions["instrumentation"] = self
+
+    def add_gauge_source(self, source: Callable[[], Iterable[str]]) -> None:
+        """Register a callable yielding extra exposition lines for ``/metrics``."""
+
+        self._gauge_sources.append(source)
+
+    # Request hooks ----------------------------------------------------------
+    @staticmethod
+    def _before_request() -> None:
+        g._instrumentation = {"started": time.perf_counter(), "db_time": 0.0, "shapes": Counter()}
+
+    def _after_request(self, response: Response) -> Response:
+        state = g.pop("_instrumentation", None)
+        if state is None:
+            return response
+        endpoint = request.endpoint or "unknown"
+        elapsed = time.perf_counter() - state["started"]
+        shapes: Counter[str] = state["shapes"]
+
+        self.request_latency.observe(elapsed, endpoint, request.method, str(response.status_code))
+        self.request_statements.observe(sum(shapes.values()), endpoint)
+        self.db_time.inc(state["db_time"], endpoint)
+
+        repeated = [
+            (shape, count) for shape, count in shapes.items() if count > self.n_plus_one_threshold
+        ]
+        if repeated:
+            self.n_plus_one.inc(1, endpoint)
+            for shape, count in repeated:
+                logger.warning("Possible N+1 in %s: %d x %s", endpoint, count, shape)
+        return response
+
+    # Engine hooks -----------------------------------------------------------
+    @staticmethod
+    def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        conn.info.setdefault("_instrumentation_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        started_stack = conn.info.get("_instrumentation_started")
+        if not started_stack:
+            return
+        elapsed = time.perf_counter() - started_stack.pop()
+        state = g.get("_instrumentation") if has_request_context() else None
+        endpoint = (request.endpoint or "unknown") if state is not None else "background"
+
+        if state is not None:
+            state["db_time"] += elapsed
+            state["shapes"][statement] += 1
+        if elapsed >= self.slow_query_seconds:
+            self.slow_queries.inc(1, endpoint)
+            logger.warning(
+                "Slow query in %s (%.1f ms): %s params=%s",
+                endpoint,
+                elapsed * 1000,
+                " ".join(statement.split()),
+                parameter_shape(parameters),
+            )
+
+    # Exposition -------------------------------------------------------------
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in (
+            self.request_latency,
+            self.request_statements,
+            self.db_time,
+            self.n_plus_one,
+            self.slow_queries,
+        ):
+            lines.extend(metric.render())
+        for source in self._gauge_sources:
+            lines.extend(source())
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self) -> Response:
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_instrumentation(app: Flask) -> Instrumentation:
+    """Wire instrumentation into ``app``, including cache, pool, writer and limiter metrics."""
+
+    instrumentation = Instrumentation(
+        slow_query_ms=float(app.config["SLOW_QUERY_MS"]),
+        n_plus_one_threshold=int(app.config["N_PLUS_ONE_THRESHOLD"]),
+    )
+    database = app.extensions["database"]
+    with app.app_context():
+        engines = list(database.db.engines.values())
+    instrumentation.init_app(app, engines)
+
+    def cache_gauges() -> Iterable[str]:
+        stats = app.extensions["cache"].stats().to_dict()
+        yield from _gauge("cache_operations", "Cache hits, misses and evictions.", stats, "kind")
+
+    def pool_gauges() -> Iterable[str]:
+        with app.app_context():
+            pools = database.pool_stats()
+        yield from _gauge(
+            "db_pool_saturation",
+            "Fraction of pool capacity checked out.",
+            {key: stats.saturation for key, stats in pools.items()},
+            "pool",
+        )
+        yield from _gauge(
+            "db_pool_checkout_wait_seconds_total",
+            "Total time spent waiting for a pooled connection.",
+            {key: stats.wait_seconds_total for key, stats in pools.items()},
+            "pool",
+        )
+        yield from _gauge(
+            "db_pool_checkout_wait_seconds_max",
+            "Longest wait for a pooled connection.",
+            {key: stats.wait_seconds_max for key, stats in pools.items()},
+            "pool",
+        )
+
+    instrumentation.add_gauge_source(cache_gauges)
+    instrumentation.add_gauge_source(pool_gauges)
+    for source in ("message_writer", "rate_limiter"):
+        extension = app.extensions.get(source)
+        if extension is not None:
+            instrumentation.add_gauge_source(extension.render_metrics)
+    return instrumentation
+
+
+__all__ = ["Instrumentation", "init_instrumentation", "parameter_shape"]
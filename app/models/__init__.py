@@ -1,8 +1,20 @@
 """Model exports for the messenger."""
 
+from .activity_rollup import ActivityRollup
+from .change_counter import ChangeCounter
 from .chat import Chat
+from .chat_shard import ChatShard
+from .membership_change import MembershipChange
 from .message import Message
 from .user import User
 
-__all__ = ["Chat", "Message", "User"]
+__all__ = [
+    "ActivityRollup",
+    "ChangeCounter",
+    "Chat",
+    "ChatShard",
+    "MembershipChange",
+    "Message",
+    "User",
+]
 
@@ -0,0 +1,34 @@
+"""Activity rollup model definition."""
+
+from __future__ import annotations
+
+from .base import db
+
+
+class ActivityRollup(db.Model):  # type: ignore[misc]
+    """Message count of one subject in one hour or day bucket, on the chat's shard.
+
+    ``scope`` is ``chat`` (``subject_id`` is the chat), ``author`` (the user)
+    or ``total``, whose ``subject_id`` is a stripe: ``chat_id % ROLLUP_STRIPES``
+    for ``messages`` and ``author_id % ROLLUP_STRIPES`` for ``authors``, the
+    number of authors whose first message in the bucket it counted. Striping
+    keeps concurrent sends from queueing on one hot row.
+    """
+
+    __tablename__ = "activity_rollups"
+    __table_args__ = (
+        db.Index(
+            "ix_activity_rollups_subject",
+            "scope",
+            "subject_id",
+            "granularity",
+            "bucket_start",
+        ),
+    )
+
+    granularity = db.Column(db.String(8), primary_key=True)
+    scope = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    subject_id = db.Column(db.Integer, primary_key=True)
+    messages = db.Column(db.Integer, nullable=False, server_default="0")
+    authors = db.Column(db.Integer, nullable=False, server_default="0")
@@ -0,0 +1,19 @@
+"""Change counter model definition."""
+
+from __future__ import annotations
+
+from .base import db
+
+
+class ChangeCounter(db.Model):  # type: ignore[misc]
+    """Monotonic version of a whole collection (``users``, ``chats``).
+
+    Bumped in the same transaction as every change to the collection's
+    listing, so HTTP validators can be derived from one primary-key lookup.
+    """
+
+    __tablename__ = "change_counters"
+
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, server_default="0")
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
@@ -5,6 +5,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from .base import ModelBase, db
+from .message import unpartitioned
 
 if TYPE_CHECKING:
     from .message import Message
@@ -15,6 +16,10 @@ chat_users = db.Table(
     "chat_users",
     db.Column("chat_id", db.Integer, db.ForeignKey("chats.id"), primary_key=True),
     db.Column("user_id", db.Integer, db.ForeignKey("users.id"), primary_key=True),
+    # Per-member read cursor and the number of messages past it, maintained on send.
+    db.Column("last_read_message_id", db.Integer, nullable=True),
+    db.Column("unread_count", db.Integer, nullable=False, server_default="0"),
+    db.Index("ix_chat_users_user_id", "user_id"),
 )
 
 
@@ -22,28 +27,39 @@ class Chat(ModelBase):
     """Represents a conversation between users."""
 
     __tablename__ = "chats"
+    # No database-level FK to messages on PostgreSQL: a partitioned table has
+    # no unique key on ``id`` alone, and old partitions must stay detachable.
+    __table_args__ = (
+        db.ForeignKeyConstraint(
+            ["last_message_id"],
+            ["messages.id"],
+            name="fk_chats_last_message_id",
+            use_alter=True,
+            ondelete="SET NULL",
+        ).ddl_if(callable_=unpartitioned),
+    )
 
     title = db.Column(db.String(120), nullable=False)
     description = db.Column(db.String(255), nullable=True)
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_activity_at = db.Column(
+        db.DateTime, server_default=db.func.now(), nullable=False, index=True
+    )
 
+    # History is only read through MessageRepository pages; touching this
+    # collection raises instead of loading every message of the chat.
     messages = db.relationship(
         "Message",
         back_populates="chat",
+        foreign_keys="Message.chat_id",
         cascade="all, delete-orphan",
-        order_by="Message.created_at",
+        passive_deletes=True,
+        lazy="raise",
     )
     participants = db.relationship("User", secondary=chat_users, back_populates="chats")
 
-    def to_dict(self, include_messages: bool = False) -> dict[str, object]:
-        """Serialize chat to dictionary."""
-
-        data: dict[str, object] = {
-            "id": self.id,
-            "title": self.title,
-            "description": self.description,
-            "participants": [user.to_dict() for user in self.participants],
-        }
-        if include_messages:
-            data["messages"] = [message.to_dict(include_author=True) for message in self.messages]
-        return data
+    def to_dict(self) -> dict[str, object]:
+        """Serialize chat metadata; members are listed via the participants endpoint."""
+
+        return {"id": self.id, "title": self.title, "description": self.description}
 
@@ -0,0 +1,17 @@
+"""Chat directory model definition."""
+
+from __future__ import annotations
+
+from .base import db
+
+
+class ChatShard(db.Model):  # type: ignore[misc]
+    """Which shard holds a chat; lives on the home database (shard 0).
+
+    The directory also allocates chat ids, so they stay unique across shards.
+    """
+
+    __tablename__ = "chat_shards"
+
+    chat_id = db.Column(db.Integer, primary_key=True)
+    shard = db.Column(db.Integer, nullable=False, server_default="0", index=True)
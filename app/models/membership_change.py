@@ -0,0 +1,26 @@
+"""Membership change log model definition."""
+
+from __future__ import annotations
+
+from .base import db
+
+
+class MembershipChange(db.Model):  # type: ignore[misc]
+    """One member joining or leaving a chat, for delta sync.
+
+    ``version`` is the shard's ``chats`` change counter after the change was
+    bumped in the same transaction. Bumps serialize on the counter row, so
+    versions follow commit order and a client can resume from the last one
+    it saw. A ``reset`` row (no ``user_id``) marks a chat that moved here
+    from another shard, whose earlier changes are numbered differently.
+    """
+
+    __tablename__ = "membership_changes"
+    __table_args__ = (db.Index("ix_membership_changes_chat_version", "chat_id", "version"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    kind = db.Column(db.String(8), nullable=False)
+    version = db.Column(db.BigInteger, nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from .base import ModelBase, db
 
@@ -11,16 +11,32 @@ if TYPE_CHECKING:
     from .user import User
 
 
+def unpartitioned(ddl: Any, target: Any, bind: Any, *, dialect: Any, **kw: Any) -> bool:
+    """``ddl_if`` rule for DDL that only applies where ``messages`` is not partitioned."""
+
+    return dialect.name != "postgresql"
+
+
 class Message(ModelBase):
-    """Represents a message sent in a chat."""
+    """Represents a message sent in a chat.
+
+    On PostgreSQL the table is range-partitioned by month on ``created_at``
+    (see :mod:`app.db.partitions`), so its primary key is ``(id, created_at)``
+    there; the ORM still identifies rows by ``id`` alone.
+    """
 
     __tablename__ = "messages"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id").ddl_if(callable_=unpartitioned),
+        db.Index("ix_messages_chat_created_id", "chat_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     content = db.Column(db.Text, nullable=False)
-    chat_id = db.Column(db.Integer, db.ForeignKey("chats.id"), nullable=False)
+    chat_id = db.Column(db.Integer, db.ForeignKey("chats.id", ondelete="CASCADE"), nullable=False)
     author_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
 
-    chat = db.relationship("Chat", back_populates="messages")
+    chat = db.relationship("Chat", back_populates="messages", foreign_keys=[chat_id])
     author = db.relationship("User", back_populates="messages")
 
     def to_dict(self, include_author: bool = False) -> dict[str, object]:
@@ -39,3 +55,7 @@ class Message(ModelBase):
 
         return data
 
+
+# Text search configuration of ``messages.search_vector`` on PostgreSQL; the
+# column, its GIN index and SQLite's FTS5 table come from migration 0004.
+SEARCH_TEXT_CONFIG = "simple"
@@ -0,0 +1,217 @@
+"""Ephemeral presence ("online") and typing indicators.
+
+Both are short-lived keys in a TTL store, never database rows: a heartbeat or
+a typing event is one store write and touches no SQLAlchemy session. Keys are
+``online:<user_id>`` and ``typing:<chat_id>:<user_id>``; readers check them in
+batches for a chat's members, so a non-member's keys are never reported.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Iterable, Protocol, Sequence
+
+from flask import Flask
+
+try:  # pragma: no cover - optional dependency
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceStore(Protocol):
+    """Keys that exist until their TTL runs out; every call handles a batch."""
+
+    def touch(self, keys: Sequence[str], ttl: float) -> None:
+        """Create ``keys``, or extend them, to expire ``ttl`` seconds from now."""
+        ...
+
+    def discard(self, keys: Sequence[str]) -> None: ...
+
+    def alive(self, keys: Sequence[str]) -> set[str]:
+        """Which of ``keys`` have not expired."""
+        ...
+
+
+class MemoryPresence:
+    """Process-local store: a deadline per key plus one deadline-ordered queue per TTL.
+
+    With a fixed TTL, deadlines are appended in order, so expiring is popping
+    from the queue head: amortized O(1) per write, no scans or timers. A
+    refreshed key leaves a stale queue entry that is skipped when it surfaces.
+    """
+
+    def __init__(self) -> None:
+        self._deadlines: dict[str, float] = {}
+        self._queues: dict[float, deque[tuple[float, str]]] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, keys: Sequence[str], ttl: float) -> None:
+        now = time.monotonic()
+        deadline = now + ttl
+        with self._lock:
+            self._expire(now)
+            queue = self._queues.setdefault(ttl, deque())
+            for key in keys:
+                self._deadlines[key] = deadline
+                queue.append((deadline, key))
+
+    def discard(self, keys: Sequence[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._deadlines.pop(key, None)
+
+    def alive(self, keys: Sequence[str]) -> set[str]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            return {key for key in keys if key in self._deadlines}
+
+    def _expire(self, now: float) -> None:
+        for queue in self._queues.values():
+            while queue and queue[0][0] <= now:
+                deadline, key = queue.popleft()
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+
+
+class RedisPresence:
+    """Store shared by every worker on a Redis-protocol server (SET PX/DEL/MGET).
+
+    Presence is best effort: when the server is unreachable writes are
+    dropped and everyone reads as offline, rather than failing the API.
+    """
+
+    def __init__(self, url: str, prefix: str = "messenger:presence:") -> None:
+        if redis is None:
+            raise RuntimeError("PRESENCE_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def touch(self, keys: Sequence[str], ttl: float) -> None:
+        """Pipelined ``SET PX`` for every key, one round trip."""
+
+        pipeline = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.set(self._prefix + key, b"1", px=max(1, int(ttl * 1000)))
+        try:
+            pipeline.execute()
+        except redis.RedisError:
+            logger.warning("Presence store unavailable; dropped %d keys", len(keys), exc_info=True)
+
+    def discard(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+        try:
+            self._client.delete(*(self._prefix + key for key in keys))
+        except redis.RedisError:
+            logger.warning("Presence store unavailable; %d keys expire on TTL", len(keys))
+
+    def alive(self, keys: Sequence[str]) -> set[str]:
+        """One ``MGET`` round trip for all ``keys``."""
+
+        if not keys:
+            return set()
+        try:
+            values = self._client.mget([self._prefix + key for key in keys])
+        except redis.RedisError:
+            logger.warning("Presence store unavailable; reporting everyone offline", exc_info=True)
+            return set()
+        return {key for key, value in zip(keys, values) if value is not None}
+
+
+def online_key(user_id: int) -> str:
+    return f"online:{user_id}"
+
+
+def typing_key(chat_id: int, user_id: int) -> str:
+    return f"typing:{chat_id}:{user_id}"
+
+
+class Presence:
+    """Heartbeats, typing state and per-chat status on top of a :class:`PresenceStore`."""
+
+    def __init__(self, store: PresenceStore, online_ttl: float, typing_ttl: float) -> None:
+        self._store = store
+        self.online_ttl = online_ttl
+        self.typing_ttl = typing_ttl
+
+    def heartbeat(self, user_id: int) -> None:
+        """Mark ``user_id`` online for ``online_ttl`` seconds."""
+
+        self._store.touch([online_key(user_id)], self.online_ttl)
+
+    def set_typing(self, chat_id: int, user_id: int, typing: bool = True) -> None:
+        """Start (for ``typing_ttl`` seconds) or stop ``user_id``'s typing indicator.
+
+        Typing also counts as a heartbeat.
+        """
+
+        key = typing_key(chat_id, user_id)
+        if typing:
+            self._store.touch([key], self.typing_ttl)
+            self.heartbeat(user_id)
+        else:
+            self._store.discard([key])
+
+    def chat_status(
+        self, chat_id: int, member_batches: Iterable[Sequence[int]]
+    ) -> dict[str, list[int]]:
+        """``online`` and ``typing`` user ids among a chat's members, read batch by batch.
+
+        One store round trip per batch of member ids covers both indicators.
+        """
+
+        online: list[int] = []
+        typing: list[int] = []
+        for user_ids in member_batches:
+            keys = [online_key(user_id) for user_id in user_ids]
+            keys += [typing_key(chat_id, user_id) for user_id in user_ids]
+            alive = self._store.alive(keys)
+            online += [user_id for user_id in user_ids if online_key(user_id) in alive]
+            typing += [user_id for user_id in user_ids if typing_key(chat_id, user_id) in alive]
+        return {"online": online, "typing": typing}
+
+
+def create_presence_store(backend: str, url: str | None = None) -> PresenceStore:
+    """Build the store configured by ``PRESENCE_BACKEND``."""
+
+    if backend == "memory":
+        return MemoryPresence()
+    if backend == "redis":
+        if not url:
+            raise ValueError("PRESENCE_BACKEND=redis requires PRESENCE_URL or CACHE_URL")
+        return RedisPresence(url)
+    raise ValueError(f"Unknown presence backend: {backend}")
+
+
+def init_presence(app: Flask) -> Presence:
+    """Install the app's :class:`Presence` as ``app.extensions["presence"]``."""
+
+    config = app.config
+    presence = Presence(
+        create_presence_store(
+            config["PRESENCE_BACKEND"], config["PRESENCE_URL"] or config["CACHE_URL"]
+        ),
+        online_ttl=float(config["PRESENCE_TTL_SECONDS"]),
+        typing_ttl=float(config["TYPING_TTL_SECONDS"]),
+    )
+    app.extensions["presence"] = presence
+    return presence
+
+
+__all__ = [
+    "MemoryPresence",
+    "Presence",
+    "PresenceStore",
+    "RedisPresence",
+    "create_presence_store",
+    "init_presence",
+    "online_key",
+    "typing_key",
+]
@@ -0,0 +1,258 @@
+"""Token-bucket rate limiting for the API and web blueprints.
+
+Buckets are keyed by scope and identity (``address:<ip>``, ``author:<id>``,
+``chat:<id>``) and live either in process memory or on a Redis-protocol server
+shared by all workers. A refused request raises :class:`RateLimitExceeded`,
+rendered as ``429 Too Many Requests`` with ``Retry-After``.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Any, Iterable, Protocol
+
+from flask import Flask, current_app, jsonify, request
+
+try:  # pragma: no cover - optional dependency
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("address", "signup", "author", "chat")
+_UNITS = {"s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """Refill ``rate`` tokens per second into a bucket holding at most ``burst``."""
+
+    rate: float
+    burst: float
+
+    @classmethod
+    def parse(cls, spec: str | None) -> RateLimit | None:
+        """Parse ``"<count>/<s|m|h>[:<burst>]"``; empty or ``"off"`` disables the limit.
+
+        Burst defaults to ``count``: ``"60/m"`` allows 60 at once, then one per second.
+        """
+
+        spec = (spec or "").strip().lower()
+        if spec in {"", "0", "off", "none"}:
+            return None
+        try:
+            amount, _, rest = spec.partition("/")
+            unit, _, burst = rest.partition(":")
+            count = float(amount)
+            rate = count / _UNITS[unit or "s"]
+            limit = cls(rate=rate, burst=float(burst) if burst else count)
+        except (KeyError, ValueError) as exc:
+            raise ValueError(f"Invalid rate limit {spec!r}; expected e.g. '10/s:20'") from exc
+        if limit.rate <= 0 or limit.burst < 1:
+            raise ValueError(f"Invalid rate limit {spec!r}; rate and burst must be positive")
+        return limit
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a bucket cannot cover a request."""
+
+    def __init__(self, scope: str, retry_after: float) -> None:
+        super().__init__(f"rate limit exceeded ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class BucketStore(Protocol):
+    """Storage for token buckets; ``consume`` must be atomic per key.
+
+    A cost above the burst is capped at it, so an oversized batch drains the
+    bucket instead of being refused forever.
+    """
+
+    def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; returns ``0.0`` if granted, else seconds until they are."""
+        ...
+
+
+class MemoryBuckets:
+    """Process-local buckets; each gunicorn worker enforces its own share."""
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self._max_keys = max_keys
+        # key -> [tokens, updated_at, limit]
+        self._buckets: dict[str, list[Any]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self._max_keys:
+                    self._prune(now)
+                tokens = limit.burst
+                bucket = self._buckets[key] = [tokens, now, limit]
+            else:
+                tokens = bucket[0] + (now - bucket[1]) * limit.rate
+                if tokens > limit.burst:
+                    tokens = limit.burst
+                bucket[1] = now
+            if cost > limit.burst:
+                cost = limit.burst
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return 0.0
+            bucket[0] = tokens
+            return (cost - tokens) / limit.rate
+
+    def _prune(self, now: float) -> None:
+        """Forget refilled buckets (a full bucket equals no bucket), then the oldest."""
+
+        full = [
+            key
+            for key, (tokens, updated_at, limit) in self._buckets.items()
+            if tokens + (now - updated_at) * limit.rate >= limit.burst
+        ]
+        for key in full:
+            del self._buckets[key]
+        overflow = len(self._buckets) - self._max_keys * 9 // 10
+        for key in list(self._buckets)[: max(0, overflow)]:
+            del self._buckets[key]
+
+
+# Atomic refill-and-take; numbers are returned as strings because Redis
+# truncates Lua numbers to integers in replies.
+_CONSUME_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local cost, now = tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Buckets shared by every worker on a Redis-protocol server.
+
+    Needs ``EVALSHA``/``EVAL`` (Redis, Valkey, KeyDB, Dragonfly). Buckets expire
+    once refilled. When the server is unreachable requests are allowed rather
+    than failing the API.
+    """
+
+    def __init__(self, url: str, prefix: str = "messenger:ratelimit:") -> None:
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_CONSUME_SCRIPT)
+        self._prefix = prefix
+
+    def consume(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        cost = min(cost, limit.burst)
+        try:
+            wait = self._script(
+                keys=[self._prefix + key], args=[limit.rate, limit.burst, cost, time.time()]
+            )
+        except redis.RedisError:
+            logger.warning("Rate limit store unavailable; allowing %s", key, exc_info=True)
+            return 0.0
+        return float(wait)
+
+
+class RateLimiter:
+    """Applies the configured limits; scopes without a limit are skipped."""
+
+    def __init__(self, store: BucketStore, limits: dict[str, RateLimit | None]) -> None:
+        self._store = store
+        self._limits = {scope: limit for scope, limit in limits.items() if limit is not None}
+        self._limited: Counter[str] = Counter()
+
+    def hit(self, scope: str, identity: Any, cost: float = 1.0) -> None:
+        """Charge ``identity``'s bucket in ``scope``; raises :class:`RateLimitExceeded`."""
+
+        limit = self._limits.get(scope)
+        if limit is None:
+            return
+        wait = self._store.consume(f"{scope}:{identity}", limit, cost)
+        if wait:
+            self._limited[scope] += 1
+            raise RateLimitExceeded(scope, wait)
+
+    def render_metrics(self) -> Iterable[str]:
+        yield "# HELP rate_limited_requests_total Requests refused by a rate limit."
+        yield "# TYPE rate_limited_requests_total counter"
+        for scope, count in sorted(dict(self._limited).items()):
+            yield f'rate_limited_requests_total{{scope="{scope}"}} {count}'
+
+
+def rate_limit(scope: str, identity: Any, cost: float = 1.0) -> None:
+    """Charge a bucket of the current app's limiter; a no-op when limiting is off."""
+
+    limiter: RateLimiter | None = current_app.extensions.get("rate_limiter")
+    if limiter is not None:
+        limiter.hit(scope, identity, cost)
+
+
+def create_bucket_store(backend: str, url: str | None = None) -> BucketStore:
+    """Build the bucket store configured by ``RATE_LIMIT_BACKEND``."""
+
+    if backend == "memory":
+        return MemoryBuckets()
+    if backend == "redis":
+        if not url:
+            raise ValueError("RATE_LIMIT_BACKEND=redis requires RATE_LIMIT_URL or CACHE_URL")
+        return RedisBuckets(url)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+def init_rate_limiting(app: Flask, blueprints: Iterable[str] = ("api", "web")) -> RateLimiter:
+    """Limit every request to ``blueprints`` per address and answer refusals with 429."""
+
+    config = app.config
+    limiter = RateLimiter(
+        create_bucket_store(
+            config["RATE_LIMIT_BACKEND"], config["RATE_LIMIT_URL"] or config["CACHE_URL"]
+        ),
+        {scope: RateLimit.parse(config[f"RATE_LIMIT_{scope.upper()}"]) for scope in SCOPES},
+    )
+    limited_blueprints = frozenset(blueprints)
+
+    def limit_address() -> None:
+        if request.blueprint in limited_blueprints:
+            limiter.hit("address", request.remote_addr)
+
+    def too_many_requests(exc: RateLimitExceeded) -> Any:
+        headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+        status = int(HTTPStatus.TOO_MANY_REQUESTS)
+        if request.blueprint == "api":
+            return jsonify({"error": str(exc), "scope": exc.scope}), status, headers
+        return "Слишком много запросов, повторите позже.", status, headers
+
+    app.before_request(limit_address)
+    app.register_error_handler(RateLimitExceeded, too_many_requests)
+    app.extensions["rate_limiter"] = limiter
+    return limiter
+
+
+__all__ = [
+    "MemoryBuckets",
+    "RateLimit",
+    "RateLimitExceeded",
+    "RateLimiter",
+    "RedisBuckets",
+    "create_bucket_store",
+    "init_rate_limiting",
+    "rate_limit",
+]
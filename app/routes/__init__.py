@@ -2,18 +2,76 @@
 
 from __future__ import annotations
 
-from flask import current_app
+from datetime import timezone
+from typing import Any, Callable
 
-from app.db import Database
+from flask import Response, current_app, request
+
+from app.db import Database, VersionStamp
 from app.services import MessengerService
 
 
-def get_messenger_service() -> MessengerService:
-    """Return a MessengerService bound to the current application context."""
+def get_messenger_service(read_only: bool = False) -> MessengerService:
+    """Return a MessengerService bound to the current application context.
+
+    ``read_only`` services run on a read-replica session when one is configured;
+    the others send through the write-behind writer when it is enabled. With
+    chat shards configured the service routes chats across all of them.
+    """
 
     database: Database = current_app.extensions["database"]
-    return MessengerService(database.session)
+    return MessengerService(
+        database.read_session if read_only else database.session,
+        events=current_app.extensions.get("event_bus"),
+        cache=current_app.extensions.get("cache"),
+        writer=None if read_only else current_app.extensions.get("message_writer"),
+        shards=database.shards(read_only) if database.shard_count > 1 else None,
+    )
+
+
+def get_page_limit(raw: str | None) -> int:
+    """Parse a ``limit`` query argument, clamped to the configured page bounds."""
+
+    default = int(current_app.config["MESSAGE_PAGE_SIZE"])
+    maximum = int(current_app.config["MESSAGE_PAGE_SIZE_MAX"])
+    if not raw:
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        return default
+    return max(1, min(limit, maximum))
+
+
+def conditional_response(stamp: VersionStamp, build: Callable[[], Any]) -> Response:
+    """Answer ``304 Not Modified`` when the request's validators match ``stamp``.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since`` (RFC 9110);
+    ``build`` only runs, and the body is only queried and serialized, when the
+    client's copy is stale. ``200`` and ``304`` responses carry ``ETag``,
+    ``Last-Modified`` and ``Cache-Control: no-cache`` so clients always revalidate.
+    """
+
+    etag = stamp.etag(request.full_path)
+    last_modified = stamp.last_modified
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        fresh = bool(since and last_modified and last_modified.replace(microsecond=0) <= since)
+
+    response = Response(status=304) if fresh else current_app.make_response(build())
+    if response.status_code not in (200, 304):
+        return response
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
 
 
-__all__ = ["get_messenger_service"]
+__all__ = ["conditional_response", "get_messenger_service", "get_page_limit"]
 
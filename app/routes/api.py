@@ -2,12 +2,21 @@
 
 from __future__ import annotations
 
+import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from http import HTTPStatus
-from typing import Any
+from typing import Any, Iterator
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 
-from . import get_messenger_service
+from app.db.repositories.rollup_repository import DAY, GRANULARITIES
+from app.export import EXPORT_FORMATS, encode_csv, encode_jsonl, gzip_chunks
+from app.ratelimit import rate_limit
+from app.serialization import inbox_row
+from app.services import QueueFullError, chat_channel
+
+from . import conditional_response, get_messenger_service, get_page_limit
 
 
 api_bp = Blueprint("api", __name__)
@@ -19,9 +28,37 @@ def _json_error(message: str, status: HTTPStatus) -> tuple[dict[str, str], int]:
 
 @api_bp.get("/users")
 def api_list_users() -> Any:
-    service = get_messenger_service()
-    users = [user.to_dict() for user in service.list_users()]
-    return jsonify(users)
+    """User directory: pages by username (``prefix``, ``after``, ``limit``) or ``ids=1,2``."""
+
+    service = get_messenger_service(read_only=True)
+    if "ids" in request.args:
+        try:
+            user_ids = [int(value) for value in request.args["ids"].split(",") if value.strip()]
+        except ValueError:
+            return _json_error("ids must be comma-separated integers", HTTPStatus.BAD_REQUEST)
+        if len(user_ids) > int(current_app.config["USER_LOOKUP_MAX"]):
+            return _json_error("too many ids", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        def build() -> Any:
+            users = service.get_user_rows(user_ids)
+            found = {user["id"] for user in users}
+            missing = sorted({user_id for user_id in user_ids if user_id not in found})
+            return jsonify({"users": users, "missing": missing})
+
+    else:
+
+        def build() -> Any:
+            try:
+                page = service.search_users(
+                    prefix=request.args.get("prefix", "").strip() or None,
+                    after=request.args.get("after") or None,
+                    limit=get_page_limit(request.args.get("limit")),
+                )
+            except ValueError as exc:
+                return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+            return jsonify({"users": page.items, "next_after": page.next_cursor})
+
+    return conditional_response(service.users_version(), build)
 
 
 @api_bp.post("/users")
@@ -35,6 +72,7 @@ def api_create_user() -> Any:
     if not username or not display_name:
         return _json_error("username and display_name are required", HTTPStatus.BAD_REQUEST)
 
+    rate_limit("signup", request.remote_addr)
     try:
         user = service.create_user(username=username, display_name=display_name, email=email)
     except ValueError as exc:
@@ -43,11 +81,31 @@ def api_create_user() -> Any:
     return jsonify(user.to_dict()), int(HTTPStatus.CREATED)
 
 
+@api_bp.get("/users/<int:user_id>/chats")
+def api_user_inbox(user_id: int) -> Any:
+    service = get_messenger_service(read_only=True)
+    if service.get_user_profile(user_id) is None:
+        return _json_error("user not found", HTTPStatus.NOT_FOUND)
+
+    try:
+        page = service.list_inbox(
+            user_id,
+            before=request.args.get("before") or None,
+            limit=get_page_limit(request.args.get("limit")),
+        )
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+
+    chats = [inbox_row(row) for row in page.items]
+    return jsonify({"chats": chats, "next_before": page.next_cursor})
+
+
 @api_bp.get("/chats")
 def api_list_chats() -> Any:
-    service = get_messenger_service()
-    chats = [chat.to_dict() for chat in service.list_chats()]
-    return jsonify(chats)
+    service = get_messenger_service(read_only=True)
+    return conditional_response(
+        service.chats_version(), lambda: jsonify(service.list_chat_rows())
+    )
 
 
 @api_bp.post("/chats")
@@ -73,16 +131,166 @@ def api_create_chat() -> Any:
     except ValueError as exc:
         return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
 
-    return jsonify(chat.to_dict()), int(HTTPStatus.CREATED)
+    return jsonify(service.get_chat_summary(chat.id)), int(HTTPStatus.CREATED)
 
 
 @api_bp.get("/chats/<int:chat_id>")
 def api_get_chat(chat_id: int) -> Any:
+    """Chat summary with its latest page, or only messages after ``since`` (a message id).
+
+    Conditional on ``If-None-Match``/``If-Modified-Since``: an unchanged chat
+    costs one primary-key lookup and an empty ``304``.
+    """
+
+    service = get_messenger_service(read_only=True)
+    stamp = service.chat_version(chat_id)
+    if stamp is None:
+        return _json_error("chat not found", HTTPStatus.NOT_FOUND)
+    try:
+        since = int(request.args["since"]) if request.args.get("since") else None
+    except ValueError:
+        return _json_error("since must be a message id", HTTPStatus.BAD_REQUEST)
+    limit = get_page_limit(request.args.get("limit"))
+
+    def build() -> Any:
+        chat = service.get_chat_summary(chat_id) or {"id": chat_id}
+        if since is None:
+            page = service.list_message_rows(chat_id, limit=limit)
+            return jsonify({**chat, "messages": page.items, "next_before": page.next_cursor})
+        page = service.list_message_rows_since(chat_id, since, limit=limit)
+        next_since = page.items[-1]["id"] if page.items else since
+        return jsonify(
+            {
+                **chat,
+                "messages": page.items,
+                "next_since": next_since,
+                "has_more": page.next_cursor is not None,
+            }
+        )
+
+    return conditional_response(stamp, build)
+
+
+@api_bp.get("/chats/<int:chat_id>/messages")
+def api_list_messages(chat_id: int) -> Any:
+    service = get_messenger_service(read_only=True)
+    if service.get_chat_summary(chat_id) is None:
+        return _json_error("chat not found", HTTPStatus.NOT_FOUND)
+
+    try:
+        page = service.list_message_rows(
+            chat_id,
+            before=request.args.get("before") or None,
+            limit=get_page_limit(request.args.get("limit")),
+        )
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+
+    return jsonify({"messages": page.items, "next_before": page.next_cursor})
+
+
+def _user_id_list(payload: dict[str, Any]) -> list[int] | None:
+    user_ids = payload.get("user_ids")
+    if not isinstance(user_ids, list) or not user_ids:
+        return None
+    try:
+        return [int(value) for value in user_ids]
+    except (TypeError, ValueError):
+        return None
+
+
+@api_bp.get("/chats/<int:chat_id>/participants")
+def api_list_participants(chat_id: int) -> Any:
+    service = get_messenger_service(read_only=True)
+    if service.get_chat_summary(chat_id) is None:
+        return _json_error("chat not found", HTTPStatus.NOT_FOUND)
+
+    try:
+        page = service.list_participants(
+            chat_id,
+            after=request.args.get("after") or None,
+            limit=get_page_limit(request.args.get("limit")),
+        )
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+
+    return jsonify({"participants": page.items, "next_after": page.next_cursor})
+
+
+@api_bp.get("/chats/<int:chat_id>/participants/<int:user_id>")
+def api_check_participant(chat_id: int, user_id: int) -> Any:
+    service = get_messenger_service(read_only=True)
+    if not service.is_participant(chat_id, user_id):
+        return _json_error("not a participant", HTTPStatus.NOT_FOUND)
+    return "", int(HTTPStatus.NO_CONTENT)
+
+
+@api_bp.post("/chats/<int:chat_id>/participants")
+@api_bp.delete("/chats/<int:chat_id>/participants")
+def api_change_participants(chat_id: int) -> Any:
+    """Bulk add (``POST``) or remove (``DELETE``) members given ``{"user_ids": [...]}``."""
+
     service = get_messenger_service()
-    chat = service.get_chat(chat_id, include_messages=True)
-    if chat is None:
+    user_ids = _user_id_list(request.get_json(silent=True) or {})
+    if user_ids is None:
+        return _json_error("user_ids must be a non-empty list of ids", HTTPStatus.BAD_REQUEST)
+    if len(user_ids) > int(current_app.config["PARTICIPANT_BATCH_MAX"]):
+        return _json_error("too many user_ids", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+    try:
+        if request.method == "POST":
+            result = service.add_participants(chat_id, user_ids)
+        else:
+            result = service.remove_participants(chat_id, user_ids)
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.NOT_FOUND)
+
+    return jsonify(result)
+
+
+@api_bp.get("/chats/<int:chat_id>/export")
+def api_export_chat(chat_id: int) -> Any:
+    """Stream a chat's whole history as JSON Lines or CSV, optionally gzipped.
+
+    Rows are read through a server-side cursor and encoded chunk by chunk, so
+    memory stays flat for any chat length. ``after_id`` resumes an interrupted
+    export after the last message id received.
+    """
+
+    service = get_messenger_service(read_only=True)
+    if service.get_chat_summary(chat_id) is None:
         return _json_error("chat not found", HTTPStatus.NOT_FOUND)
-    return jsonify(chat.to_dict(include_messages=True))
+
+    export_format = request.args.get("format", "jsonl")
+    if export_format not in EXPORT_FORMATS:
+        return _json_error("format must be jsonl or csv", HTTPStatus.BAD_REQUEST)
+    try:
+        after_id = int(request.args["after_id"]) if request.args.get("after_id") else None
+    except ValueError:
+        return _json_error("after_id must be an integer", HTTPStatus.BAD_REQUEST)
+
+    rows = service.export_message_rows(
+        chat_id, after_id=after_id, batch_size=int(current_app.config["EXPORT_BATCH_SIZE"])
+    )
+    if export_format == "jsonl":
+        chunks = encode_jsonl(rows, current_app.json.dumps)
+    else:
+        chunks = encode_csv(rows)
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"chat-{chat_id}.{extension}"
+    if request.args.get("gzip", "").lower() in {"1", "true", "yes"}:
+        chunks = gzip_chunks(chunks)
+        mimetype = "application/gzip"
+        filename += ".gz"
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
 @api_bp.post("/chats/<int:chat_id>/messages")
@@ -94,11 +302,331 @@ def api_send_message(chat_id: int) -> Any:
 
     if author_id is None or not content:
         return _json_error("author_id and content are required", HTTPStatus.BAD_REQUEST)
+    try:
+        author_id = int(author_id)
+    except (TypeError, ValueError):
+        return _json_error("author_id must be an integer", HTTPStatus.BAD_REQUEST)
 
+    rate_limit("chat", chat_id)
+    rate_limit("author", author_id)
     try:
-        message = service.send_message(chat_id=chat_id, author_id=int(author_id), content=content)
+        message = service.send_message(chat_id=chat_id, author_id=author_id, content=content)
     except ValueError as exc:
         return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+    except QueueFullError as exc:
+        body, status = _json_error(str(exc), HTTPStatus.SERVICE_UNAVAILABLE)
+        return jsonify(body), status, {"Retry-After": "1"}
+    except TimeoutError:
+        return _json_error("message was not acknowledged in time", HTTPStatus.GATEWAY_TIMEOUT)
 
     return jsonify(message.to_dict()), int(HTTPStatus.CREATED)
 
+
+@api_bp.post("/chats/<int:chat_id>/messages:batch")
+def api_send_messages_batch(chat_id: int) -> Any:
+    service = get_messenger_service()
+    payload = request.get_json(silent=True) or {}
+    batch = payload.get("messages")
+
+    if not isinstance(batch, list) or not batch:
+        return _json_error("messages must be a non-empty list", HTTPStatus.BAD_REQUEST)
+    if len(batch) > int(current_app.config["MESSAGE_BATCH_MAX"]):
+        return _json_error("too many messages in batch", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+    rate_limit("chat", chat_id, cost=len(batch))
+    # Buckets are charged on the ids the service will use, so "01" and 1 share one;
+    # items without a valid id are skipped here and reported as failed per item.
+    authors: Counter[int] = Counter()
+    for item in batch:
+        try:
+            authors[int(item["author_id"])] += 1
+        except (KeyError, TypeError, ValueError):
+            continue
+    for author_id, count in authors.items():
+        rate_limit("author", author_id, cost=count)
+    try:
+        results = service.send_messages(chat_id=chat_id, batch=batch)
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.NOT_FOUND)
+
+    created = sum(1 for result in results if result["status"] == "created")
+    status = HTTPStatus.CREATED if created else HTTPStatus.BAD_REQUEST
+    body = {"created": created, "failed": len(results) - created, "results": results}
+    return jsonify(body), int(status)
+
+
+@api_bp.post("/chats/<int:chat_id>/read")
+def api_mark_read(chat_id: int) -> Any:
+    service = get_messenger_service()
+    payload = request.get_json(silent=True) or {}
+    user_id = payload.get("user_id")
+    message_id = payload.get("message_id")
+
+    if user_id is None:
+        return _json_error("user_id is required", HTTPStatus.BAD_REQUEST)
+    try:
+        user_id = int(user_id)
+        message_id = int(message_id) if message_id is not None else None
+    except (TypeError, ValueError):
+        return _json_error("user_id and message_id must be integers", HTTPStatus.BAD_REQUEST)
+
+    try:
+        state = service.mark_read(chat_id=chat_id, user_id=user_id, message_id=message_id)
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.NOT_FOUND)
+
+    return jsonify(state)
+
+
+def _presence_user_id() -> int | None:
+    payload = request.get_json(silent=True) or {}
+    try:
+        return int(payload["user_id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+@api_bp.post("/chats/<int:chat_id>/heartbeat")
+def api_heartbeat(chat_id: int) -> Any:
+    """Keep ``user_id`` online while the chat is open; a TTL store write, no database."""
+
+    user_id = _presence_user_id()
+    if user_id is None:
+        return _json_error("user_id must be an integer", HTTPStatus.BAD_REQUEST)
+    current_app.extensions["presence"].heartbeat(user_id)
+    return "", int(HTTPStatus.NO_CONTENT)
+
+
+@api_bp.post("/chats/<int:chat_id>/typing")
+def api_typing(chat_id: int) -> Any:
+    """Start (``{"typing": true}``, the default) or stop ``user_id``'s typing indicator.
+
+    Not checked against membership here, which would cost a query per
+    keystroke; status reads only report the chat's members.
+    """
+
+    user_id = _presence_user_id()
+    if user_id is None:
+        return _json_error("user_id must be an integer", HTTPStatus.BAD_REQUEST)
+    payload = request.get_json(silent=True) or {}
+    typing = payload.get("typing", True)
+    current_app.extensions["presence"].set_typing(chat_id, user_id, typing=bool(typing))
+    return "", int(HTTPStatus.NO_CONTENT)
+
+
+@api_bp.get("/chats/<int:chat_id>/presence")
+def api_chat_presence(chat_id: int) -> Any:
+    """Members of the chat who are ``online`` and ``typing``, by user id."""
+
+    service = get_messenger_service(read_only=True)
+    if service.get_chat_summary(chat_id) is None:
+        return _json_error("chat not found", HTTPStatus.NOT_FOUND)
+    members = service.iter_participant_ids(
+        chat_id, batch_size=int(current_app.config["PRESENCE_BATCH_SIZE"])
+    )
+    return jsonify(current_app.extensions["presence"].chat_status(chat_id, members))
+
+
+@api_bp.get("/chats/<int:chat_id>/events")
+def api_chat_events(chat_id: int) -> Any:
+    """Stream new messages of a chat as Server-Sent Events.
+
+    The subscription is opened before the response is returned and the
+    generator runs outside the app context, so no DB session is held while
+    the connection idles.
+    """
+
+    service = get_messenger_service(read_only=True)
+    if service.get_chat_summary(chat_id) is None:
+        return _json_error("chat not found", HTTPStatus.NOT_FOUND)
+
+    keepalive = float(current_app.config["SSE_KEEPALIVE_SECONDS"])
+    subscription = current_app.extensions["event_bus"].subscribe(chat_channel(chat_id))
+
+    def _stream() -> Iterator[str]:
+        with subscription:
+            yield f"retry: {int(keepalive * 1000)}\n\n"
+            while True:
+                event = subscription.get(timeout=keepalive)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                data = json.dumps(event, default=str)
+                yield f"id: {event.get('id', '')}\nevent: message\ndata: {data}\n\n"
+
+    response = Response(
+        _stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # The generator's ``with`` only runs once iterated; HEAD or an early
+    # disconnect never starts it, so the server's close hook unsubscribes too.
+    response.call_on_close(subscription.close)
+    return response
+
+
+@api_bp.get("/search/messages")
+def api_search_messages() -> Any:
+    service = get_messenger_service(read_only=True)
+    query = request.args.get("q", "").strip()
+    if not query:
+        return _json_error("q is required", HTTPStatus.BAD_REQUEST)
+
+    try:
+        user_id = int(request.args["user_id"])
+        chat_id = request.args.get("chat_id", type=int)
+        author_id = request.args.get("author_id", type=int)
+    except (KeyError, ValueError):
+        return _json_error("user_id is required", HTTPStatus.BAD_REQUEST)
+
+    try:
+        page = service.search_messages(
+            user_id,
+            query,
+            chat_id=chat_id,
+            author_id=author_id,
+            after=request.args.get("after") or None,
+            limit=get_page_limit(request.args.get("limit")),
+        )
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+
+    return jsonify({"results": page.items, "next_after": page.next_cursor})
+
+
+@api_bp.post("/sync")
+def api_sync() -> Any:
+    """Delta sync of many chats: ``{"chats": {id: last_seen_id}, "since", "limit"}``.
+
+    A body of ``{"continuation": token}`` instead fetches the rest of the
+    messages a previous response capped.
+    """
+
+    service = get_messenger_service(read_only=True)
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return _json_error("body must be a JSON object", HTTPStatus.BAD_REQUEST)
+    continuation = payload.get("continuation")
+    if continuation is not None:
+        # The token is client-held and unsigned: bound it like a fresh request.
+        try:
+            cursors, limit = service.decode_continuation(str(continuation))
+        except ValueError as exc:
+            return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+        if len(cursors) > int(current_app.config["SYNC_MAX_CHATS"]):
+            return _json_error("too many chats", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        return jsonify(service.continue_sync(cursors, limit=get_page_limit(str(limit))))
+
+    chats = payload.get("chats")
+    if not isinstance(chats, dict) or not chats:
+        return _json_error("chats must be a non-empty object", HTTPStatus.BAD_REQUEST)
+    if len(chats) > int(current_app.config["SYNC_MAX_CHATS"]):
+        return _json_error("too many chats", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    try:
+        cursors = {int(chat_id): int(last_seen or 0) for chat_id, last_seen in chats.items()}
+    except (TypeError, ValueError):
+        return _json_error("chats must map chat ids to message ids", HTTPStatus.BAD_REQUEST)
+    since = payload.get("since")
+    limit = payload.get("limit")
+    try:
+        result = service.sync_chats(
+            cursors,
+            since=str(since) if since else None,
+            limit=get_page_limit(str(limit) if limit is not None else None),
+        )
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+    return jsonify(result)
+
+
+def _utc_arg(name: str) -> datetime | None:
+    """ISO 8601 query argument as naive UTC, the form timestamps are stored in."""
+
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        value = datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 timestamp") from None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _stats_window() -> tuple[str, datetime, datetime]:
+    """``granularity``, ``since`` and ``until`` of a stats request.
+
+    Defaults to daily buckets over the last 30 days (hourly: the last 24 hours).
+    """
+
+    granularity = request.args.get("granularity", DAY)
+    if granularity not in GRANULARITIES:
+        raise ValueError("granularity must be one of: " + ", ".join(GRANULARITIES))
+    step = timedelta(days=1) if granularity == DAY else timedelta(hours=1)
+    until = _utc_arg("until") or datetime.now(timezone.utc).replace(tzinfo=None)
+    since = _utc_arg("since") or until - step * (30 if granularity == DAY else 24)
+    if since >= until:
+        raise ValueError("since must be before until")
+    if (until - since) / step > int(current_app.config["STATS_MAX_BUCKETS"]):
+        raise ValueError("too many buckets; narrow since/until or use a coarser granularity")
+    return granularity, since, until
+
+
+@api_bp.get("/stats/activity")
+def api_activity_stats() -> Any:
+    """Messages and active authors per ``hour``/``day`` bucket, read from the rollups.
+
+    ``since``/``until`` are ISO 8601 timestamps; ``chat_id`` or ``author_id``
+    narrows the series to one chat or author.
+    """
+
+    service = get_messenger_service(read_only=True)
+    try:
+        granularity, since, until = _stats_window()
+        buckets = service.activity_stats(
+            granularity,
+            since,
+            until,
+            chat_id=request.args.get("chat_id", type=int),
+            author_id=request.args.get("author_id", type=int),
+        )
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+    return jsonify(
+        {"granularity": granularity, "since": since, "until": until, "buckets": buckets}
+    )
+
+
+@api_bp.get("/stats/busiest-chats")
+def api_busiest_chats() -> Any:
+    """Chats with the most messages between ``since`` and ``until``, busiest first."""
+
+    service = get_messenger_service(read_only=True)
+    try:
+        granularity, since, until = _stats_window()
+        chats = service.busiest_chats(
+            granularity, since, until, limit=get_page_limit(request.args.get("limit"))
+        )
+    except ValueError as exc:
+        return _json_error(str(exc), HTTPStatus.BAD_REQUEST)
+    return jsonify({"since": since, "until": until, "chats": chats})
+
+
+@api_bp.get("/cache/stats")
+def api_cache_stats() -> Any:
+    return jsonify(current_app.extensions["cache"].stats().to_dict())
+
+
+@api_bp.get("/messages/queue/stats")
+def api_message_queue_stats() -> Any:
+    writer = current_app.extensions.get("message_writer")
+    if writer is None:
+        return _json_error("write-behind queue is disabled", HTTPStatus.NOT_FOUND)
+    return jsonify(writer.stats().to_dict())
+
+
+@api_bp.get("/db/pool/stats")
+def api_pool_stats() -> Any:
+    database = current_app.extensions["database"]
+    return jsonify({key: stats.to_dict() for key, stats in database.pool_stats().items()})
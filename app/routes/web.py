@@ -2,20 +2,54 @@
 
 from __future__ import annotations
 
-from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
+from typing import Any, Mapping, Sequence
 
-from . import get_messenger_service
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    flash,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
+from markupsafe import Markup
+
+from app.db.cache import message_fragment_key
+from app.ratelimit import rate_limit
+from app.services import QueueFullError
+
+from . import conditional_response, get_messenger_service, get_page_limit
 
 
 web_bp = Blueprint("web", __name__)
 
+# Members named in the chat header; the rest are summarized as a count.
+PARTICIPANT_PREVIEW = 20
+# Directory entries listed on the home page per page.
+USER_PAGE_SIZE = 20
+# Members offered in the author dropdown; larger chats get a plain id field.
+AUTHOR_CHOICES_MAX = 200
+
 
 @web_bp.route("/")
 def home() -> str:
-    service = get_messenger_service()
-    chats = list(service.list_chats())
-    users = list(service.list_users())
-    return render_template("index.html", chats=chats, users=users)
+    """Chats plus one page of the user directory; the rest is reached by typeahead."""
+
+    service = get_messenger_service(read_only=True)
+    chats = service.list_chat_rows()
+    prefix = request.args.get("prefix", "").strip()
+    try:
+        users = service.search_users(
+            prefix=prefix or None, after=request.args.get("after") or None, limit=USER_PAGE_SIZE
+        )
+    except ValueError:
+        abort(400)
+    return render_template(
+        "index.html", chats=chats, users=users.items, next_after=users.next_cursor, prefix=prefix
+    )
 
 
 @web_bp.route("/users", methods=["POST"])
@@ -28,6 +62,7 @@ def create_user() -> str:
         flash("Username and display name are required", "error")
         return redirect(url_for("web.home"))
 
+    rate_limit("signup", request.remote_addr)
     try:
         service.create_user(username=username, display_name=display_name, email=email)
     except ValueError as exc:
@@ -66,12 +101,96 @@ def create_chat() -> str:
 
 @web_bp.route("/chats/<int:chat_id>")
 def view_chat(chat_id: int) -> str:
-    service = get_messenger_service()
-    chat = service.get_chat(chat_id, include_messages=True)
+    """Render the latest window of a chat; older and newer messages arrive as fragments."""
+
+    service = get_messenger_service(read_only=True)
+    chat = service.get_chat_summary(chat_id)
     if chat is None:
         abort(404)
-    users = list(service.list_users())
-    return render_template("chat.html", chat=chat, users=users)
+    try:
+        page = service.list_message_rows(
+            chat_id,
+            before=request.args.get("before") or None,
+            limit=get_page_limit(request.args.get("limit")),
+        )
+    except ValueError:
+        abort(400)
+    members = service.list_participants(chat_id, limit=AUTHOR_CHOICES_MAX)
+    return render_template(
+        "chat.html",
+        chat=chat,
+        messages_html=render_messages(page.items),
+        next_before=page.next_cursor,
+        last_id=page.items[-1]["id"] if page.items else None,
+        participants=members.items[:PARTICIPANT_PREVIEW],
+        authors=members.items if members.next_cursor is None else None,
+        participant_count=chat["participant_count"],
+    )
+
+
+@web_bp.route("/chats/<int:chat_id>/fragments")
+def message_fragments(chat_id: int) -> Response:
+    """HTML of a message window: newer than ``after`` (a message id), older than the
+    ``before`` page cursor, or the latest page.
+
+    ``X-Next-Before``/``X-Next-After`` carry the cursors for the following
+    request and the response is conditional on the chat's version, so polling
+    an idle chat is answered with ``304``.
+    """
+
+    service = get_messenger_service(read_only=True)
+    stamp = service.chat_version(chat_id)
+    if stamp is None:
+        abort(404)
+    try:
+        after = int(request.args["after"]) if request.args.get("after") else None
+    except ValueError:
+        abort(400)
+    before = request.args.get("before") or None
+    limit = get_page_limit(request.args.get("limit"))
+
+    def build() -> Response:
+        if after is not None:
+            page = service.list_message_rows_since(chat_id, after, limit=limit)
+            response = Response(render_messages(page.items), mimetype="text/html")
+            response.headers["X-Has-More"] = "1" if page.next_cursor else "0"
+        else:
+            try:
+                page = service.list_message_rows(chat_id, before=before, limit=limit)
+            except ValueError:
+                abort(400)
+            response = Response(render_messages(page.items), mimetype="text/html")
+            if page.next_cursor:
+                response.headers["X-Next-Before"] = page.next_cursor
+        last_id = page.items[-1]["id"] if page.items else after
+        if last_id is not None and before is None:
+            response.headers["X-Next-After"] = str(last_id)
+        return response
+
+    return conditional_response(stamp, build)
+
+
+def render_messages(messages: Sequence[Mapping[str, Any]]) -> Markup:
+    """Concatenated ``_message.html`` fragments, cached per message id.
+
+    Messages never change once sent, so a fragment is rendered at most once per
+    cache lifetime; all lookups and stores go to the cache in one batch each.
+    """
+
+    cache = current_app.extensions["cache"]
+    keys = [message_fragment_key(message["chat_id"], message["id"]) for message in messages]
+    cached = cache.get_many(keys)
+    template = current_app.jinja_env.get_template("_message.html")
+    rendered: dict[str, str] = {}
+    parts = []
+    for key, message in zip(keys, messages):
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = template.render(message=message)
+        parts.append(html)
+    if rendered:
+        cache.set_many(rendered)
+    return Markup("\n".join(parts))
 
 
 @web_bp.route("/chats/<int:chat_id>/messages", methods=["POST"])
@@ -86,9 +205,13 @@ def post_message(chat_id: int) -> str:
 
     try:
         author_id = int(author_id_raw)
+        rate_limit("chat", chat_id)
+        rate_limit("author", author_id)
         service.send_message(chat_id=chat_id, author_id=author_id, content=content)
-    except ValueError as exc:
+    except (ValueError, QueueFullError) as exc:
         flash(str(exc), "error")
+    except TimeoutError:
+        flash("Message was not acknowledged in time", "error")
 
     return redirect(url_for("web.view_chat", chat_id=chat_id))
 
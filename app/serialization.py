@@ -0,0 +1,151 @@
+"""JSON providers and row serializers for the API read path."""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any, Mapping
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:  # pragma: no cover - exercised only when orjson is installed
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, with ISO 8601 datetimes to match ``to_dict``."""
+
+    default = staticmethod(_default)  # type: ignore[assignment]
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """Encodes responses with orjson; datetimes are serialized natively."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._dumps_bytes(obj).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Any:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
+
+    def _dumps_bytes(self, obj: Any) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+
+
+def init_json_provider(app: Flask, backend: str = "auto") -> None:
+    """Install the JSON provider selected by ``JSON_BACKEND``.
+
+    ``auto`` picks orjson when it is importable and falls back to the stdlib.
+    """
+
+    if backend not in {"auto", "orjson", "stdlib"}:
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    if backend == "orjson" and orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson but orjson is not installed")
+
+    use_orjson = orjson is not None and backend != "stdlib"
+    app.json = OrjsonProvider(app) if use_orjson else StdlibJSONProvider(app)
+
+
+def dumps_bytes(obj: Any, backend: str = "auto") -> bytes:
+    """Encode ``obj`` outside Flask (ASGI responses), honouring ``JSON_BACKEND``."""
+
+    if orjson is not None and backend != "stdlib":
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def user_row(row: Mapping[str, Any]) -> dict[str, Any]:
+    """Serialize a projected user row, mirroring ``User.to_dict``."""
+
+    return {
+        "id": row["id"],
+        "username": row["username"],
+        "display_name": row["display_name"],
+        "email": row["email"],
+    }
+
+
+def message_row(row: Mapping[str, Any], include_author: bool = False) -> dict[str, Any]:
+    """Serialize a projected message row, mirroring ``Message.to_dict``.
+
+    Author columns are expected under ``author_``-prefixed keys.
+    """
+
+    data: dict[str, Any] = {
+        "id": row["id"],
+        "content": row["content"],
+        "chat_id": row["chat_id"],
+        "author_id": row["author_id"],
+        "created_at": row["created_at"],
+    }
+    if include_author:
+        data["author"] = {
+            "id": row["author_id"],
+            "username": row["author_username"],
+            "display_name": row["author_display_name"],
+            "email": row["author_email"],
+        }
+    return data
+
+
+def inbox_row(row: Any) -> dict[str, Any]:
+    """Serialize a ``ChatRepository.list_inbox`` row with its last-message preview."""
+
+    last_message = None
+    if row.last_message_id is not None:
+        last_message = {
+            "id": row.last_message_id,
+            "content": row.last_message_content,
+            "author_id": row.last_message_author_id,
+            "created_at": row.last_message_created_at.isoformat(),
+        }
+    return {
+        "id": row.id,
+        "title": row.title,
+        "description": row.description,
+        "last_activity_at": row.last_activity_at.isoformat(),
+        "unread_count": row.unread_count,
+        "last_read_message_id": row.last_read_message_id,
+        "last_message": last_message,
+    }
+
+
+def sync_chat_row(row: Mapping[str, Any]) -> dict[str, Any]:
+    """Serialize a ``ChatRepository.sync_rows`` row: metadata and summary columns."""
+
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "description": row["description"],
+        "participant_count": row["participant_count"],
+        "last_message_id": row["last_message_id"],
+        "last_activity_at": row["last_activity_at"].isoformat(),
+    }
+
+
+__all__ = [
+    "OrjsonProvider",
+    "StdlibJSONProvider",
+    "dumps_bytes",
+    "inbox_row",
+    "init_json_provider",
+    "message_row",
+    "sync_chat_row",
+    "user_row",
+]
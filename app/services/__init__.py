@@ -1,6 +1,19 @@
 """Service exports."""
 
+from .async_messenger_service import AsyncMessengerService
+from .event_bus import InProcessEventBus, PostgresEventBus, chat_channel, create_event_bus
 from .messenger_service import MessengerService
+from .write_behind import MessageWriter, QueueFullError, WriterStats
 
-__all__ = ["MessengerService"]
+__all__ = [
+    "AsyncMessengerService",
+    "InProcessEventBus",
+    "MessageWriter",
+    "MessengerService",
+    "PostgresEventBus",
+    "QueueFullError",
+    "WriterStats",
+    "chat_channel",
+    "create_event_bus",
+]
 
@@ -0,0 +1,118 @@
+"""Asyncio facade over the messenger domain service."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, Mapping, Sequence, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.cache import CacheBackend
+from app.db.pagination import Page
+
+from .event_bus import InProcessEventBus, chat_channel
+from .messenger_service import MessengerService
+
+T = TypeVar("T")
+
+
+class AsyncMessengerService:
+    """Async API for the ASGI entry point.
+
+    Every call runs one :class:`MessengerService` operation inside
+    ``AsyncSession.run_sync``, so validation, caching and transaction handling
+    are shared with the WSGI app. Results are returned as plain dicts because
+    ORM attributes must not be lazy-loaded outside the session's greenlet.
+    Events are published from a worker thread so a PostgreSQL NOTIFY never
+    blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        events: InProcessEventBus | None = None,
+        cache: CacheBackend | None = None,
+    ) -> None:
+        self._session = session
+        self._events = events
+        self._cache = cache
+
+    async def _run(self, operation: Callable[[MessengerService], T]) -> T:
+        def run(sync_session: Session) -> T:
+            return operation(MessengerService(sync_session, cache=self._cache))
+
+        return await self._session.run_sync(run)
+
+    async def _publish(self, chat_id: int, payloads: Sequence[dict[str, Any]]) -> None:
+        if self._events is None or not payloads:
+            return
+
+        def publish() -> None:
+            for payload in payloads:
+                self._events.publish(chat_channel(chat_id), payload)
+
+        await asyncio.to_thread(publish)
+
+    # Users -----------------------------------------------------------------
+    async def search_users(
+        self, prefix: str | None = None, after: str | None = None, limit: int = 50
+    ) -> dict[str, Any]:
+        page = await self._run(lambda service: service.search_users(prefix, after, limit))
+        return {"users": page.items, "next_after": page.next_cursor}
+
+    async def get_user_rows(self, user_ids: Sequence[int]) -> list[dict[str, Any]]:
+        return await self._run(lambda service: service.get_user_rows(user_ids))
+
+    async def get_user_profile(self, user_id: int) -> dict[str, Any] | None:
+        return await self._run(lambda service: service.get_user_profile(user_id))
+
+    async def create_user(
+        self, username: str, display_name: str, email: str | None = None
+    ) -> dict[str, Any]:
+        return await self._run(
+            lambda service: service.create_user(username, display_name, email).to_dict()
+        )
+
+    # Chats ------------------------------------------------------------------
+    async def list_chat_rows(self) -> list[dict[str, Any]]:
+        return await self._run(lambda service: service.list_chat_rows())
+
+    async def get_chat_summary(self, chat_id: int) -> dict[str, Any] | None:
+        return await self._run(lambda service: service.get_chat_summary(chat_id))
+
+    async def create_chat(
+        self, title: str, participant_ids: Sequence[int], description: str | None = None
+    ) -> dict[str, Any]:
+        def create(service: MessengerService) -> dict[str, Any]:
+            chat = service.create_chat(title, participant_ids, description)
+            return service.get_chat_summary(chat.id)  # type: ignore[return-value]
+
+        return await self._run(create)
+
+    async def list_inbox(self, user_id: int, before: str | None = None, limit: int = 50) -> Page[Any]:
+        return await self._run(lambda service: service.list_inbox(user_id, before, limit))
+
+    # Messages ---------------------------------------------------------------
+    async def list_message_rows(
+        self, chat_id: int, before: str | None = None, limit: int = 50
+    ) -> Page[dict[str, Any]]:
+        return await self._run(lambda service: service.list_message_rows(chat_id, before, limit))
+
+    async def send_message(self, chat_id: int, author_id: int, content: str) -> dict[str, Any]:
+        message = await self._run(
+            lambda service: service.send_message(chat_id, author_id, content).to_dict()
+        )
+        await self._publish(chat_id, [message])
+        return message
+
+    async def send_messages(
+        self, chat_id: int, batch: Sequence[Mapping[str, Any]]
+    ) -> list[dict[str, object]]:
+        results = await self._run(lambda service: service.send_messages(chat_id, batch))
+        created = [result["message"] for result in results if result["status"] == "created"]
+        await self._publish(chat_id, created)  # type: ignore[arg-type]
+        return results
+
+
+__all__ = ["AsyncMessengerService"]
@@ -0,0 +1,179 @@
+"""Publish/subscribe fan-out of messenger events."""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import select
+import threading
+from typing import Any, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+Event = dict[str, Any]
+
+
+def chat_channel(chat_id: int) -> str:
+    """Return the bus channel name carrying events for a chat."""
+
+    return f"chat:{chat_id}"
+
+
+class Subscription:
+    """A bounded per-subscriber mailbox attached to one channel."""
+
+    def __init__(self, bus: "InProcessEventBus", channel: str, maxsize: int) -> None:
+        self._bus = bus
+        self.channel = channel
+        self._queue: queue.Queue[Event] = queue.Queue(maxsize=maxsize)
+
+    def put(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logger.warning("Dropping event for slow subscriber on %s", self.channel)
+
+    def get(self, timeout: float | None = None) -> Optional[Event]:
+        """Wait for the next event, returning ``None`` on timeout."""
+
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class InProcessEventBus:
+    """Delivers events to subscribers living in the current process."""
+
+    def __init__(self, subscriber_queue_size: int = 256) -> None:
+        self._subscriber_queue_size = subscriber_queue_size
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel, self._subscriber_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.channel]
+
+    def publish(self, channel: str, event: Event) -> None:
+        self.dispatch(channel, event)
+
+    def dispatch(self, channel: str, event: Event) -> None:
+        """Hand an event to local subscribers of ``channel``."""
+
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+
+class PostgresEventBus(InProcessEventBus):
+    """Fans events out to every process through PostgreSQL LISTEN/NOTIFY.
+
+    All channels are multiplexed over a single NOTIFY channel; one listener
+    thread per process re-dispatches incoming notifications to local
+    subscribers. The listener starts lazily on first subscribe so that it is
+    created after gunicorn forks its workers.
+    """
+
+    NOTIFY_CHANNEL = "messenger_events"
+    # PostgreSQL rejects NOTIFY payloads of 8000 bytes or more.
+    MAX_PAYLOAD_BYTES = 7900
+
+    def __init__(self, database_url: str, subscriber_queue_size: int = 256) -> None:
+        super().__init__(subscriber_queue_size)
+        self._engine: Engine = create_engine(database_url, pool_size=1, max_overflow=2)
+        self._listener: threading.Thread | None = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        self._ensure_listener()
+        return super().subscribe(channel)
+
+    def publish(self, channel: str, event: Event) -> None:
+        payload = json.dumps({"channel": channel, "event": event}, default=str)
+        if len(payload.encode()) > self.MAX_PAYLOAD_BYTES:
+            stub = {key: value for key, value in event.items() if key != "content"}
+            stub["truncated"] = True
+            payload = json.dumps({"channel": channel, "event": stub}, default=str)
+
+        with self._engine.connect() as connection:
+            connection.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.NOTIFY_CHANNEL, "payload": payload},
+            )
+            connection.commit()
+
+    def _ensure_listener(self) -> None:
+        with self._listener_lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen, name="event-bus-listener", daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self) -> None:
+        raw = self._engine.raw_connection()
+        try:
+            dbapi_connection = raw.driver_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.NOTIFY_CHANNEL}")
+            while True:
+                if select.select([dbapi_connection], [], [], 5.0) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    try:
+                        message = json.loads(notify.payload)
+                        self.dispatch(message["channel"], message["event"])
+                    except (ValueError, KeyError):
+                        logger.warning("Ignoring malformed notification: %r", notify.payload)
+        except Exception:  # pragma: no cover - the listener restarts on next subscribe
+            logger.exception("Event bus listener stopped")
+        finally:
+            raw.close()
+
+
+def create_event_bus(backend: str, database_url: str) -> InProcessEventBus:
+    """Build the event bus configured by ``EVENT_BUS_BACKEND``."""
+
+    if backend == "memory":
+        return InProcessEventBus()
+    if backend == "postgres":
+        return PostgresEventBus(database_url)
+    raise ValueError(f"Unknown event bus backend: {backend}")
+
+
+__all__ = [
+    "InProcessEventBus",
+    "PostgresEventBus",
+    "Subscription",
+    "chat_channel",
+    "create_event_bus",
+]
@@ -2,27 +2,144 @@
 
 from __future__ import annotations
 
-from typing import Iterable, Sequence
+import heapq
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Collection, Iterable, Iterator, Mapping, Sequence
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.db.repositories import ChatRepository, MessageRepository, UserRepository
+from app.db.cache import (
+    CacheBackend,
+    NullCache,
+    chat_key,
+    latest_messages_key,
+    read_through,
+    user_key,
+)
+from app.db.pagination import Page, decode_state, encode_state
+from app.db.repositories import (
+    ChatRepository,
+    MembershipRepository,
+    MessageRepository,
+    RollupRepository,
+    SearchRepository,
+    ShardRepository,
+    UserRepository,
+    VersionRepository,
+)
+from app.db.repositories.membership_repository import JOINED, LEFT, RESET
+from app.db.repositories.rollup_repository import (
+    AUTHOR,
+    CHAT,
+    TOTAL,
+    bucket_start,
+    bucket_starts,
+)
+from app.db.repositories.version_repository import CHATS, USERS
+from app.db import sharding
+from app.db.sharding import ShardSessions, hash_ring, message_id_range, replicate_users
+from app.db.versions import VersionStamp
 from app.models import Chat, Message, User
+from app.serialization import message_row, sync_chat_row, user_row
+
+from .event_bus import InProcessEventBus, chat_channel
+
+if TYPE_CHECKING:
+    from .write_behind import MessageWriter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _Shard:
+    """Repositories bound to one shard's session."""
+
+    index: int
+    session: Session
+    chats: ChatRepository
+    messages: MessageRepository
+    search: SearchRepository
+    versions: VersionRepository
+    rollups: RollupRepository
+    memberships: MembershipRepository
+
+    @classmethod
+    def open(cls, index: int, session: Session) -> _Shard:
+        return cls(
+            index,
+            session,
+            ChatRepository(session),
+            MessageRepository(session, id_range=message_id_range(index)),
+            SearchRepository(session),
+            VersionRepository(session),
+            RollupRepository(session),
+            MembershipRepository(session),
+        )
 
 
 class MessengerService:
-    """High-level API for the messenger domain."""
+    """High-level API for the messenger domain.
 
-    def __init__(self, session: Session) -> None:
+    ``session`` is the home database (shard 0): users, the chat directory and
+    the home shard's chats. With ``shards`` set, every chat operation is routed
+    to the shard the directory names, and listings over all chats are gathered
+    from every shard and merged.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        events: InProcessEventBus | None = None,
+        cache: CacheBackend | None = None,
+        writer: MessageWriter | None = None,
+        shards: ShardSessions | None = None,
+    ) -> None:
         self._session = session
+        self._events = events
+        self._cache = cache if cache is not None else NullCache()
+        self._writer = writer
+        self._shards = shards if shards is not None else ShardSessions(session)
         self._user_repo = UserRepository(session)
-        self._chat_repo = ChatRepository(session)
-        self._message_repo = MessageRepository(session)
+        self._directory = ShardRepository(session)
+        self._home = _Shard.open(0, session)
+        self._opened = {0: self._home}
+        # Directory lookups made by this unit of work, by chat id.
+        self._placements: dict[int, int] = {}
+        # Version rows read by chat_version(); response bodies built in the same
+        # unit of work are checked against them instead of trusting the cache.
+        self._chat_versions: dict[int, Any] = {}
 
     # Users -----------------------------------------------------------------
-    def list_users(self) -> Iterable[User]:
-        return self._user_repo.list_users()
+    def search_users(
+        self, prefix: str | None = None, after: str | None = None, limit: int = 50
+    ) -> Page[dict[str, Any]]:
+        """Directory page ordered by username; ``prefix`` narrows it for typeahead."""
+
+        page = self._user_repo.search_directory(prefix=prefix, after=after, limit=limit)
+        return Page(items=[user_row(row) for row in page.items], next_cursor=page.next_cursor)
+
+    def get_user_rows(self, user_ids: Sequence[int]) -> list[dict[str, Any]]:
+        """Cached profiles for ``user_ids`` in request order; unknown ids are skipped.
+
+        One cache round trip for all ids, then one ``IN`` query for the misses.
+        """
+
+        keys = {user_id: user_key(user_id) for user_id in user_ids}
+        cached = self._cache.get_many(list(keys.values()))
+        profiles = {user_id: cached[key] for user_id, key in keys.items() if key in cached}
+        missing = [user_id for user_id in keys if user_id not in profiles]
+        if missing:
+            loaded = {
+                user_id: user_row(row)
+                for user_id, row in self._user_repo.get_rows(missing).items()
+            }
+            self._cache.set_many({user_key(user_id): row for user_id, row in loaded.items()})
+            profiles.update(loaded)
+        return [profiles[user_id] for user_id in keys if user_id in profiles]
 
     def create_user(self, username: str, display_name: str, email: str | None = None) -> User:
         existing = self._user_repo.get_by_username(username)
@@ -31,58 +148,894 @@ class MessengerService:
 
         try:
             user = self._user_repo.create(username=username, display_name=display_name, email=email)
+            self._home.versions.bump(USERS)
             self._session.commit()
         except IntegrityError as exc:  # pragma: no cover - safety net for race conditions
             self._session.rollback()
             raise ValueError("Username already exists") from exc
 
+        for shard in self._all_shards()[1:]:
+            try:
+                replicate_users(shard.session, [user])
+                shard.session.commit()
+            except Exception:  # noqa: BLE001 - repaired on first use or by `shards sync-users`
+                shard.session.rollback()
+                logger.exception("Replicating user %s to shard %s failed", user.id, shard.index)
+        self._cache.set(user_key(user.id), user.to_dict())
         return user
 
+    def users_version(self) -> VersionStamp:
+        """Validator for the user list; changes whenever a user is created."""
+
+        return self._collection_version(USERS, [self._home])
+
     def get_user(self, user_id: int) -> User | None:
         return self._user_repo.get_by_id(user_id)
 
+    def get_user_profile(self, user_id: int) -> dict[str, Any] | None:
+        """Cached ``User.to_dict()``; ``None`` when the user does not exist."""
+
+        def load() -> dict[str, Any] | None:
+            user = self._user_repo.get_by_id(user_id)
+            return user.to_dict() if user else None
+
+        return read_through(self._cache, user_key(user_id), load)
+
     # Chats ------------------------------------------------------------------
     def list_chats(self) -> Iterable[Chat]:
-        return self._chat_repo.list_chats()
+        """Chats of every shard by title, merged from one ordered query per shard."""
+
+        listings = [shard.chats.list_chats() for shard in self._all_shards()]
+        return heapq.merge(*listings, key=lambda chat: (chat.title, chat.id))
 
-    def get_chat(self, chat_id: int, include_messages: bool = False) -> Chat | None:
-        if include_messages:
-            return self._chat_repo.get_with_messages(chat_id)
-        return self._chat_repo.get_by_id(chat_id)
+    def list_chat_rows(self) -> list[dict[str, Any]]:
+        """Chat metadata with member counts, one query per shard merged by title."""
+
+        listings = [shard.chats.list_chat_rows() for shard in self._all_shards()]
+        return [
+            dict(row)
+            for row in heapq.merge(*listings, key=lambda row: (row["title"], row["id"]))
+        ]
+
+    def chats_version(self) -> VersionStamp:
+        """Validator for the chat list: chats created, moved and memberships changed.
+
+        Each shard keeps its own counter, bumped in the same transaction as the
+        change; the stamp combines all of them.
+        """
+
+        return self._collection_version(CHATS, self._all_shards())
+
+    def chat_version(self, chat_id: int) -> VersionStamp | None:
+        """Validator for one chat and its latest messages; ``None`` if it does not exist.
+
+        Reads three columns by primary key: the chat's ``updated_at`` and
+        ``last_message_id`` (advanced on every send) and the chats counter
+        (advanced on membership changes, which move ``participant_count``).
+        """
+
+        row = self._shard(chat_id).chats.version_row(chat_id, VersionRepository.version_of(CHATS))
+        if row is None:
+            return None
+        self._chat_versions[chat_id] = row
+        return VersionStamp(
+            parts=(chat_id, row.updated_at, row.last_message_id, row.collection_version),
+            last_modified=row.updated_at,
+        )
+
+    def get_chat(self, chat_id: int) -> Chat | None:
+        return self._shard(chat_id).chats.get_by_id(chat_id)
+
+    def get_chat_summary(self, chat_id: int) -> dict[str, Any] | None:
+        """Cached ``Chat.to_dict()`` plus ``participant_count``.
+
+        After :meth:`chat_version` the cached entry is only used if it was
+        stored for the same version row, so the body matches the ETag.
+        """
+
+        key = chat_key(chat_id)
+        entry = self._cache.get(key)
+        version = self._chat_versions.get(chat_id)
+        tag = self._version_tag(version) if version is not None else None
+        if entry is not None and (tag is None or entry["version"] == tag):
+            return entry["chat"]
+
+        shard = self._shard(chat_id)
+        chat = shard.chats.get_by_id(chat_id)
+        if chat is None:
+            return None
+        count = shard.chats.count_participants(chat_id)
+        summary = {**chat.to_dict(), "participant_count": count}
+        self._cache.set(key, {"chat": summary, "version": tag})
+        return summary
+
+    @staticmethod
+    def _version_tag(row: Any) -> list[Any]:
+        """JSON-safe form of a ``version_row`` for tagging cache entries."""
+
+        return [row.updated_at.isoformat(), row.last_message_id, row.collection_version]
 
     def create_chat(
         self, title: str, participant_ids: Sequence[int], description: str | None = None
     ) -> Chat:
-        participants = [self._user_repo.get_by_id(user_id) for user_id in participant_ids]
-        if not all(participants):
-            missing = [pid for pid, user in zip(participant_ids, participants) if user is None]
+        """Create a chat on the shard its id hashes to.
+
+        The id is allocated by the directory on the home database, which is
+        committed first when the chat goes elsewhere; an id whose chat insert
+        then fails is left unused.
+        """
+
+        unique_ids = set(participant_ids)
+        found = self._user_repo.get_many(unique_ids)
+        missing = [user_id for user_id in participant_ids if user_id not in found]
+        if missing:
             raise ValueError(f"Participants not found: {missing}")
 
-        chat = self._chat_repo.create(
-            title=title,
-            description=description,
-            participants=[user for user in participants if user],
+        chat_id, index = self._directory.allocate(hash_ring(self._shards.count).shard_for)
+        shard = self._placed(chat_id, index)
+        if shard is not self._home:
+            self._session.commit()
+            self._replicate(shard, found.values())
+        chat = shard.chats.create(
+            title=title, description=description, participant_ids=unique_ids, chat_id=chat_id
         )
-        self._session.commit()
+        self._log_membership(shard, chat.id, JOINED, sorted(unique_ids))
+        shard.session.commit()
+        summary = {**chat.to_dict(), "participant_count": len(unique_ids)}
+        self._cache.set(chat_key(chat.id), {"chat": summary, "version": None})
         return chat
 
+    # Participants -----------------------------------------------------------
+    def list_participants(
+        self, chat_id: int, after: str | None = None, limit: int = 50
+    ) -> Page[dict[str, Any]]:
+        page = self._shard(chat_id).chats.list_participant_page(chat_id, after=after, limit=limit)
+        return Page(items=[user_row(row) for row in page.items], next_cursor=page.next_cursor)
+
+    def iter_participant_ids(self, chat_id: int, batch_size: int = 1000) -> Iterator[list[int]]:
+        """A chat's member ids in ascending batches, one keyset query per batch."""
+
+        chats = self._shard(chat_id).chats
+        after = 0
+        while True:
+            batch = chats.participant_ids(chat_id, after=after, limit=batch_size)
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            after = batch[-1]
+
+    def is_participant(self, chat_id: int, user_id: int) -> bool:
+        return self._shard(chat_id).chats.is_participant(chat_id, user_id)
+
+    def add_participants(self, chat_id: int, user_ids: Sequence[int]) -> dict[str, list[int]]:
+        """Add existing users to a chat in bulk.
+
+        Users are validated with one ``IN`` query and inserted with one
+        idempotent upsert. Returns the ids ``added`` (not already members) and
+        the ids ``missing`` (no such user).
+        """
+
+        shard = self._shard(chat_id)
+        if not shard.chats.existing_ids({chat_id}):
+            raise ValueError("Chat not found")
+        found = self._user_repo.get_many(set(user_ids))
+        self._replicate(shard, found.values())
+        added = shard.chats.add_participants(chat_id, set(found))
+        if added:
+            self._membership_changed(shard, chat_id, JOINED, added)
+        shard.session.commit()
+        if added:
+            self._cache.delete(chat_key(chat_id))
+        return {"added": added, "missing": sorted(set(user_ids) - set(found))}
+
+    def remove_participants(self, chat_id: int, user_ids: Sequence[int]) -> dict[str, list[int]]:
+        """Remove users from a chat with one set-based delete."""
+
+        shard = self._shard(chat_id)
+        if not shard.chats.existing_ids({chat_id}):
+            raise ValueError("Chat not found")
+        removed = shard.chats.remove_participants(chat_id, set(user_ids))
+        if removed:
+            self._membership_changed(shard, chat_id, LEFT, removed)
+        shard.session.commit()
+        if removed:
+            self._cache.delete(chat_key(chat_id))
+        return {"removed": removed}
+
+    def list_inbox(self, user_id: int, before: str | None = None, limit: int = 50) -> Page[Any]:
+        """A user's chats by last activity; each shard's page is merged on the cursor key."""
+
+        pages = [
+            shard.chats.list_inbox(user_id, before=before, limit=limit)
+            for shard in self._all_shards()
+        ]
+        return self._merge_pages(
+            pages,
+            limit,
+            key=lambda row: (row.last_activity_at, row.id),
+            encode=ChatRepository.encode_inbox_cursor,
+        )
+
+    def mark_read(
+        self, chat_id: int, user_id: int, message_id: int | None = None
+    ) -> dict[str, Any]:
+        shard = self._shard(chat_id)
+        state = shard.chats.mark_read(chat_id, user_id, message_id)
+        if state is None:
+            shard.session.rollback()
+            raise ValueError("User is not a participant of this chat")
+        shard.session.commit()
+        return state
+
     # Messages ---------------------------------------------------------------
-    def list_messages(self, chat_id: int) -> Iterable[Message]:
-        return self._message_repo.list_for_chat(chat_id)
+    def list_messages(self, chat_id: int, before: str | None = None, limit: int = 50) -> Page[Message]:
+        return self._shard(chat_id).messages.list_for_chat(chat_id, before=before, limit=limit)
+
+    def list_message_rows(
+        self, chat_id: int, before: str | None = None, limit: int = 50
+    ) -> Page[dict[str, Any]]:
+        """Projected message page; the newest page of each chat is cached per limit.
+
+        Cached pages are tagged with their newest message id and only served
+        while it still equals the chat's ``last_message_id``, so a cache that
+        missed an invalidation (another worker's memory cache) is never reused.
+        """
+
+        shard = self._shard(chat_id)
+        cached_pages: dict[str, Any] = {}
+        if before is None:
+            version = self._chat_versions.get(chat_id)
+            if version is not None:
+                latest_id = version.last_message_id
+            else:
+                latest_id = shard.chats.last_message_id(chat_id)
+            entry = self._cache.get(latest_messages_key(chat_id))
+            if entry is not None and entry["latest_id"] == latest_id:
+                cached_pages = entry["pages"]
+            cached = cached_pages.get(str(limit))
+            if cached is not None:
+                return Page(items=cached["items"], next_cursor=cached["next_cursor"])
+
+        page = shard.messages.list_rows_for_chat(chat_id, before=before, limit=limit)
+        items = [message_row(row, include_author=True) for row in page.items]
+        if before is None:
+            pages = {**cached_pages, str(limit): {"items": items, "next_cursor": page.next_cursor}}
+            entry = {"latest_id": items[-1]["id"] if items else None, "pages": pages}
+            self._cache.set(latest_messages_key(chat_id), entry)
+        return Page(items=items, next_cursor=page.next_cursor)
+
+    def list_message_rows_since(
+        self, chat_id: int, since_id: int, limit: int = 50
+    ) -> Page[dict[str, Any]]:
+        """Messages newer than ``since_id`` oldest-first, for delta polling."""
+
+        page = self._shard(chat_id).messages.list_rows_after(chat_id, since_id, limit=limit)
+        items = [message_row(row, include_author=True) for row in page.items]
+        return Page(items=items, next_cursor=page.next_cursor)
+
+    def export_message_rows(
+        self, chat_id: int, after_id: int | None = None, batch_size: int = 1000
+    ) -> Iterator[Mapping[str, Any]]:
+        """Stream a chat's full history oldest-first; see ``stream_rows_for_chat``."""
+
+        return self._shard(chat_id).messages.stream_rows_for_chat(
+            chat_id, after_id=after_id, batch_size=batch_size
+        )
+
+    def search_messages(
+        self,
+        user_id: int,
+        query: str,
+        chat_id: int | None = None,
+        author_id: int | None = None,
+        after: str | None = None,
+        limit: int = 20,
+    ) -> Page[dict[str, Any]]:
+        """Ranked search over messages in chats ``user_id`` participates in.
+
+        Without ``chat_id`` every shard is searched and the pages are merged
+        on ``(rank, id, chat_id)``, the cursor key.
+        """
+
+        shards = [self._shard(chat_id)] if chat_id is not None else self._all_shards()
+        pages = [
+            shard.search.search(
+                user_id, query, chat_id=chat_id, author_id=author_id, after=after, limit=limit
+            )
+            for shard in shards
+        ]
+        page = self._merge_pages(
+            pages,
+            limit,
+            key=lambda row: (row["rank"], row["id"], row["chat_id"]),
+            encode=SearchRepository.encode_cursor,
+        )
+        return Page(items=[dict(row) for row in page.items], next_cursor=page.next_cursor)
 
     def send_message(self, chat_id: int, author_id: int, content: str) -> Message:
-        chat = self._chat_repo.get_by_id(chat_id)
+        """Persist a message, joining its author to the chat if needed.
+
+        The common case is the message write, the chat summary/unread counter
+        update and the commit; chat and author existence are checked by foreign
+        keys and only looked up to build the error message when the insert
+        fails.
+
+        With a write-behind ``writer`` configured the send is queued instead and
+        this call returns once the batch containing it has committed.
+        """
+
+        if self._writer is not None:
+            return self._writer.submit(chat_id, author_id, content)
+
+        message = self._store_message(self._shard(chat_id), chat_id, author_id, content)
+        self.announce([message])
+        return message
+
+    def send_messages(
+        self, chat_id: int, batch: Sequence[Mapping[str, Any]]
+    ) -> list[dict[str, object]]:
+        """Send many messages to one chat in a single transaction.
+
+        Authors are validated with one ``IN`` query, membership is updated with
+        one upsert into ``chat_users`` and the messages go in as multi-row
+        ``INSERT ... RETURNING``. Returns one outcome per input item: either
+        ``{"index", "status": "created", "message"}`` or
+        ``{"index", "status": "error", "error"}``.
+        """
+
+        shard = self._shard(chat_id)
+        chat = shard.chats.get_by_id(chat_id)
         if chat is None:
             raise ValueError("Chat not found")
 
-        author = self._user_repo.get_by_id(author_id)
-        if author is None:
-            raise ValueError("User not found")
+        results: list[dict[str, object]] = [{} for _ in batch]
+        candidates: list[tuple[int, int, str]] = []
+        for index, item in enumerate(batch):
+            try:
+                author_id = int(item.get("author_id"))  # type: ignore[arg-type]
+            except (AttributeError, TypeError, ValueError):
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "error": "author_id is required",
+                }
+                continue
+            content = str(item.get("content", "")).strip()
+            if not content:
+                results[index] = {"index": index, "status": "error", "error": "content is required"}
+                continue
+            candidates.append((index, author_id, content))
 
-        if author not in chat.participants:
-            self._chat_repo.add_participant(chat, author)
+        authors = self._user_repo.get_many({author_id for _, author_id, _ in candidates})
+        accepted: list[tuple[int, int, str]] = []
+        for index, author_id, content in candidates:
+            if author_id in authors:
+                accepted.append((index, author_id, content))
+            else:
+                results[index] = {"index": index, "status": "error", "error": "User not found"}
 
-        message = self._message_repo.create(chat=chat, author=author, content=content)
-        self._session.commit()
-        return message
+        self._replicate(shard, {authors[author_id] for _, author_id, _ in accepted})
+        inserted = self._insert_for_chat(
+            shard, chat_id, [(author_id, content) for _, author_id, content in accepted]
+        )
+        shard.session.commit()
+
+        messages = []
+        for (index, author_id, content), (message_id, created_at) in zip(accepted, inserted):
+            message = Message(
+                id=message_id,
+                chat_id=chat_id,
+                author_id=author_id,
+                content=content,
+                created_at=created_at,
+            )
+            messages.append(message)
+            results[index] = {"index": index, "status": "created", "message": message.to_dict()}
+        self.announce(messages)
+        return results
+
+    def send_message_group(
+        self, items: Sequence[tuple[int, int, str]]
+    ) -> list[Message | Exception]:
+        """Insert ``(chat_id, author_id, content)`` sends for many chats, one commit per shard.
+
+        This is the group-commit step of the write-behind writer. Chats and
+        authors are validated with one ``IN`` query each and every chat's rows
+        go in as one multi-row insert. Returns, per item, the transient
+        ``Message`` or the exception that rejected it. A shard whose group
+        commit fails is retried one send at a time, so an exception raised
+        here means nothing was stored. Nothing is announced: the caller passes
+        the stored messages to :meth:`announce`.
+        """
+
+        shards = self._shards_of({chat_id for chat_id, _, _ in items})
+        chats: set[int] = set()
+        for shard, chat_ids in shards.values():
+            chats |= shard.chats.existing_ids(chat_ids)
+        authors = self._user_repo.get_many({author_id for _, author_id, _ in items})
+        outcomes: list[Message | Exception] = []
+        groups: dict[int, dict[int, list[int]]] = {}
+        for index, (chat_id, author_id, _) in enumerate(items):
+            if chat_id not in chats:
+                outcomes.append(ValueError("Chat not found"))
+            elif author_id not in authors:
+                outcomes.append(ValueError("User not found"))
+            else:
+                outcomes.append(ValueError("Message was not stored"))
+                shard_index = self._placements.get(chat_id, 0)
+                groups.setdefault(shard_index, {}).setdefault(chat_id, []).append(index)
+
+        for shard_index, by_chat in groups.items():
+            shard = self._shard_at(shard_index)
+            indexes = [index for chat_indexes in by_chat.values() for index in chat_indexes]
+            try:
+                self._replicate(shard, {authors[items[index][1]] for index in indexes})
+                stored: list[tuple[int, Message]] = []
+                for chat_id, chat_indexes in by_chat.items():
+                    rows = [items[index][1:] for index in chat_indexes]
+                    inserted = self._insert_for_chat(shard, chat_id, rows)
+                    for index, (message_id, created_at) in zip(chat_indexes, inserted):
+                        _, author_id, content = items[index]
+                        message = Message(
+                            id=message_id,
+                            chat_id=chat_id,
+                            author_id=author_id,
+                            content=content,
+                            created_at=created_at,
+                        )
+                        stored.append((index, message))
+                shard.session.commit()
+            except Exception:  # noqa: BLE001 - isolate the failing send below
+                shard.session.rollback()
+                logger.exception(
+                    "Group commit of %d sends on shard %s failed; retrying singly",
+                    len(indexes),
+                    shard.index,
+                )
+                for index in indexes:
+                    outcomes[index] = self._try_store_message(shard, *items[index])
+            else:
+                for index, message in stored:
+                    outcomes[index] = message
+        return outcomes
+
+    def announce(self, messages: Sequence[Message]) -> None:
+        """Invalidate cached chat state and publish events for committed messages.
+
+        The messages are already stored, so failures are logged rather than
+        raised: a caller must never retry, and so duplicate, a stored send.
+        """
+
+        try:
+            for chat_id in dict.fromkeys(message.chat_id for message in messages):
+                self._invalidate_chat(chat_id)
+            if self._events is not None:
+                for message in messages:
+                    self._events.publish(chat_channel(message.chat_id), message.to_dict())
+        except Exception:  # noqa: BLE001 - the sends are committed either way
+            logger.exception("Announcing %d stored messages failed", len(messages))
+
+    def _store_message(
+        self, shard: _Shard, chat_id: int, author_id: int, content: str, retry: bool = True
+    ) -> Message:
+        """Insert and commit one send on ``shard``; nothing is announced.
+
+        Chat and author existence are checked by foreign keys and only looked
+        up to build the error message when the insert fails. A chat that is no
+        longer on ``shard`` (moved meanwhile) or an author missing from its
+        replica is fixed up and the send retried once.
+        """
+
+        try:
+            message, joined = shard.messages.create_as_participant(
+                chat_id=chat_id, author_id=author_id, content=content
+            )
+            if joined:
+                self._log_membership(shard, chat_id, JOINED, [author_id])
+            shard.chats.record_activity(
+                chat_id, message.id, message.created_at, authored={author_id: 1}
+            )
+            shard.rollups.record([(chat_id, author_id, message.created_at)])
+            shard.session.commit()
+            return message
+        except IntegrityError as exc:
+            shard.session.rollback()
+            if shard.chats.get_by_id(chat_id) is None:
+                current = self._shard(chat_id, fresh=True)
+                if retry and current is not shard:
+                    return self._store_message(current, chat_id, author_id, content, False)
+                raise ValueError("Chat not found") from exc
+            author = self._user_repo.get_by_id(author_id)
+            if author is None:
+                raise ValueError("User not found") from exc
+            if retry and shard is not self._home:
+                self._replicate(shard, [author])
+                return self._store_message(shard, chat_id, author_id, content, False)
+            raise
+
+    def _try_store_message(
+        self, shard: _Shard, chat_id: int, author_id: int, content: str
+    ) -> Message | Exception:
+        try:
+            return self._store_message(shard, chat_id, author_id, content)
+        except Exception as exc:  # noqa: BLE001 - handed to the waiting request
+            shard.session.rollback()
+            return exc
+
+    def _insert_for_chat(
+        self, shard: _Shard, chat_id: int, rows: Sequence[tuple[int, str]]
+    ) -> list[tuple[int, datetime]]:
+        """Upsert memberships, bulk-insert ``(author_id, content)`` rows and bump counters."""
+
+        joined = shard.chats.ensure_participants(chat_id, {author_id for author_id, _ in rows})
+        if joined:
+            self._log_membership(shard, chat_id, JOINED, joined)
+        inserted = shard.messages.create_many(chat_id, rows)
+        if inserted:
+            authored = Counter(author_id for author_id, _ in rows)
+            last_id, last_created_at = inserted[-1]
+            shard.chats.record_activity(chat_id, last_id, last_created_at, authored)
+            shard.rollups.record(
+                (chat_id, author_id, created_at)
+                for (author_id, _), (_, created_at) in zip(rows, inserted)
+            )
+        return inserted
+
+    def _collection_version(self, name: str, shards: Sequence[_Shard]) -> VersionStamp:
+        rows = [shard.versions.get(name) for shard in shards]
+        versions = tuple(row.version if row is not None else 0 for row in rows)
+        changed = [row.changed_at for row in rows if row is not None]
+        return VersionStamp(parts=(name, *versions), last_modified=max(changed, default=None))
+
+    def _membership_changed(
+        self, shard: _Shard, chat_id: int, kind: str, user_ids: Sequence[int]
+    ) -> None:
+        shard.chats.touch(chat_id)
+        self._log_membership(shard, chat_id, kind, user_ids)
+
+    @staticmethod
+    def _log_membership(shard: _Shard, chat_id: int, kind: str, user_ids: Sequence[int]) -> None:
+        """Bump the shard's chats counter and log the change under the new version."""
+
+        shard.memberships.record(chat_id, kind, user_ids, shard.versions.bump(CHATS))
+
+    # Sync --------------------------------------------------------------------
+    def sync_chats(
+        self, cursors: Mapping[int, int], since: str | None = None, limit: int = 50
+    ) -> dict[str, Any]:
+        """What changed in each chat of ``cursors`` (chat id to last seen message id, ``0``).
+
+        Per chat: up to ``limit`` messages after the cursor, oldest first; the
+        ``joined``/``left`` user ids since the ``since`` token, or the full
+        ``members`` list without one or after the chat moved shards; and its
+        ``chat`` metadata whenever any of that changed. Each shard answers with
+        one query per entity type however many chats it holds. ``sync_token``
+        is the next call's ``since``; ``continuation`` (see
+        :meth:`continue_sync`) resumes the chats whose messages were capped.
+
+        Raises ``ValueError`` for a malformed ``since`` token.
+        """
+
+        after = self._decode_sync_token(since) if since is not None else None
+        # Read before the log: changes committed meanwhile wait for the next sync.
+        upto = list(self._collection_version(CHATS, self._all_shards()).parts[1:])
+        response = self._sync(cursors, limit, after, upto)
+        response["sync_token"] = encode_state({"v": upto})
+        return response
+
+    def continue_sync(self, cursors: Mapping[int, int], limit: int = 50) -> dict[str, Any]:
+        """The next messages of the chats a :meth:`sync_chats` response capped.
+
+        ``cursors`` and ``limit`` come from :meth:`decode_continuation`; the
+        token is not signed, so callers bound both as for :meth:`sync_chats`.
+        Only messages are returned; membership and metadata were already
+        reported.
+        """
+
+        response = self._sync(cursors, limit, None, None)
+        response["sync_token"] = None
+        return response
+
+    def _sync(
+        self,
+        cursors: Mapping[int, int],
+        limit: int,
+        after: list[int] | None,
+        upto: list[int] | None,
+    ) -> dict[str, Any]:
+        """Messages of every chat in ``cursors``, plus membership and metadata if ``upto``."""
+
+        entries: dict[int, dict[str, Any]] = {}
+        missing: list[int] = []
+        backlog: list[list[int]] = []
+        for index, (shard, chat_ids) in sorted(self._shards_of(cursors).items()):
+            rows = shard.chats.sync_rows(chat_ids)
+            missing += chat_ids - rows.keys()
+            found = {chat_id: cursors[chat_id] for chat_id in rows}
+            for chat_id, messages in shard.messages.list_rows_after_many(found, limit).items():
+                has_more = len(messages) > limit
+                entries[chat_id] = {
+                    "messages": [message_row(row, include_author=True) for row in messages[:limit]],
+                    "has_more": has_more,
+                }
+                if has_more:
+                    backlog.append([chat_id, messages[limit - 1]["id"]])
+            if upto is None:
+                continue
+            since = None
+            if after is not None:
+                # Shards added after the token was issued start from the beginning.
+                since = after[index] if index < len(after) else 0
+            for chat_id, delta in self._membership_deltas(shard, rows, since, upto[index]).items():
+                entries.setdefault(chat_id, {}).update(delta)
+            for chat_id, row in rows.items():
+                if after is None or chat_id in entries:
+                    entries.setdefault(chat_id, {})["chat"] = sync_chat_row(row)
+
+        continuation = encode_state({"c": backlog, "l": limit}) if backlog else None
+        return {
+            "chats": [{"chat_id": chat_id, **entries[chat_id]} for chat_id in sorted(entries)],
+            "missing": sorted(missing),
+            "continuation": continuation,
+        }
+
+    @staticmethod
+    def _membership_deltas(
+        shard: _Shard, chat_ids: Collection[int], since: int | None, upto: int
+    ) -> dict[int, dict[str, list[int]]]:
+        """Net ``joined``/``left`` per chat in ``(since, upto]``, or a ``members`` snapshot.
+
+        A snapshot replaces the log without ``since`` and for chats whose log
+        restarted on this shard (a ``reset`` entry from a move).
+        """
+
+        snapshot: set[int] = set(chat_ids) if since is None else set()
+        latest: dict[int, dict[int, str]] = {}
+        if since is not None:
+            for chat_id, user_id, kind in shard.memberships.changes(chat_ids, since, upto):
+                if kind == RESET:
+                    snapshot.add(chat_id)
+                else:
+                    latest.setdefault(chat_id, {})[user_id] = kind
+        deltas: dict[int, dict[str, list[int]]] = {
+            chat_id: {
+                "joined": sorted(user for user, kind in users.items() if kind == JOINED),
+                "left": sorted(user for user, kind in users.items() if kind == LEFT),
+            }
+            for chat_id, users in latest.items()
+            if chat_id not in snapshot
+        }
+        for chat_id, members in shard.chats.member_ids(snapshot).items():
+            deltas[chat_id] = {"members": members}
+        return deltas
+
+    @staticmethod
+    def decode_continuation(token: str) -> tuple[dict[int, int], int]:
+        """``(cursors, limit)`` of a ``continuation`` token; raises ``ValueError`` if malformed."""
+
+        state = decode_state(token)
+        try:
+            cursors = {int(chat_id): int(message_id) for chat_id, message_id in state["c"]}
+            limit = int(state["l"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+        if not cursors or limit < 1:
+            raise ValueError("Invalid cursor")
+        return cursors, limit
+
+    @staticmethod
+    def _decode_sync_token(token: str) -> list[int]:
+        """Per-shard chats versions of a ``sync_token``; raises ``ValueError`` if malformed."""
+
+        state = decode_state(token)
+        try:
+            return [int(version) for version in state["v"]]
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError("Invalid cursor") from exc
+
+    # Stats -------------------------------------------------------------------
+    def activity_stats(
+        self,
+        granularity: str,
+        since: datetime,
+        until: datetime,
+        chat_id: int | None = None,
+        author_id: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Messages and active authors per bucket in ``[since, until)``, empty ones included.
+
+        Answered from the rollups with one row per bucket and stripe per shard.
+        A chat's or an author's series has no ``authors``. Active authors are
+        distinct per shard, so one writing on two shards in a bucket counts twice.
+        """
+
+        since = bucket_start(since, granularity)
+        if chat_id is not None:
+            scope, subject_id, shards = CHAT, chat_id, [self._shard(chat_id)]
+        elif author_id is not None:
+            scope, subject_id, shards = AUTHOR, author_id, self._all_shards()
+        else:
+            scope, subject_id, shards = TOTAL, None, self._all_shards()
+        messages: Counter[datetime] = Counter()
+        authors: Counter[datetime] = Counter()
+        for shard in shards:
+            for row in shard.rollups.series(granularity, since, until, scope, subject_id):
+                messages[row.bucket_start] += row.messages
+                authors[row.bucket_start] += row.authors
+        buckets = []
+        for start in bucket_starts(since, until, granularity):
+            bucket = {"start": start, "messages": messages[start]}
+            if scope == TOTAL:
+                bucket["authors"] = authors[start]
+            buckets.append(bucket)
+        return buckets
+
+    def busiest_chats(
+        self, granularity: str, since: datetime, until: datetime, limit: int = 10
+    ) -> list[dict[str, Any]]:
+        """The ``limit`` chats with the most messages in ``[since, until)``, busiest first.
+
+        Every shard ranks its own chats' rollups; a chat's counters move with
+        it, so the merged top ``limit`` is exact.
+        """
+
+        since = bucket_start(since, granularity)
+        ranked = []
+        for shard in self._all_shards():
+            rows = shard.rollups.top(granularity, since, until, CHAT, limit)
+            titles = shard.chats.titles([row.subject_id for row in rows])
+            ranked.extend(
+                {
+                    "chat_id": row.subject_id,
+                    "title": titles.get(row.subject_id),
+                    "messages": row.messages,
+                }
+                for row in rows
+            )
+        ranked.sort(key=lambda row: (-row["messages"], row["chat_id"]))
+        return ranked[:limit]
+
+    def backfill_rollups(
+        self, since: date | None = None, until: date | None = None
+    ) -> Iterator[tuple[int, date, int]]:
+        """Recount the rollups of whole days from ``messages``, one commit per shard and day.
+
+        ``until`` (exclusive) defaults to today, whose buckets live sends are
+        still filling; ``since`` to each shard's oldest message. Days whose
+        partitions were archived would be recounted as empty, so pass
+        ``since`` after an archive. Yields ``(shard, day, messages)``.
+        """
+
+        end = until or datetime.now(timezone.utc).date()
+        for shard in self._all_shards():
+            first = shard.messages.first_created_at()
+            day = since or (first.date() if first is not None else end)
+            while day < end:
+                start = datetime.combine(day, time.min)
+                try:
+                    counted = shard.rollups.rebuild(start, start + timedelta(days=1))
+                    shard.session.commit()
+                except Exception:
+                    shard.session.rollback()
+                    raise
+                yield shard.index, day, counted
+                day += timedelta(days=1)
+
+    # Shards ------------------------------------------------------------------
+    @property
+    def shard_count(self) -> int:
+        return self._shards.count
+
+    def shard_status(self) -> dict[int, int]:
+        """Number of chats per shard index, every shard listed."""
+
+        counts = self._directory.counts()
+        return {index: counts.get(index, 0) for index in range(self._shards.count)}
+
+    def rebalance_plan(self, limit: int | None = None) -> list[tuple[int, int, int]]:
+        """``(chat_id, current shard, hash ring shard)`` of chats placed off the ring."""
+
+        ring = hash_ring(self._shards.count)
+        plan = []
+        for chat_id, current in self._directory.iter_placements():
+            desired = ring.shard_for(chat_id)
+            if desired != current:
+                plan.append((chat_id, current, desired))
+                if limit is not None and len(plan) >= limit:
+                    break
+        return plan
+
+    def move_chat(self, chat_id: int, target: int, batch_size: int = 1000) -> int:
+        """Move a chat to shard ``target``; returns the number of messages copied."""
+
+        if not 0 <= target < self._shards.count:
+            raise ValueError(f"Shard {target} is not configured")
+        source = self._directory.shard_of(chat_id)
+        if source is None:
+            raise ValueError("Chat not found")
+        if source == target:
+            return 0
+        moved = sharding.move_chat(self._shards, chat_id, source, target, batch_size=batch_size)
+        self._placements[chat_id] = target
+        self._invalidate_chat(chat_id)
+        return moved
+
+    def sync_users(self, batch_size: int = 1000) -> int:
+        """Replicate every user to every shard, e.g. after adding one; returns the user count."""
+
+        synced = 0
+        for users in self._user_repo.iter_batches(batch_size):
+            for shard in self._all_shards()[1:]:
+                replicate_users(shard.session, users)
+                shard.session.commit()
+            synced += len(users)
+        return synced
+
+    def _shard(self, chat_id: int, fresh: bool = False) -> _Shard:
+        """The shard holding ``chat_id``; unknown chats resolve to the home shard."""
+
+        if self._shards.count == 1:
+            return self._home
+        if fresh or chat_id not in self._placements:
+            self._placements[chat_id] = self._directory.shard_of(chat_id) or 0
+        return self._shard_at(self._placements[chat_id])
+
+    def _shards_of(self, chat_ids: Collection[int]) -> dict[int, tuple[_Shard, set[int]]]:
+        """Group chat ids by shard with one directory query, keyed by shard index."""
+
+        if self._shards.count > 1:
+            missing = [chat_id for chat_id in chat_ids if chat_id not in self._placements]
+            found = self._directory.shards_of(missing)
+            self._placements.update({chat_id: found.get(chat_id, 0) for chat_id in missing})
+        groups: dict[int, tuple[_Shard, set[int]]] = {}
+        for chat_id in chat_ids:
+            index = self._placements.get(chat_id, 0)
+            groups.setdefault(index, (self._shard_at(index), set()))[1].add(chat_id)
+        return groups
+
+    def _placed(self, chat_id: int, index: int) -> _Shard:
+        self._placements[chat_id] = index
+        return self._shard_at(index)
+
+    def _shard_at(self, index: int) -> _Shard:
+        shard = self._opened.get(index)
+        if shard is None:
+            shard = self._opened[index] = _Shard.open(index, self._shards.get(index))
+        return shard
+
+    def _all_shards(self) -> list[_Shard]:
+        return [self._shard_at(index) for index in range(self._shards.count)]
+
+    def _replicate(self, shard: _Shard, users: Iterable[User]) -> None:
+        """Copy users to a non-home shard before rows there reference them."""
+
+        if shard is not self._home:
+            replicate_users(shard.session, users)
+
+    @staticmethod
+    def _merge_pages(
+        pages: Sequence[Page[Any]],
+        limit: int,
+        key: Callable[[Any], Any],
+        encode: Callable[[Any], str],
+    ) -> Page[Any]:
+        """Merge per-shard pages sorted descending by ``key`` into one page.
+
+        Every shard returned its first ``limit`` rows after the same cursor, so
+        the first ``limit`` of the merge are exact; the cursor is the last of
+        them whenever any shard had more.
+        """
+
+        if len(pages) == 1:
+            return pages[0]
+        rows = list(heapq.merge(*(page.items for page in pages), key=key, reverse=True))
+        has_more = len(rows) > limit or any(page.next_cursor for page in pages)
+        rows = rows[:limit]
+        next_cursor = encode(rows[-1]) if has_more and rows else None
+        return Page(items=rows, next_cursor=next_cursor)
+
+    def _invalidate_chat(self, chat_id: int) -> None:
+        """Drop cached state a new message makes stale (latest page, participants)."""
 
+        self._cache.delete(chat_key(chat_id), latest_messages_key(chat_id))
@@ -0,0 +1,239 @@
+"""Write-behind queue that group-commits message sends.
+
+Request threads enqueue sends and block on a future; one writer thread per
+process drains the queue into batches (up to ``max_batch`` messages or
+``max_delay`` seconds after the first one) and commits each batch in a single
+transaction. A future is resolved only after its batch has committed, so a
+send is never acknowledged before it is durable.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Iterable, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.db.cache import CacheBackend
+from app.db.sharding import ShardSessions
+from app.instrumentation import Histogram
+from app.models import Message
+
+from .event_bus import InProcessEventBus
+from .messenger_service import MessengerService
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+COMMIT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+_STOP = object()
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the write-behind queue is at capacity."""
+
+
+@dataclass(slots=True)
+class _PendingSend:
+    chat_id: int
+    author_id: int
+    content: str
+    future: Future[Message] = field(default_factory=Future)
+
+
+@dataclass(slots=True)
+class WriterStats:
+    """Counters published by :class:`MessageWriter`."""
+
+    queue_depth: int = 0
+    batches: int = 0
+    messages: int = 0
+    failed: int = 0
+    last_batch_size: int = 0
+    commit_seconds_total: float = 0.0
+    commit_seconds_max: float = 0.0
+
+    def to_dict(self) -> dict[str, float]:
+        return asdict(self)
+
+
+class MessageWriter:
+    """Bounded in-process queue plus a writer thread that commits in batches.
+
+    The thread is started lazily on the first submit, so a writer created
+    before gunicorn forks runs in each worker rather than only in the master.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        shard_session_factories: Sequence[Callable[[], Session]] = (),
+        events: InProcessEventBus | None = None,
+        cache: CacheBackend | None = None,
+        max_batch: int = 200,
+        max_delay: float = 0.005,
+        max_queue: int = 10_000,
+        ack_timeout: float = 10.0,
+    ) -> None:
+        self._session_factory = session_factory
+        self._shard_session_factories = list(shard_session_factories)
+        self._events = events
+        self._cache = cache
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._max_queue = max_queue
+        self._ack_timeout = ack_timeout
+        self._queue: queue.Queue[object] = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = WriterStats()
+        self.batch_sizes = Histogram(
+            "message_writer_batch_size", "Messages per group commit.", (), BATCH_SIZE_BUCKETS
+        )
+        self.commit_latency = Histogram(
+            "message_writer_commit_seconds", "Duration of each group commit.", (), COMMIT_BUCKETS
+        )
+
+    def submit(self, chat_id: int, author_id: int, content: str) -> Message:
+        """Queue a send and wait until its batch commits.
+
+        Raises ``QueueFullError`` when the queue is at capacity, ``TimeoutError``
+        when no acknowledgement arrives within ``ack_timeout`` and re-raises the
+        ``ValueError`` of a rejected send.
+        """
+
+        self._ensure_started()
+        pending = _PendingSend(chat_id, author_id, content)
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            raise QueueFullError("Message queue is full") from None
+        return pending.future.result(timeout=self._ack_timeout)
+
+    def stats(self) -> WriterStats:
+        with self._stats_lock:
+            stats = WriterStats(**asdict(self._stats))
+        stats.queue_depth = self._queue.qsize()
+        return stats
+
+    def render_metrics(self) -> Iterable[str]:
+        """Prometheus exposition lines for ``/metrics``."""
+
+        yield "# HELP message_writer_queue_depth Sends waiting for the writer."
+        yield "# TYPE message_writer_queue_depth gauge"
+        yield f"message_writer_queue_depth {self._queue.qsize()}"
+        yield from self.batch_sizes.render()
+        yield from self.commit_latency.render()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush queued sends and stop the writer thread."""
+
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    # Writer thread ----------------------------------------------------------
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # Forked child: the parent's thread and queue contents do not exist here.
+                self._queue = queue.Queue(maxsize=self._max_queue)
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name="message-writer", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch: list[_PendingSend] = [first]  # type: ignore[list-item]
+            deadline = time.monotonic() + self._max_delay
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)  # type: ignore[arg-type]
+            self._write(batch)
+
+    def _write(self, batch: list[_PendingSend]) -> None:
+        started = time.perf_counter()
+        session = self._session_factory()
+        shards = ShardSessions(session, self._shard_session_factories)
+        try:
+            service = MessengerService(
+                session, events=self._events, cache=self._cache, shards=shards
+            )
+            try:
+                outcomes = service.send_message_group(
+                    [(item.chat_id, item.author_id, item.content) for item in batch]
+                )
+            except Exception:  # noqa: BLE001 - isolate the failing send below
+                # Raised before any shard committed, so nothing was stored.
+                logger.exception("Group commit of %d sends failed; retrying singly", len(batch))
+                shards.rollback()
+                outcomes = [self._write_one(service, shards, item) for item in batch]
+            else:
+                service.announce([outcome for outcome in outcomes if isinstance(outcome, Message)])
+        finally:
+            shards.close()
+            session.close()
+        elapsed = time.perf_counter() - started
+
+        failed = sum(1 for outcome in outcomes if isinstance(outcome, Exception))
+        self.batch_sizes.observe(len(batch))
+        self.commit_latency.observe(elapsed)
+        with self._stats_lock:
+            self._stats.batches += 1
+            self._stats.messages += len(batch) - failed
+            self._stats.failed += failed
+            self._stats.last_batch_size = len(batch)
+            self._stats.commit_seconds_total += elapsed
+            self._stats.commit_seconds_max = max(self._stats.commit_seconds_max, elapsed)
+
+        for item, outcome in zip(batch, outcomes):
+            if isinstance(outcome, Exception):
+                item.future.set_exception(outcome)
+            else:
+                item.future.set_result(outcome)
+
+    @staticmethod
+    def _write_one(
+        service: MessengerService, shards: ShardSessions, item: _PendingSend
+    ) -> Message | Exception:
+        try:
+            return service.send_message(item.chat_id, item.author_id, item.content)
+        except Exception as exc:  # noqa: BLE001 - handed to the waiting request
+            shards.rollback()
+            return exc
+
+
+__all__ = ["MessageWriter", "QueueFullError", "WriterStats"]
@@ -0,0 +1,75 @@
+// Incremental chat updates over the HTML fragment endpoint: older pages are
+// prepended on demand and new messages are polled with conditional requests,
+// so an idle chat costs one 304 per poll.
+(function () {
+  "use strict";
+
+  var POLL_INTERVAL_MS = 5000;
+  var container = document.getElementById("messages");
+  if (!container || !window.fetch) {
+    return;
+  }
+  var url = container.dataset.fragmentsUrl;
+
+  function fragment(html) {
+    var template = document.createElement("template");
+    template.innerHTML = html;
+    return template.content;
+  }
+
+  function loadOlder(event) {
+    var link = event.target.closest("a[data-before]");
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+    fetch(url + "?before=" + encodeURIComponent(link.dataset.before))
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        var next = response.headers.get("X-Next-Before");
+        return response.text().then(function (html) {
+          link.parentNode.after(fragment(html));
+          if (next) {
+            link.dataset.before = next;
+          } else {
+            link.parentNode.remove();
+          }
+        });
+      })
+      .catch(function () {
+        window.location = link.href;
+      });
+  }
+
+  function poll() {
+    var lastId = container.dataset.lastId;
+    var query = lastId ? "?after=" + encodeURIComponent(lastId) : "";
+    fetch(url + query, { cache: "no-cache" })
+      .then(function (response) {
+        if (response.status !== 200) {
+          return;
+        }
+        var next = response.headers.get("X-Next-After");
+        return response.text().then(function (html) {
+          if (!html.trim()) {
+            return;
+          }
+          var empty = container.querySelector(".empty");
+          if (empty) {
+            empty.remove();
+          }
+          container.appendChild(fragment(html));
+          container.dataset.lastId = next;
+          if (response.headers.get("X-Has-More") === "1") {
+            poll();
+          }
+        });
+      })
+      .catch(function () {});
+  }
+
+  container.addEventListener("click", loadOlder);
+  window.setInterval(poll, POLL_INTERVAL_MS);
+})();
@@ -0,0 +1,87 @@
+// Typeahead over the user directory API (GET /api/users?prefix=): filters the
+// home page list in place and suggests chat participants by login or name.
+(function () {
+  "use strict";
+
+  var DEBOUNCE_MS = 150;
+  var SUGGESTIONS = 10;
+  var LIST_SIZE = 20;
+  if (!window.fetch) {
+    return;
+  }
+
+  function lookup(prefix, limit) {
+    var query = "?limit=" + limit + (prefix ? "&prefix=" + encodeURIComponent(prefix) : "");
+    return fetch("/api/users" + query).then(function (response) {
+      return response.ok ? response.json() : { users: [] };
+    });
+  }
+
+  function debounced(input, handler) {
+    var timer = null;
+    input.addEventListener("input", function () {
+      window.clearTimeout(timer);
+      timer = window.setTimeout(function () {
+        handler(input.value.trim());
+      }, DEBOUNCE_MS);
+    });
+  }
+
+  function renderUser(user) {
+    var item = document.createElement("li");
+    var name = document.createElement("strong");
+    name.textContent = user.display_name;
+    var details = document.createElement("span");
+    details.className = "muted";
+    details.textContent = " @" + user.username + " ID: " + user.id;
+    item.append(name, details);
+    return item;
+  }
+
+  document.querySelectorAll("input[data-user-search]").forEach(function (input) {
+    var list = document.querySelector(input.dataset.userSearch);
+    debounced(input, function (prefix) {
+      lookup(prefix, LIST_SIZE).then(function (page) {
+        list.replaceChildren.apply(list, page.users.map(renderUser));
+      });
+    });
+  });
+
+  document.querySelectorAll("input[data-user-pick]").forEach(function (input) {
+    var target = input.form.elements[input.dataset.userPick];
+    var options = document.getElementById(input.getAttribute("list"));
+    var byLabel = {};
+    debounced(input, function (prefix) {
+      if (!prefix) {
+        return;
+      }
+      lookup(prefix, SUGGESTIONS).then(function (page) {
+        byLabel = {};
+        options.replaceChildren.apply(
+          options,
+          page.users.map(function (user) {
+            var label = user.display_name + " (@" + user.username + ")";
+            byLabel[label] = user.id;
+            var option = document.createElement("option");
+            option.value = label;
+            return option;
+          })
+        );
+      });
+    });
+    input.addEventListener("change", function () {
+      var userId = byLabel[input.value];
+      if (userId === undefined) {
+        return;
+      }
+      var ids = target.value.split(",").map(function (value) {
+        return value.trim();
+      }).filter(Boolean);
+      if (ids.indexOf(String(userId)) === -1) {
+        ids.push(String(userId));
+      }
+      target.value = ids.join(",");
+      input.value = "";
+    });
+  });
+})();
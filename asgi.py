@@ -0,0 +1,6 @@
+"""ASGI entrypoint for the messenger JSON API (``uvicorn asgi:app``)."""
+
+from app.asgi import create_asgi_app
+
+
+app = create_asgi_app()
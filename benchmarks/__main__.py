@@ -0,0 +1,112 @@
+"""Command line entry point: ``python -m benchmarks run|compare``.
+
+Examples::
+
+    python -m benchmarks run --users 500 --chats 100 --messages 50000
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks run --skip-load
+    python -m benchmarks run --target-url http://localhost:5000 --skip-micro
+    python -m benchmarks compare benchmarks/results/a.json benchmarks/results/b.json
+
+Without ``DATABASE_URL`` a throwaway SQLite file is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def _run(args: argparse.Namespace) -> None:
+    if "DATABASE_URL" not in os.environ:
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    # Imported late so that wsgi:app picks up the database chosen above.
+    from app.services import MessengerService
+    from wsgi import app
+
+    from .load import run_load
+    from .micro import run_micro
+    from .results import metadata, save
+    from .seed import seed
+
+    started = time.perf_counter()
+    with app.app_context():
+        app.extensions["database"].upgrade_schema()
+        dataset = seed(
+            MessengerService(app.extensions["database"].session),
+            users=args.users,
+            chats=args.chats,
+            messages=args.messages,
+            skew=args.skew,
+            random_seed=args.seed,
+            prefix=f"bench-{time.time_ns()}",
+        )
+        app.extensions["database"].session.remove()
+    print(f"seeded {dataset.to_dict()} in {time.perf_counter() - started:.1f}s")
+
+    result = {
+        "meta": metadata(os.environ["DATABASE_URL"]),
+        "dataset": dataset.to_dict(),
+        "micro": {},
+        "load": None,
+    }
+    if not args.skip_micro:
+        result["micro"] = run_micro(app, dataset, iterations=args.iterations, random_seed=args.seed)
+    if not args.skip_load:
+        result["load"] = run_load(
+            app,
+            dataset,
+            target_url=args.target_url,
+            concurrency=args.concurrency,
+            requests=args.requests,
+            random_seed=args.seed,
+        )
+
+    print(json.dumps(result, indent=2))
+    print(f"saved to {save(result, Path(args.output)) if args.output else save(result)}")
+
+
+def _compare(args: argparse.Namespace) -> None:
+    from .results import compare
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    print("\n".join(compare(baseline, candidate)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="seed a dataset and run the benchmarks")
+    run.add_argument("--users", type=int, default=200)
+    run.add_argument("--chats", type=int, default=50)
+    run.add_argument("--messages", type=int, default=20_000)
+    run.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of messages per chat")
+    run.add_argument("--seed", type=int, default=1)
+    run.add_argument("--iterations", type=int, default=50)
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--requests", type=int, default=2000)
+    run.add_argument("--target-url", help="load an already running server instead of wsgi:app")
+    run.add_argument("--skip-micro", action="store_true")
+    run.add_argument("--skip-load", action="store_true")
+    run.add_argument("--output", help="directory for the JSON result (default benchmarks/results)")
+    run.set_defaults(func=_run)
+
+    diff = commands.add_parser("compare", help="compare two saved JSON results")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+    diff.set_defaults(func=_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
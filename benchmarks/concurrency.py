@@ -0,0 +1,130 @@
+"""Compare gunicorn sync workers (``wsgi:app``) with uvicorn (``asgi:app``).
+
+Both servers run as subprocesses against the same seeded database and get the
+same request mix at each concurrency level. Usage::
+
+    python -m benchmarks.concurrency --levels 8,32,128 --workers 4
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.concurrency
+
+Defaults to a throwaway SQLite file when ``DATABASE_URL`` is not set; use
+PostgreSQL for numbers that mean anything under write concurrency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _server_command(kind: str, port: int, workers: int) -> list[str]:
+    if kind == "wsgi":
+        return [
+            sys.executable, "-m", "gunicorn", "wsgi:app",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+            "--worker-class", "sync", "--log-level", "warning",
+        ]  # fmt: skip
+    return [
+        sys.executable, "-m", "uvicorn", "asgi:app",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]  # fmt: skip
+
+
+@contextlib.contextmanager
+def _serve(kind: str, workers: int, timeout: float = 30.0) -> Iterator[str]:
+    """Start a server subprocess and yield its base URL once it accepts connections."""
+
+    port = _free_port()
+    process = subprocess.Popen(_server_command(kind, port, workers), cwd=ROOT)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{kind} server did not start")
+                time.sleep(0.2)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=timeout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", default="8,32,128", help="comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per level")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    # Imported late so that the app picks up the database chosen above.
+    from app import create_app
+    from app.services import MessengerService
+
+    from .load import run_load
+    from .seed import seed
+
+    app = create_app()
+    with app.app_context():
+        app.extensions["database"].upgrade_schema()
+        dataset = seed(
+            MessengerService(app.extensions["database"].session),
+            users=args.users,
+            chats=args.chats,
+            messages=args.messages,
+            random_seed=args.seed,
+            prefix=f"bench-{time.time_ns()}",
+        )
+        app.extensions["database"].session.remove()
+
+    results: dict[str, list[dict[str, object]]] = {"wsgi": [], "asgi": []}
+    for kind in results:
+        with _serve(kind, args.workers) as url:
+            for level in (int(value) for value in args.levels.split(",")):
+                result = run_load(
+                    None,
+                    dataset,
+                    target_url=url,
+                    concurrency=level,
+                    requests=args.requests,
+                    random_seed=args.seed,
+                )
+                results[kind].append(result)
+                overall = result["overall"]
+                print(
+                    f"{kind:>4} c={level:<4} {overall['throughput_per_s']:8.1f} req/s  "
+                    f"p50 {overall['p50_ms']:7.1f} ms  p99 {overall['p99_ms']:7.1f} ms  "
+                    f"errors {result['errors']}"
+                )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
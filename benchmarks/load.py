@@ -0,0 +1,116 @@
+"""Concurrent HTTP load scenario against ``wsgi:app``."""
+
+from __future__ import annotations
+
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.parse import urlsplit
+
+from flask import Flask
+from werkzeug.serving import make_server
+
+from .micro import count_statements
+from .seed import Dataset
+from .stats import summarize
+
+# Relative weights of the request mix.
+SCENARIO = {"read": 6, "open_chat": 3, "send": 1}
+
+
+class _Server:
+    """Serve a Flask app on an ephemeral port in a background thread."""
+
+    def __init__(self, app: Flask) -> None:
+        self._server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "_Server":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._server.shutdown()
+
+
+def _request(
+    connection: http.client.HTTPConnection, kind: str, dataset: Dataset, rng: random.Random
+) -> int:
+    headers = {"Content-Type": "application/json"}
+    if kind == "read":
+        user_id = rng.choice(dataset.user_ids)
+        connection.request("GET", f"/api/users/{user_id}/chats", headers=headers)
+    elif kind == "open_chat":
+        chat_id = rng.choice(dataset.chat_ids[: max(1, len(dataset.chat_ids) // 5)])
+        connection.request("GET", f"/api/chats/{chat_id}", headers=headers)
+    else:
+        chat_id = rng.choice(dataset.chat_ids)
+        body = json.dumps({"author_id": rng.choice(dataset.user_ids), "content": "load test"})
+        connection.request("POST", f"/api/chats/{chat_id}/messages", body=body, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def run_load(
+    app: Flask | None,
+    dataset: Dataset,
+    target_url: str | None = None,
+    concurrency: int = 16,
+    requests: int = 2000,
+    random_seed: int = 1,
+) -> dict[str, Any]:
+    """Fire ``requests`` mixed requests from ``concurrency`` client threads.
+
+    With ``target_url`` unset the app is served in-process, which also lets
+    the run count SQL statements per request.
+    """
+
+    kinds = list(SCENARIO)
+    weights = list(SCENARIO.values())
+    per_worker = requests // concurrency
+
+    def worker(url: str, index: int) -> list[tuple[str, float, int]]:
+        rng = random.Random(random_seed + index)
+        parts = urlsplit(url)
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        samples = []
+        try:
+            for _ in range(per_worker):
+                kind = rng.choices(kinds, weights=weights)[0]
+                started = time.perf_counter()
+                status = _request(connection, kind, dataset, rng)
+                samples.append((kind, time.perf_counter() - started, status))
+        finally:
+            connection.close()
+        return samples
+
+    def drive(url: str) -> tuple[list[tuple[str, float, int]], float]:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            batches = list(pool.map(lambda index: worker(url, index), range(concurrency)))
+        return [sample for batch in batches for sample in batch], time.perf_counter() - started
+
+    statements = None
+    if target_url:
+        samples, elapsed = drive(target_url)
+    else:
+        assert app is not None
+        with _Server(app) as server, count_statements(app) as counter:
+            samples, elapsed = drive(server.url)
+        statements = counter[0]
+
+    result: dict[str, Any] = {
+        "concurrency": concurrency,
+        "overall": summarize([latency for _, latency, _ in samples], elapsed),
+        "errors": sum(1 for _, _, status in samples if status >= 400),
+        "queries_per_request": statements / len(samples) if statements is not None else None,
+    }
+    for kind in kinds:
+        result[kind] = summarize([latency for k, latency, _ in samples if k == kind], elapsed)
+    return result
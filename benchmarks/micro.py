@@ -0,0 +1,74 @@
+"""Microbenchmarks of ``MessengerService`` methods."""
+
+from __future__ import annotations
+
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from flask import Flask
+from sqlalchemy import event
+
+from app.services import MessengerService
+
+from .seed import Dataset
+from .stats import summarize
+
+
+@contextmanager
+def count_statements(app: Flask) -> Iterator[list[int]]:
+    """Count SQL statements run on any of the app's engines inside the block."""
+
+    counter = [0]
+
+    def _count(*_args: Any) -> None:
+        counter[0] += 1
+
+    with app.app_context():
+        engines = list(app.extensions["database"].db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _count)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", _count)
+
+
+def _workloads(dataset: Dataset, rng: random.Random) -> dict[str, Callable[[MessengerService], Any]]:
+    busiest_chat = dataset.chat_ids[0]
+
+    def send(service: MessengerService) -> Any:
+        author_id = rng.choice(dataset.user_ids)
+        return service.send_message(busiest_chat, author_id, "benchmark message").to_dict()
+
+    return {
+        "list_users": lambda service: service.search_users(limit=50).items,
+        "list_chats": lambda service: service.list_chat_rows(),
+        "get_chat_with_messages": lambda service: {
+            **service.get_chat_summary(busiest_chat),
+            "messages": service.list_message_rows(busiest_chat).items,
+        },
+        "send_message": send,
+    }
+
+
+def run_micro(app: Flask, dataset: Dataset, iterations: int = 50, random_seed: int = 1) -> dict:
+    """Time each service method with a fresh session per call, as a request would."""
+
+    database = app.extensions["database"]
+    rng = random.Random(random_seed)
+    results: dict[str, dict[str, float]] = {}
+    for name, workload in _workloads(dataset, rng).items():
+        samples: list[float] = []
+        with count_statements(app) as statements, app.app_context():
+            for _ in range(iterations):
+                started = time.perf_counter()
+                workload(MessengerService(database.session))
+                samples.append(time.perf_counter() - started)
+                database.session.remove()
+        summary = summarize(samples)
+        summary["queries_per_call"] = statements[0] / iterations
+        results[name] = summary
+    return results
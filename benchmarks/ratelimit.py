@@ -0,0 +1,84 @@
+"""Per-request overhead of the rate limiter.
+
+Measures ``MemoryBuckets.consume`` alone and the full per-request work of a
+message send (address hook plus chat and author buckets, the most any request
+pays) inside a pushed request context, against the same work with limiting
+disabled. Usage::
+
+    python -m benchmarks.ratelimit --iterations 200000
+    python -m benchmarks.ratelimit --redis-url redis://localhost:6379/0
+
+With ``--redis-url`` the shared backend is measured too; its cost is one
+network round trip per bucket.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable
+
+from app.ratelimit import MemoryBuckets, RateLimit, RateLimiter, RedisBuckets, rate_limit
+
+# Generous enough that nothing is refused while measuring the allow path.
+_LIMIT = RateLimit(rate=1e9, burst=1e9)
+
+
+def _per_call_us(operation: Callable[[int], None], iterations: int) -> float:
+    operation(0)
+    started = time.perf_counter()
+    for index in range(iterations):
+        operation(index)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def _request_overhead_us(limiter: RateLimiter | None, iterations: int, keys: int) -> float:
+    from flask import Flask
+
+    app = Flask(__name__)
+    if limiter is not None:
+        app.extensions["rate_limiter"] = limiter
+
+    def send(index: int) -> None:
+        rate_limit("address", "127.0.0.1")
+        rate_limit("chat", index % keys)
+        rate_limit("author", index % keys)
+
+    with app.test_request_context("/api/chats/1/messages", method="POST"):
+        return _per_call_us(send, iterations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, default=10_000, help="distinct chats/authors")
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    limits = {"address": _LIMIT, "chat": _LIMIT, "author": _LIMIT}
+    stores = {"memory": MemoryBuckets()}
+    if args.redis_url:
+        stores["redis"] = RedisBuckets(args.redis_url)
+
+    results: dict[str, float] = {
+        "disabled_request_us": _request_overhead_us(None, args.iterations, args.keys)
+    }
+    for name, store in stores.items():
+        iterations = args.iterations if name == "memory" else max(1, args.iterations // 100)
+        results[f"{name}_consume_us"] = _per_call_us(
+            lambda index: store.consume(f"chat:{index % args.keys}", _LIMIT), iterations
+        )
+        limiter = RateLimiter(store, limits)
+        results[f"{name}_request_us"] = _request_overhead_us(limiter, iterations, args.keys)
+        results[f"{name}_overhead_us"] = (
+            results[f"{name}_request_us"] - results["disabled_request_us"]
+        )
+
+    for name, value in results.items():
+        print(f"{name:>24} {value:8.2f} µs")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Saving benchmark runs as JSON and comparing them across commits."""
+
+from __future__ import annotations
+
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Metrics compared between runs and whether lower is better.
+COMPARED = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "throughput_per_s": False}
+
+
+def git_commit() -> str:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return output.stdout.strip()
+
+
+def metadata(database_url: str) -> dict[str, str]:
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "database": database_url.split("://", 1)[0],
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def save(result: dict[str, Any], directory: Path = RESULTS_DIR) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    meta = result["meta"]
+    stamp = meta["timestamp"].replace(":", "").replace("-", "")
+    path = directory / f"{stamp}-{meta['commit']}-{meta['database']}.json"
+    path.write_text(json.dumps(result, indent=2, sort_keys=True))
+    return path
+
+
+def _summaries(result: dict[str, Any]) -> Iterator[tuple[str, dict[str, float]]]:
+    for name, summary in result.get("micro", {}).items():
+        yield f"micro.{name}", summary
+    for name, summary in (result.get("load") or {}).items():
+        if isinstance(summary, dict):
+            yield f"load.{name}", summary
+
+
+def compare(baseline: dict[str, Any], candidate: dict[str, Any]) -> list[str]:
+    """Render per-metric changes from ``baseline`` to ``candidate``."""
+
+    lines = [f"{baseline['meta']['commit']} -> {candidate['meta']['commit']}"]
+    before = dict(_summaries(baseline))
+    for name, after in _summaries(candidate):
+        if name not in before:
+            continue
+        for metric, lower_is_better in COMPARED.items():
+            old, new = before[name].get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            better = change < 0 if lower_is_better else change > 0
+            marker = "+" if better else "-" if abs(change) >= 5 else " "
+            lines.append(f"{marker} {name:32} {metric:18} {old:10.2f} -> {new:10.2f} ({change:+.1f}%)")
+    return lines
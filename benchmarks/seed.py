@@ -0,0 +1,69 @@
+"""Synthetic dataset generation for benchmarks."""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+
+from app.services import MessengerService
+
+
+@dataclass(slots=True)
+class Dataset:
+    """Ids of the seeded rows, used to drive the workloads."""
+
+    user_ids: list[int] = field(default_factory=list)
+    chat_ids: list[int] = field(default_factory=list)
+    messages: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        return {"users": len(self.user_ids), "chats": len(self.chat_ids), "messages": self.messages}
+
+
+def zipf_weights(count: int, skew: float) -> list[float]:
+    """Weights where item ``k`` is ``k ** -skew`` as likely as the first."""
+
+    return [1.0 / (rank**skew) for rank in range(1, count + 1)]
+
+
+def seed(
+    service: MessengerService,
+    users: int = 200,
+    chats: int = 50,
+    messages: int = 20_000,
+    participants_per_chat: int = 8,
+    skew: float = 1.1,
+    random_seed: int = 1,
+    batch_size: int = 1000,
+    prefix: str = "bench",
+) -> Dataset:
+    """Create ``users``, ``chats`` and ``messages`` with a Zipf-skewed spread.
+
+    A few chats receive most of the messages, like real busy group chats.
+    Runs are reproducible for a given ``random_seed``.
+    """
+
+    rng = random.Random(random_seed)
+    dataset = Dataset()
+    for index in range(users):
+        user = service.create_user(username=f"{prefix}-{index}", display_name=f"User {index}")
+        dataset.user_ids.append(user.id)
+
+    for index in range(chats):
+        size = min(participants_per_chat, len(dataset.user_ids))
+        members = rng.sample(dataset.user_ids, size)
+        chat = service.create_chat(title=f"{prefix} chat {index}", participant_ids=members)
+        dataset.chat_ids.append(chat.id)
+
+    weights = zipf_weights(len(dataset.chat_ids), skew)
+    targets = rng.choices(dataset.chat_ids, weights=weights, k=messages)
+    per_chat: dict[int, list[dict[str, object]]] = {}
+    for number, chat_id in enumerate(targets):
+        per_chat.setdefault(chat_id, []).append(
+            {"author_id": rng.choice(dataset.user_ids), "content": f"synthetic message {number}"}
+        )
+    for chat_id, batch in per_chat.items():
+        for start in range(0, len(batch), batch_size):
+            service.send_messages(chat_id, batch[start : start + batch_size])
+    dataset.messages = messages
+    return dataset
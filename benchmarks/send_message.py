@@ -0,0 +1,109 @@
+"""Compare the legacy ORM send path with ``MessengerService.send_message``.
+
+Usage::
+
+    python -m benchmarks.send_message --messages 2000
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.send_message
+
+Defaults to a throwaway SQLite file when ``DATABASE_URL`` is not set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+from sqlalchemy import event
+
+from app import create_app
+from app.models import Message
+from app.services import MessengerService
+
+
+def _legacy_send(service: MessengerService, chat_id: int, author_id: int, content: str) -> dict:
+    """The pre-optimisation send path: 3-4 SELECTs plus a reload for ``to_dict``."""
+
+    session = service._session
+    chat = service._chat_repo.get_by_id(chat_id)
+    author = service._user_repo.get_by_id(author_id)
+    if author not in chat.participants:
+        chat.participants.append(author)
+    message = Message(chat=chat, author=author, content=content)
+    session.add(message)
+    session.flush()
+    session.commit()
+    return message.to_dict()
+
+
+def _lean_send(service: MessengerService, chat_id: int, author_id: int, content: str) -> dict:
+    return service.send_message(chat_id=chat_id, author_id=author_id, content=content).to_dict()
+
+
+def _run(
+    label: str,
+    app,
+    send: Callable[[MessengerService, int, int, str], dict],
+    chat_id: int,
+    author_ids: list[int],
+    count: int,
+) -> None:
+    database = app.extensions["database"]
+    statements = 0
+
+    def _count(*_args: object) -> None:
+        nonlocal statements
+        statements += 1
+
+    with app.app_context():
+        engine = database.db.engine
+        event.listen(engine, "before_cursor_execute", _count)
+        try:
+            started = time.perf_counter()
+            for index in range(count):
+                service = MessengerService(database.session)
+                send(service, chat_id, author_ids[index % len(author_ids)], f"message {index}")
+                database.session.remove()
+            elapsed = time.perf_counter() - started
+        finally:
+            event.remove(engine, "before_cursor_execute", _count)
+
+    print(
+        f"{label:>7}: {count / elapsed:10.1f} msg/s  "
+        f"{elapsed / count * 1e6:8.1f} us/msg  {statements / count:5.2f} statements/msg"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--authors", type=int, default=20)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    app = create_app()
+    with app.app_context():
+        app.extensions["database"].upgrade_schema()
+        service = MessengerService(app.extensions["database"].session)
+        suffix = str(time.time_ns())
+        authors = [
+            service.create_user(username=f"bench-{suffix}-{i}", display_name=f"Bench {i}")
+            for i in range(args.authors)
+        ]
+        author_ids = [author.id for author in authors]
+        chat_id = service.create_chat(title="bench", participant_ids=author_ids[:1]).id
+        # Enough participants that the legacy membership check has real work to do.
+        service.send_messages(chat_id, [{"author_id": a, "content": "warmup"} for a in author_ids])
+
+    _run("legacy", app, _legacy_send, chat_id, author_ids, args.messages)
+    _run("lean", app, _lean_send, chat_id, author_ids, args.messages)
+
+
+if __name__ == "__main__":
+    main()
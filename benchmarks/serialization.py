@@ -0,0 +1,97 @@
+"""Compare ORM + ``to_dict`` + stdlib JSON with the projected read path.
+
+Usage::
+
+    python -m benchmarks.serialization --messages 10000
+
+Defaults to a throwaway SQLite file when ``DATABASE_URL`` is not set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Callable
+
+from app import create_app
+from app.serialization import OrjsonProvider, StdlibJSONProvider, orjson
+from app.services import MessengerService
+
+
+def _best_of(repeat: int, func: Callable[[], int]) -> tuple[float, int]:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--authors", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    app = create_app()
+    database = app.extensions["database"]
+    with app.app_context():
+        database.upgrade_schema()
+        service = MessengerService(database.session)
+        suffix = str(time.time_ns())
+        author_ids = [
+            service.create_user(username=f"ser-{suffix}-{i}", display_name=f"Author {i}").id
+            for i in range(args.authors)
+        ]
+        chat_id = service.create_chat(title="serialization", participant_ids=author_ids).id
+        batch = [
+            {"author_id": author_ids[i % len(author_ids)], "content": f"message body {i}"}
+            for i in range(args.messages)
+        ]
+        for start in range(0, len(batch), 1000):
+            service.send_messages(chat_id, batch[start : start + 1000])
+
+        stdlib = StdlibJSONProvider(app)
+
+        def orm_to_dict() -> int:
+            database.session.remove()
+            page = MessengerService(database.session).list_messages(chat_id, limit=args.messages)
+            body = json.dumps([message.to_dict(include_author=True) for message in page.items])
+            return len(body)
+
+        def projected(provider: StdlibJSONProvider) -> Callable[[], int]:
+            def run() -> int:
+                database.session.remove()
+                service = MessengerService(database.session)
+                page = service.list_message_rows(chat_id, limit=args.messages)
+                return len(provider.dumps(page.items))
+
+            return run
+
+        cases: list[tuple[str, Callable[[], int]]] = [
+            ("orm + to_dict + json", orm_to_dict),
+            ("projected + stdlib", projected(stdlib)),
+        ]
+        if orjson is not None:
+            cases.append(("projected + orjson", projected(OrjsonProvider(app))))
+
+        print(f"{args.messages} messages, best of {args.repeat}")
+        baseline = None
+        for label, func in cases:
+            elapsed, size = _best_of(args.repeat, func)
+            baseline = baseline or elapsed
+            print(f"{label:>22}: {elapsed * 1000:8.1f} ms  {baseline / elapsed:5.2f}x  {size} bytes")
+
+
+if __name__ == "__main__":
+    main()
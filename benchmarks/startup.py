@@ -0,0 +1,113 @@
+"""Time from ``gunicorn`` launch to the first successful request.
+
+Compares three boot modes against the same database::
+
+    boot-ddl   every worker runs the schema upgrade in ``create_app`` (old behaviour)
+    lazy       ``wsgi:app``: no DDL, the first request opens the first connection
+    preload    ``wsgi:app --preload``: the master imports the app once, workers fork
+
+Usage::
+
+    python -m benchmarks.startup --workers 8 --repeat 5
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.startup
+
+Defaults to a throwaway SQLite file when ``DATABASE_URL`` is not set, where DDL
+checks are nearly free; use PostgreSQL to see the cost of boot-time DDL.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from .concurrency import ROOT, _free_port
+
+MODES = {
+    "boot-ddl": ["benchmarks.startup:boot_ddl_app()"],
+    "lazy": ["wsgi:app"],
+    "preload": ["wsgi:app", "--preload"],
+}
+
+
+def boot_ddl_app():  # noqa: ANN201 - gunicorn app factory
+    """App factory that migrates on every worker boot, as ``create_app`` used to."""
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        app.extensions["database"].upgrade_schema()
+    return app
+
+
+def _time_to_first_request(mode: str, workers: int, timeout: float) -> float:
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "gunicorn", *MODES[mode],
+        "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+        "--worker-class", "sync", "--log-level", "warning",
+    ]  # fmt: skip
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT)
+    try:
+        deadline = started + timeout
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/users", timeout=5):
+                    return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                if process.poll() is not None or time.perf_counter() > deadline:
+                    raise RuntimeError(f"{mode} server did not answer")
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=timeout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated boot modes")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        handle, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    # Imported late so that the app picks up the database chosen above.
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        app.extensions["database"].upgrade_schema()
+
+    results: dict[str, dict[str, float]] = {}
+    for mode in args.modes.split(","):
+        samples = [
+            _time_to_first_request(mode, args.workers, args.timeout) for _ in range(args.repeat)
+        ]
+        results[mode] = {
+            "median_ms": statistics.median(samples) * 1000,
+            "min_ms": min(samples) * 1000,
+            "max_ms": max(samples) * 1000,
+        }
+        print(
+            f"{mode:>8} workers={args.workers}  first request after "
+            f"{results[mode]['median_ms']:7.1f} ms (median of {args.repeat})"
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
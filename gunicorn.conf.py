@@ -0,0 +1,31 @@
+"""Gunicorn settings, loaded automatically from the working directory."""
+
+from __future__ import annotations
+
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+# Server-Sent Event streams stay open for a long time; a gevent worker parks
+# each idle stream on a greenlet instead of tying up a whole sync worker.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+# Import the app once in the master so workers fork with the modules already
+# loaded and share those pages copy-on-write. ``create_app`` opens no
+# connections, and ``post_fork`` drops any pool state the master picked up.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def post_fork(server, worker):  # noqa: ANN001 - gunicorn hook signature
+    """Make psycopg2 cooperate with gevent and reset pools inherited via ``--preload``."""
+
+    # Read the effective setting so a ``--worker-class`` override is honoured.
+    if server.cfg.worker_class_str == "gevent":
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
+
+    app = getattr(server.app, "callable", None) if server.cfg.preload_app else None
+    if app is not None and "database" in getattr(app, "extensions", {}):
+        with app.app_context():
+            app.extensions["database"].dispose_after_fork()